@@ -0,0 +1,214 @@
+# accounting.py
+# 요청별 토큰 사용량을 주제(prefix)와 실행 단위로 집계하고, 예산 안에서 생성 순서를 정한다.
+import asyncio
+import json
+import os
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import BUDGET_CONFIG, MODEL_PRICES, OPENAI_MODEL, OUTPUT_DIR
+from converter import compression_for, list_jsonl_files, open_jsonl
+from corpus_index import CorpusIndex, prefix_from_path
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+@dataclass
+class UsageStats:
+    requests: int = 0
+    completions: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    truncated: int = 0  # finish_reason == "length" (MAX_TOKENS 초과)
+    records: int = 0
+    cost: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def request_cost(prompt_tokens: int, completion_tokens: int, model: str = OPENAI_MODEL) -> float:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices["prompt"] + completion_tokens * prices["completion"]) / 1e6
+
+
+class UsageTracker:
+    def __init__(self, model: str = OPENAI_MODEL):
+        self.model = model
+        self.topics: Dict[str, UsageStats] = {}
+        self.total = UsageStats()
+        self.started = datetime.now()
+
+    def record(self, prefix: str, usage: Optional[Dict], finish_reasons: Sequence[Optional[str]],
+               cached: bool = False):
+        # 요청 하나가 n개의 선택지를 돌려주므로 사용량은 요청 단위, 잘림은 선택지 단위로 센다
+        stats = self.topics.setdefault(prefix, UsageStats())
+        for target in (stats, self.total):
+            if cached:
+                target.cached += len(finish_reasons)
+                continue
+            target.requests += 1
+            target.completions += len(finish_reasons)
+            if usage:
+                prompt = usage.get("prompt_tokens") or 0
+                completion = usage.get("completion_tokens") or 0
+                target.prompt_tokens += prompt
+                target.completion_tokens += completion
+                target.cost += request_cost(prompt, completion, self.model)
+            target.truncated += sum(1 for reason in finish_reasons if reason == "length")
+
+    def record_written(self, prefix: str, records: int = 1):
+        self.topics.setdefault(prefix, UsageStats()).records += records
+        self.total.records += records
+
+    def average_completion_tokens(self) -> Optional[float]:
+        if not self.total.completions or not self.total.completion_tokens:
+            return None
+        return self.total.completion_tokens / self.total.completions
+
+    def average_prompt_tokens(self) -> Optional[float]:
+        # 프롬프트는 선택지 수와 관계없이 요청마다 한 번 과금된다
+        if not self.total.requests or not self.total.prompt_tokens:
+            return None
+        return self.total.prompt_tokens / self.total.requests
+
+    def report(self, **extra) -> Dict:
+        def dump(stats: UsageStats) -> Dict:
+            return {**asdict(stats), "total_tokens": stats.total_tokens, "cost": round(stats.cost, 6)}
+
+        return {
+            "model": self.model,
+            "started": self.started.isoformat(),
+            "finished": datetime.now().isoformat(),
+            **extra,
+            "total": dump(self.total),
+            "topics": {prefix: dump(stats) for prefix, stats in sorted(self.topics.items())}
+        }
+
+    def write_report(self, report_dir: str = BUDGET_CONFIG["report_dir"], **extra) -> str:
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run_{self.started.strftime('%Y%m%d%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**extra), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def count_records(directory: str = OUTPUT_DIR) -> Counter:
+    # 인덱스가 있는 샤드는 인덱스 크기로, 압축 샤드와 인덱스가 없는 샤드는 줄 수로 센다 (인덱스를 만들지 않는다)
+    counts = Counter()
+    if not os.path.isdir(directory):
+        return counts
+    with CorpusIndex(directory) as corpus:
+        for shard in corpus.shards:
+            counts[shard.prefix] += len(shard)
+        unindexed = set(corpus.unindexed)
+    for path in list_jsonl_files(directory):
+        if compression_for(path) or path in unindexed:
+            with open_jsonl(path) as f:
+                counts[prefix_from_path(path.rsplit('.jsonl', 1)[0] + '.jsonl')] += sum(1 for line in f if line.strip())
+    return counts
+
+
+class BudgetScheduler:
+    def __init__(self, tracker: UsageTracker,
+                 token_budget: Optional[int] = BUDGET_CONFIG["token_budget"],
+                 cost_budget: Optional[float] = BUDGET_CONFIG["cost_budget"],
+                 target_records: Optional[int] = BUDGET_CONFIG["target_records"]):
+        self.tracker = tracker
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.target_records = target_records
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.outstanding = 0
+        self.exhausted = False
+        self._released = asyncio.Event()
+
+    def deficit(self, prefix: str, existing: Dict[str, int]) -> Optional[int]:
+        if self.target_records is None:
+            return None
+        return max(0, self.target_records - existing.get(prefix, 0))
+
+    def order(self, topics: Sequence[Tuple[str, str]], existing: Dict[str, int]) -> List[Tuple[str, str]]:
+        # 목표 레코드 수에 가장 많이 모자란 주제부터, 이미 목표를 채운 주제는 제외
+        if self.target_records is None:
+            return list(topics)
+        deficits = {prefix: self.deficit(prefix, existing) for _, prefix in topics}
+        return sorted((t for t in topics if deficits[t[1]] > 0), key=lambda t: -deficits[t[1]])
+
+    def _estimate(self, estimated_tokens: int, completions: int) -> Tuple[int, float]:
+        # 실측 평균이 생기면 그것을, 없으면 사전 추정치(프롬프트 + n * MAX_TOKENS)를 남은 예산까지로 줄여 쓴다.
+        # 사전 추정치는 실제 사용량보다 훨씬 커서, 그대로 예약하면 첫 요청 하나가 예산 전체를 막는다
+        completion = self.tracker.average_completion_tokens()
+        if not completion:
+            tokens, cost = estimated_tokens, request_cost(0, estimated_tokens, self.tracker.model)
+            if self.token_budget is not None:
+                tokens = min(tokens, max(0, self.token_budget - self.tracker.total.total_tokens))
+            if self.cost_budget is not None:
+                cost = min(cost, max(0.0, self.cost_budget - self.tracker.total.cost))
+            return tokens, cost
+        prompt = int(self.tracker.average_prompt_tokens() or 0)
+        completion = int(completion * completions)
+        return prompt + completion, request_cost(prompt, completion, self.tracker.model)
+
+    def _fits(self, tokens: int, cost: float, reserved: bool = True) -> bool:
+        reserved_tokens = self.reserved_tokens if reserved else 0
+        reserved_cost = self.reserved_cost if reserved else 0.0
+        if self.token_budget is not None and (
+                self.tracker.total.total_tokens >= self.token_budget or
+                self.tracker.total.total_tokens + reserved_tokens + tokens > self.token_budget):
+            return False
+        if self.cost_budget is not None and (
+                self.tracker.total.cost >= self.cost_budget or
+                self.tracker.total.cost + reserved_cost + cost > self.cost_budget):
+            return False
+        return True
+
+    def _hold(self, tokens: int, cost: float) -> Tuple[int, float]:
+        self.reserved_tokens += tokens
+        self.reserved_cost += cost
+        self.outstanding += 1
+        return tokens, cost
+
+    def try_reserve(self, estimated_tokens: int, completions: int = 1) -> Optional[Tuple[int, float]]:
+        # 예산을 넘으면 기다리지 않고 None을 돌려준다 (실행은 계속할 수 있는 선택적 요청용)
+        tokens, cost = self._estimate(estimated_tokens, completions)
+        if self.exhausted or not self._fits(tokens, cost):
+            return None
+        return self._hold(tokens, cost)
+
+    async def reserve(self, estimated_tokens: int, completions: int = 1) -> Tuple[int, float]:
+        # 진행 중인 예약 때문에만 모자라면 그 요청이 끝나 실제 사용량이 정산될 때까지 기다린다.
+        # 첫 요청의 사용량을 잰 뒤에는 나머지 요청이 실측 평균으로 예약한다
+        while not self.exhausted:
+            tokens, cost = self._estimate(estimated_tokens, completions)
+            if self._fits(tokens, cost):
+                return self._hold(tokens, cost)
+            if not self.outstanding or not self._fits(tokens, cost, reserved=False):
+                break
+            await self._released.wait()
+        self.exhausted = True
+        raise BudgetExhausted("token/cost budget exhausted")
+
+    def release(self, reservation: Tuple[int, float]):
+        # 호출 측은 실제 사용량을 tracker에 기록한 뒤 예약을 푼다
+        self.reserved_tokens -= reservation[0]
+        self.reserved_cost -= reservation[1]
+        self.outstanding -= 1
+        released, self._released = self._released, asyncio.Event()
+        released.set()
+
+    def summary(self) -> Dict:
+        return {
+            "token_budget": self.token_budget,
+            "cost_budget": self.cost_budget,
+            "target_records": self.target_records,
+            "budget_exhausted": self.exhausted
+        }
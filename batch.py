@@ -0,0 +1,370 @@
+# batch.py
+# TOPICS x num_sets 요청을 OpenAI Batch API로 일괄 생성한다.
+#   python batch.py run [--num-sets N] [--local]     제출 후 완료까지 대기하고 결과를 저장
+#   python batch.py submit [--num-sets N] [--local]  제출만 하고 배치 ID 출력
+#   python batch.py resume [BATCH_ID ...] [--local]  저장된 상태로 대기/수집 재개
+#   python batch.py status [--local]
+import argparse
+import glob
+import json
+import os
+import re
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import (
+    OPENAI_MODEL,
+    MAX_TOKENS,
+    TEMPERATURE,
+    DEFAULT_CONFIG,
+    SYSTEM_PROMPTS,
+    OUTPUT_DIR,
+    OUTPUT_CONFIG,
+    BATCH_CONFIG,
+    QUALITY_CONFIG
+)
+from canned import CannedResponder
+from converter import DataConverter
+from quality import append_rejects, check_batch
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def build_batch_requests(topics: Sequence[Tuple[str, str]], num_sets: int,
+                         max_n: int = DEFAULT_CONFIG["max_n"]) -> List[Dict]:
+    # 주제마다 n개씩 묶어 요청한다. custom_id는 "prefix:첫 샘플 번호"
+    # (prompts는 키워드 목록을 읽으므로 status 명령이 불러오지 않도록 여기서 가져온다)
+    from prompts import build_messages
+
+    requests = []
+    for topic, prefix in topics:
+        messages = build_messages(topic, prefix)
+        for first in range(0, num_sets, max_n):
+            requests.append({
+                "custom_id": f"{prefix}:{first}",
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {
+                    "model": OPENAI_MODEL,
+                    "messages": messages,
+                    "temperature": TEMPERATURE,
+                    "max_tokens": MAX_TOKENS,
+                    "n": min(max_n, num_sets - first)
+                }
+            })
+    return requests
+
+
+class OpenAIBatchBackend:
+    def __init__(self, client):
+        self.client = client
+
+    def upload(self, path: str) -> str:
+        with open(path, 'rb') as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create(self, input_file_id: str) -> str:
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=ENDPOINT,
+            completion_window=BATCH_CONFIG["completion_window"]
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> Dict:
+        batch = self.client.batches.retrieve(batch_id)
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "request_counts": batch.request_counts.model_dump() if batch.request_counts else None
+        }
+
+    def poll(self, batch_id: str) -> Dict:
+        return self.retrieve(batch_id)
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchBackend:
+    # Batch API와 같은 파일 규약을 따르는 오프라인 스탠드인.
+    # retrieve()는 상태만 읽고, wait이 호출하는 poll()이 배치를 한 단계씩 진행시킨다:
+    # 첫 poll에서 in_progress로, 다음 poll에서 응답기로 모든 요청을 처리해 completed로 바꾼다.
+    def __init__(self, root: str = BATCH_CONFIG["local_dir"], responder: Optional[CannedResponder] = None):
+        self.root = root
+        self.responder = responder or CannedResponder()
+        os.makedirs(os.path.join(root, "files"), exist_ok=True)
+        os.makedirs(os.path.join(root, "batches"), exist_ok=True)
+
+    def _file_path(self, file_id: str) -> str:
+        return os.path.join(self.root, "files", file_id)
+
+    def _batch_path(self, batch_id: str) -> str:
+        return os.path.join(self.root, "batches", f"{batch_id}.json")
+
+    def _save_batch(self, batch: Dict):
+        with open(self._batch_path(batch["id"]), 'w', encoding='utf-8') as f:
+            json.dump(batch, f)
+
+    def upload(self, path: str) -> str:
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        with open(path, 'rb') as src, open(self._file_path(file_id), 'wb') as dst:
+            dst.write(src.read())
+        return file_id
+
+    def create(self, input_file_id: str) -> str:
+        batch = {"id": f"batch-local-{uuid.uuid4().hex[:12]}", "input_file_id": input_file_id,
+                 "status": "validating", "output_file_id": None, "error_file_id": None}
+        self._save_batch(batch)
+        return batch["id"]
+
+    def _load_batch(self, batch_id: str) -> Dict:
+        with open(self._batch_path(batch_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def retrieve(self, batch_id: str) -> Dict:
+        batch = self._load_batch(batch_id)
+        return {key: batch[key] for key in ("status", "output_file_id", "error_file_id")}
+
+    def poll(self, batch_id: str) -> Dict:
+        batch = self._load_batch(batch_id)
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress":
+            output_file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+            with open(self._file_path(batch["input_file_id"]), 'r', encoding='utf-8') as src, \
+                    open(self._file_path(output_file_id), 'w', encoding='utf-8') as dst:
+                for line in src:
+                    request = json.loads(line)
+                    body = self.responder.completion(request["body"], salt=request["custom_id"])
+                    dst.write(json.dumps({
+                        "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": body},
+                        "error": None
+                    }, ensure_ascii=False) + '\n')
+            batch["status"] = "completed"
+            batch["output_file_id"] = output_file_id
+        self._save_batch(batch)
+        return self.retrieve(batch_id)
+
+    def download(self, file_id: str) -> str:
+        with open(self._file_path(file_id), 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+class BatchRunner:
+    def __init__(self, backend, converter: DataConverter,
+                 state_dir: str = BATCH_CONFIG["state_dir"], output_dir: str = OUTPUT_DIR,
+                 quality: Dict = dict(QUALITY_CONFIG, mode=BATCH_CONFIG["quality"])):
+        self.backend = backend
+        self.converter = converter
+        self.quality = quality
+        self.state_dir = state_dir
+        self.output_dir = output_dir
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _state_path(self, batch_id: str) -> str:
+        return os.path.join(self.state_dir, f"{batch_id}.json")
+
+    def load_state(self, batch_id: str) -> Dict:
+        with open(self._state_path(batch_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_state(self, state: Dict):
+        path = self._state_path(state["batch_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def pending_batches(self) -> List[str]:
+        batch_ids = []
+        for path in sorted(glob.glob(os.path.join(self.state_dir, "*.json"))):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if not state.get("ingested"):
+                batch_ids.append(state["batch_id"])
+        return batch_ids
+
+    def submit(self, topics: Optional[Sequence[Tuple[str, str]]] = None,
+               num_sets: int = DEFAULT_CONFIG["num_sets"]) -> str:
+        if topics is None:
+            from config import TOPICS as topics
+        requests = build_batch_requests(topics, num_sets)
+        input_path = os.path.join(self.state_dir, f"input_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + '\n')
+
+        input_file_id = self.backend.upload(input_path)
+        batch_id = self.backend.create(input_file_id)
+        # 제출 직후 상태를 기록해 프로세스가 재시작되어도 배치 ID로 이어서 수집할 수 있게 한다
+        self.save_state({
+            "batch_id": batch_id,
+            "input_file": input_path,
+            "input_file_id": input_file_id,
+            "requests": len(requests),
+            "status": "submitted",
+            "submitted_at": datetime.now().isoformat(),
+            "ingested": False
+        })
+        print(f"Submitted batch {batch_id} with {len(requests)} requests")
+        return batch_id
+
+    def wait(self, batch_id: str, poll_interval: float = BATCH_CONFIG["poll_interval"]) -> Dict:
+        state = self.load_state(batch_id)
+        while True:
+            info = self.backend.poll(batch_id)
+            if info["status"] != state["status"]:
+                state.update(info)
+                self.save_state(state)
+                print(f"Batch {batch_id}: {info['status']}")
+            if info["status"] in TERMINAL_STATUSES:
+                return info
+            time.sleep(poll_interval)
+
+    def _shard_base(self, batch_id: str, prefix: str) -> str:
+        # 배치마다 고유한 샤드 이름을 써서, 중단된 수집을 재개할 때 이 배치가 쓴 샤드만 골라 지울 수 있게 한다
+        tag = re.sub(r'[^0-9A-Za-z]', '', batch_id.removeprefix("batch"))
+        return f"{self.output_dir}/{prefix}.{tag}"
+
+    def _remove_partial_outputs(self, batch_id: str, prefixes: Sequence[str]) -> int:
+        removed = 0
+        for prefix in prefixes:
+            base = self._shard_base(batch_id, prefix)
+            for path in glob.glob(f"{glob.escape(base)}-*.jsonl*"):
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def _download_results(self, file_id: Optional[str]) -> List[Dict]:
+        if not file_id:
+            return []
+        return [json.loads(line) for line in self.backend.download(file_id).splitlines() if line.strip()]
+
+    def ingest(self, batch_id: str) -> Dict[str, List[str]]:
+        from prompts import parse_turns
+
+        state = self.load_state(batch_id)
+        if state.get("ingested"):
+            print(f"Batch {batch_id} already ingested")
+            return state.get("outputs", {})
+        if not state.get("output_file_id") and not state.get("error_file_id"):
+            raise RuntimeError(f"Batch {batch_id} has no output file (status: {state['status']})")
+
+        conversations = defaultdict(list)
+        candidates = []
+        failed = []
+        # 오류 파일에는 출력 파일에 없는 실패 요청이 들어 있다
+        responses = self._download_results(state.get("output_file_id")) + \
+            self._download_results(state.get("error_file_id"))
+        for result in responses:
+            prefix = result["custom_id"].rsplit(":", 1)[0]
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                failed.append(result["custom_id"])
+                continue
+
+            for choice in response["body"]["choices"]:
+                turns, roles = parse_turns(choice["message"]["content"] or "")
+                if turns:
+                    candidates.append((result["custom_id"], prefix, (turns, roles, choice.get("finish_reason"))))
+
+        # 배치 결과는 한꺼번에 검사한다. 불합격 대화는 저장하지 않고 사유와 함께 따로 기록한다
+        rejects = []
+        if self.quality["mode"] != "off":
+            results = check_batch((parsed for _, _, parsed in candidates), self.quality)
+        else:
+            results = [[] for _ in candidates]
+        for (custom_id, prefix, (turns, _, _)), issues in zip(candidates, results):
+            if issues:
+                rejects.append({"prefix": prefix, "custom_id": custom_id,
+                                "issues": [str(issue) for issue in issues], "turns": turns})
+            else:
+                conversations[prefix].append(turns)
+
+        # 샤드를 쓰기 전에 수집 중임을 기록한다. 기록 후 중단되면 다음 재개에서 이 배치의 샤드를 지우고 다시 쓴다
+        if state.get("ingesting"):
+            removed = self._remove_partial_outputs(batch_id, sorted(conversations))
+            if removed:
+                print(f"Removed {removed} files from an interrupted ingest of {batch_id}")
+        else:
+            state["ingesting"] = True
+            self.save_state(state)
+            append_rejects(self.quality["rejects_path"], rejects)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        outputs = {}
+        for prefix, convs in conversations.items():
+            with self.converter.open_writer(
+                self._shard_base(batch_id, prefix),
+                max_records=OUTPUT_CONFIG["shard_max_records"],
+                max_bytes=OUTPUT_CONFIG["shard_max_bytes"],
+                compression=OUTPUT_CONFIG["compression"],
+                prefix=prefix
+            ) as writer:
+                writer.write_many(convs)
+            outputs[prefix] = writer.shards
+            print(f"Saved {len(convs)} conversations to {', '.join(writer.shards)}")
+
+        if failed:
+            print(f"{len(failed)} requests failed: {', '.join(failed[:10])}")
+        if rejects:
+            print(f"{len(rejects)} conversations rejected by the quality gate "
+                  f"(see {self.quality['rejects_path']})")
+        state.update({"ingesting": False, "ingested": True, "outputs": outputs, "failed": failed,
+                      "rejected": len(rejects)})
+        self.save_state(state)
+        return outputs
+
+    def resume(self, batch_id: str, poll_interval: float = BATCH_CONFIG["poll_interval"]) -> Dict[str, List[str]]:
+        info = self.wait(batch_id, poll_interval)
+        if info["status"] != "completed" and not (info.get("output_file_id") or info.get("error_file_id")):
+            print(f"Batch {batch_id} ended with status {info['status']}")
+            return {}
+        return self.ingest(batch_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate conversations with the OpenAI Batch API")
+    parser.add_argument("command", choices=["run", "submit", "resume", "status"])
+    parser.add_argument("batch_ids", nargs="*", help="resume할 배치 ID (기본값: 수집되지 않은 모든 배치)")
+    parser.add_argument("--num-sets", type=int, default=DEFAULT_CONFIG["num_sets"])
+    parser.add_argument("--poll-interval", type=float, default=BATCH_CONFIG["poll_interval"])
+    parser.add_argument("--local", action="store_true", help="로컬 파일 기반 배치 스탠드인 사용")
+    parser.add_argument("--quality", choices=["reject", "off"], default=BATCH_CONFIG["quality"],
+                        help="reject: 품질 검사에 불합격한 대화를 제외 (배치 결과는 재생성하지 않는다)")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        backend = LocalBatchBackend()
+        state_dir = os.path.join(BATCH_CONFIG["local_dir"], "state")
+    else:
+        from client import get_client
+        backend = OpenAIBatchBackend(get_client())
+        state_dir = BATCH_CONFIG["state_dir"]
+
+    runner = BatchRunner(backend, DataConverter(system_message=SYSTEM_PROMPTS["security_expert"]), state_dir,
+                         quality=dict(QUALITY_CONFIG, mode=args.quality))
+
+    if args.command == "status":
+        for batch_id in runner.pending_batches():
+            print(f"{batch_id}: {backend.retrieve(batch_id)['status']}")
+    elif args.command == "submit":
+        runner.submit(num_sets=args.num_sets)
+    else:
+        batch_ids = args.batch_ids or runner.pending_batches()
+        if args.command == "run":
+            batch_ids = [runner.submit(num_sets=args.num_sets)]
+        for batch_id in batch_ids:
+            runner.resume(batch_id, args.poll_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
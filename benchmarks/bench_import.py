@@ -0,0 +1,113 @@
+# benchmarks/bench_import.py
+# main.py 하위 명령별 인터프리터 시작 비용(-X importtime 합계와 프로세스 실행 시간)을 측정하고,
+# 데이터 처리 명령이 API 클라이언트나 emoji를 불러오지 않는지 확인한다.
+#   python benchmarks/bench_import.py [--repeat 5] [--output import.json] [--baseline import.json]
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 데이터 처리 명령에서 불러오면 안 되는 모듈
+HEAVY_MODULES = ("openai", "httpx", "pydantic", "emoji", "dotenv")
+
+# 이름 -> (main.py 인자, 무거운 모듈 금지 여부). --help로 실행해 import와 인자 파싱까지만 측정한다.
+COMMANDS = {
+    "config": (None, True),
+    "stats": (["stats", "--help"], True),
+    "normalize": (["normalize", "--help"], True),
+    "export": (["export", "--help"], True),
+    "index": (["index", "--help"], True),
+    "dedup": (["dedup", "--help"], True),
+    "quality": (["quality", "--help"], True),
+    "generate": (["generate", "--help"], False),
+}
+
+_PROBE = """
+import contextlib, io, json, sys
+argv = json.loads(sys.argv[1])
+if argv is None:
+    import config
+else:
+    import main
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            main.main(argv)
+        except SystemExit:
+            pass
+print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in {heavy!r})))
+""".format(heavy=set(HEAVY_MODULES))
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|")
+
+
+def probe(argv: Optional[List[str]]) -> Dict:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE, json.dumps(argv)],
+                          cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    # self 시간의 합이 전체 import 시간
+    import_us = sum(int(m.group(1)) for m in map(_IMPORTTIME.match, proc.stderr.splitlines()) if m)
+    return {"wall_ms": wall * 1000, "import_ms": import_us / 1000,
+            "heavy": json.loads(proc.stdout.strip().splitlines()[-1])}
+
+
+def measure(argv: Optional[List[str]], repeat: int) -> Dict:
+    runs = [probe(argv) for _ in range(repeat)]
+    return {"wall_ms": min(r["wall_ms"] for r in runs),
+            "import_ms": min(r["import_ms"] for r in runs),
+            "heavy": runs[-1]["heavy"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time benchmark for main.py subcommands")
+    parser.add_argument("--commands", help=f"쉼표로 구분한 명령 (기본값: {','.join(COMMANDS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="명령당 실행 횟수 (최솟값을 사용)")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 이전 --output 결과")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="기준 대비 허용하는 import 시간 증가율")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="측정 잡음을 감안한 절대 허용치(ms)")
+    parser.add_argument("--budget-ms", type=float, help="데이터 처리 명령의 import 시간 상한(ms)")
+    args = parser.parse_args(argv)
+
+    names = args.commands.split(",") if args.commands else list(COMMANDS)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["commands"]
+
+    print(f"{'command':<10} {'wall':>9} {'import':>9} {'baseline':>9}  heavy modules")
+    results, failures = {}, []
+    for name in names:
+        command, data_only = COMMANDS[name]
+        row = results[name] = measure(command, args.repeat)
+        base = baseline.get(name, {}).get("import_ms")
+        print(f"{name:<10} {row['wall_ms']:>7.1f}ms {row['import_ms']:>7.1f}ms "
+              f"{f'{base:.1f}ms' if base is not None else '-':>9}  {', '.join(row['heavy']) or '-'}")
+        if data_only and row["heavy"]:
+            failures.append(f"{name}: imports {', '.join(row['heavy'])}")
+        if base is not None and row["import_ms"] > base * (1 + args.tolerance) + args.slack_ms:
+            failures.append(f"{name}: import {row['import_ms']:.1f}ms > baseline {base:.1f}ms")
+        if data_only and args.budget_ms is not None and row["import_ms"] > args.budget_ms:
+            failures.append(f"{name}: import {row['import_ms']:.1f}ms > budget {args.budget_ms:.1f}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "commands": results},
+                      f, indent=2)
+
+    for failure in failures:
+        print(f"Regression: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
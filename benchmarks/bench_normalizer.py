@@ -0,0 +1,107 @@
+# benchmarks/bench_normalizer.py
+# TextNormalizer 처리량(MB/s)을 설정 조합별로 측정하고, 기존 구현과 출력이 동일한지 확인한다.
+#   python benchmarks/bench_normalizer.py [--data training_data] [--repeat 5] [--output bench.json]
+import argparse
+import glob
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import emoji
+from converter import NormalizationConfig, TextNormalizer
+
+
+def reference_normalize(config: NormalizationConfig, text: str) -> str:
+    # 최적화 이전의 TextNormalizer.normalize
+    if not text:
+        return text
+    if config.remove_emojis:
+        text = emoji.replace_emoji(text, '')
+    if config.normalize_punctuation:
+        text = re.sub(r'[.]{2,}', '...', text)
+        text = re.sub(r'([!?])\1+', r'\1', text)
+        text = re.sub(r'\s*([.,!?])\s*', r'\1 ', text)
+    if config.normalize_whitespace:
+        text = ' '.join(text.split())
+    return text.strip()
+
+
+def load_texts(data_dir: str) -> List[str]:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.jsonl"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                texts.extend(m["content"] for m in json.loads(line)["messages"])
+
+    # 이모지, 반복 문장부호, 공백 경계 사례를 섞은 변형
+    texts += [
+        f"  {t[:200]}!!! 정말?? 😀👍🏽 👨‍👩‍👧 #️⃣ 1️⃣ ©...... \t\n 끝 .  " for t in texts[:50]
+    ]
+    texts += ["", " ", "...", "??!!", "😀", "a‍b", "️앞", "x . , ! ? y"]
+    return texts
+
+
+def measure(fn: Callable[[], object], size: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return size / best / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TextNormalizer micro-benchmark")
+    parser.add_argument("--data", default="training_data")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.data)
+    size = sum(len(t.encode('utf-8')) for t in texts)
+    results = []
+    mismatches = 0
+
+    print(f"{len(texts)} texts, {size / 1e6:.2f} MB")
+    print(f"{'emoji':>6} {'punct':>6} {'space':>6} {'ref MB/s':>10} {'new MB/s':>10} {'batch MB/s':>11}")
+
+    for remove_emojis, punctuation, whitespace in itertools.product((False, True), repeat=3):
+        config = NormalizationConfig(remove_emojis=remove_emojis,
+                                     normalize_punctuation=punctuation,
+                                     normalize_whitespace=whitespace)
+        normalizer = TextNormalizer(config)
+
+        expected = [reference_normalize(config, t) for t in texts]
+        single = [normalizer.normalize(t) for t in texts]
+        batch = normalizer.normalize_batch(texts)
+        bad = sum(1 for e, s, b in zip(expected, single, batch) if not (e == s == b))
+        mismatches += bad
+
+        row = {
+            "config": {"remove_emojis": remove_emojis, "normalize_punctuation": punctuation,
+                       "normalize_whitespace": whitespace},
+            "reference_mb_s": measure(lambda: [reference_normalize(config, t) for t in texts], size, args.repeat),
+            "normalize_mb_s": measure(lambda: [normalizer.normalize(t) for t in texts], size, args.repeat),
+            "normalize_batch_mb_s": measure(lambda: normalizer.normalize_batch(texts), size, args.repeat),
+            "mismatches": bad
+        }
+        results.append(row)
+        print(f"{remove_emojis!s:>6} {punctuation!s:>6} {whitespace!s:>6} "
+              f"{row['reference_mb_s']:>10.1f} {row['normalize_mb_s']:>10.1f} {row['normalize_batch_mb_s']:>11.1f}"
+              + (f"  MISMATCH x{bad}" if bad else ""))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"texts": len(texts), "bytes": size, "results": results}, f, indent=2)
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
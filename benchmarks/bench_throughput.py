@@ -0,0 +1,155 @@
+# benchmarks/bench_throughput.py
+# 로컬 모의 서버(mock_server.py)를 상대로 전체 TOPICS 스윕을 동시성 수준별로 실행해
+# records/s, tokens/s와 요청 꼬리 지연을 측정한다. API 비용 없이 재현 가능한 처리량 비교용.
+#   python benchmarks/bench_throughput.py [--concurrency 1,4,8,16] [--num-sets 1] [--output bench.json]
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from accounting import UsageTracker
+from canned import CannedResponder
+from client import close_async_client, get_async_client
+from config import DEFAULT_CONFIG, HEDGE_CONFIG, HTTP_POOL_CONFIG, MOCK_SERVER_CONFIG, QUALITY_CONFIG, SYSTEM_PROMPTS, TOPICS
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from hedging import HedgePolicy
+from mock_server import MockOpenAIServer
+from ratelimit import AdaptiveRateLimiter
+from tracing import LatencyTracer
+
+
+async def run_level(concurrency: int, args, topics) -> Dict:
+    tracker = UsageTracker()
+    tracer = LatencyTracer()
+    hedge = HedgePolicy(budget_ratio=args.hedge_budget) if args.hedge else None
+    with tempfile.TemporaryDirectory() as output_dir:
+        engine = AsyncGenerationEngine(
+            get_async_client(), DataConverter(system_message=SYSTEM_PROMPTS["security_expert"]),
+            concurrency=concurrency, num_sets=args.num_sets, max_n=args.max_n, output_dir=output_dir,
+            limiter=AdaptiveRateLimiter(args.rpm, args.tpm), stream=not args.no_stream,
+            dedup=None, dedup_mode="off", tracker=tracker, tracer=tracer,
+            quality=dict(QUALITY_CONFIG, mode=args.quality, rejects_path=os.path.join(output_dir, "rejected.jsonl")),
+            hedge=hedge, deadline=args.deadline
+        )
+        log = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+                results = await engine.run(topics)
+        finally:
+            await close_async_client()
+        elapsed = time.perf_counter() - start
+
+    summary = tracer.summary()
+    latency = {stage: {k: summary[stage]["_all"][k] for k in ("p50", "p95", "p99")}
+               for stage in ("request", "ttft", "sample") if stage in summary}
+    total = tracker.total
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "requests": total.requests,
+        "records": total.records,
+        "rejected": sum(r.rejected for r in results),
+        "failed_topics": sum(1 for r in results if r.errors),
+        "completion_tokens": total.completion_tokens,
+        "records_per_sec": total.records / elapsed,
+        "tokens_per_sec": total.completion_tokens / elapsed,
+        "latency": latency,
+        "hedges": hedge.hedges if hedge else 0,
+        "hedge_wins": hedge.wins if hedge else 0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against the local mock server")
+    parser.add_argument("--concurrency", default="1,4,8,16", help="쉼표로 구분한 동시성 수준")
+    parser.add_argument("--num-sets", type=int, default=1)
+    parser.add_argument("--max-n", type=int, default=DEFAULT_CONFIG["max_n"],
+                        help="요청당 선택지 수 상한 (1이면 샘플마다 요청 하나)")
+    parser.add_argument("--topics", type=int, help="앞에서부터 사용할 주제 수 (기본값: 전체 TOPICS)")
+    parser.add_argument("--data", default="training_data", help="모의 서버가 재생할 대화 디렉터리")
+    parser.add_argument("--latency", type=float, default=MOCK_SERVER_CONFIG["latency"])
+    parser.add_argument("--latency-jitter", type=float, default=MOCK_SERVER_CONFIG["latency_jitter"])
+    parser.add_argument("--chunk-chars", type=int, default=MOCK_SERVER_CONFIG["chunk_chars"])
+    parser.add_argument("--chunk-delay", type=float, default=MOCK_SERVER_CONFIG["chunk_delay"])
+    parser.add_argument("--rate-limit-rate", type=float, default=MOCK_SERVER_CONFIG["rate_limit_rate"])
+    parser.add_argument("--server-error-rate", type=float, default=MOCK_SERVER_CONFIG["server_error_rate"])
+    parser.add_argument("--slow-rate", type=float, default=MOCK_SERVER_CONFIG["slow_rate"],
+                        help="첫 토큰이 --slow-latency만큼 늦는 요청 비율 (느린 복제본 재현)")
+    parser.add_argument("--slow-latency", type=float, default=MOCK_SERVER_CONFIG["slow_latency"])
+    parser.add_argument("--hedge", action="store_true", help="느린 요청 복제를 켜고 측정")
+    parser.add_argument("--hedge-budget", type=float, default=HEDGE_CONFIG["budget_ratio"],
+                        help="주 요청 수 대비 최대 복제 비율")
+    parser.add_argument("--deadline", type=float, default=HTTP_POOL_CONFIG["deadline"],
+                        help="요청 시도 하나의 전체 제한 시간(초, 0이면 제한 없음)")
+    parser.add_argument("--rpm", type=float, default=1e6, help="클라이언트 측 요청 한도 (기본값: 사실상 무제한)")
+    parser.add_argument("--tpm", type=float, default=1e9, help="클라이언트 측 토큰 한도 (기본값: 사실상 무제한)")
+    parser.add_argument("--quality", choices=["repair", "reject", "off"], default="off",
+                        help="품질 검사 모드 (재생 대화는 프롬프트 요구사항과 다를 수 있어 기본값은 off)")
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--seed", type=int, default=MOCK_SERVER_CONFIG["seed"])
+    parser.add_argument("--verbose", action="store_true", help="엔진 출력을 그대로 표시")
+    parser.add_argument("--output", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    topics = TOPICS[:args.topics] if args.topics else TOPICS
+    server = MockOpenAIServer("127.0.0.1", 0, CannedResponder(args.data), args.latency, args.latency_jitter,
+                              args.chunk_chars, args.chunk_delay, args.rate_limit_rate, args.server_error_rate,
+                              slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=args.seed)
+    os.environ["OPENAI_BASE_URL"] = server.start()
+    os.environ["OPENAI_API_KEY"] = "mock"
+
+    print(f"{len(topics)} topics x {args.num_sets} sets, mock latency {args.latency}s "
+          f"(+{args.latency_jitter}s jitter, {args.slow_rate:.0%} slow +{args.slow_latency}s), "
+          f"stream={not args.no_stream}, hedge={args.hedge}")
+    print(f"{'conc':>5} {'secs':>7} {'rec/s':>7} {'tok/s':>9} {'req p50':>8} {'req p95':>8} {'req p99':>8} "
+          f"{'smp p99':>8} {'429':>5} {'5xx':>5} {'hedges':>7}")
+    results: List[Dict] = []
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(',')):
+            before = dict(server.stats)
+            row = asyncio.run(run_level(concurrency, args, topics))
+            row["rate_limited"] = server.stats["429"] - before.get("429", 0)
+            row["server_errors"] = sum(server.stats[c] - before.get(c, 0) for c in ("500", "503"))
+            results.append(row)
+            request = row["latency"].get("request", {"p50": 0, "p95": 0, "p99": 0})
+            sample = row["latency"].get("sample", {"p99": 0})
+            print(f"{concurrency:>5} {row['seconds']:>7.2f} {row['records_per_sec']:>7.1f} "
+                  f"{row['tokens_per_sec']:>9.0f} {request['p50'] * 1000:>6.0f}ms {request['p95'] * 1000:>6.0f}ms "
+                  f"{request['p99'] * 1000:>6.0f}ms {sample['p99'] * 1000:>6.0f}ms "
+                  f"{row['rate_limited']:>5} {row['server_errors']:>5} {row['hedges']:>3}/{row['hedge_wins']:<3}")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"topics": len(topics), "num_sets": args.num_sets, "stream": not args.no_stream,
+                       "mock": {"latency": args.latency, "latency_jitter": args.latency_jitter,
+                                "chunk_chars": args.chunk_chars, "chunk_delay": args.chunk_delay,
+                                "rate_limit_rate": args.rate_limit_rate,
+                                "server_error_rate": args.server_error_rate,
+                                "slow_rate": args.slow_rate, "slow_latency": args.slow_latency},
+                       "hedge": args.hedge, "hedge_budget": args.hedge_budget, "deadline": args.deadline,
+                       "max_n": args.max_n,
+                       "results": results}, f, indent=2)
+
+    incomplete = [r["concurrency"] for r in results if r["failed_topics"]]
+    if incomplete:
+        print(f"Topics failed at concurrency {', '.join(map(str, incomplete))}")
+    rejected = sum(r["rejected"] for r in results)
+    if rejected:
+        print(f"{rejected} conversations rejected by the quality gate")
+    return 1 if incomplete else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
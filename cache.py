@@ -0,0 +1,158 @@
+# cache.py
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config import CACHE_CONFIG
+from corpus_index import index_path
+from prompts import build_messages
+
+
+def request_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any], sample: int) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params, "sample": sample},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def run_signature(model: str, params: Dict[str, Any],
+                  topics: Sequence[Tuple[str, str]], num_sets: int) -> str:
+    # 주제 목록 대신 실제로 보낼 메시지를 해시해 키워드나 프롬프트 템플릿이 바뀌면 새 실행으로 본다
+    payload = json.dumps(
+        {"model": model, "params": params, "num_sets": num_sets,
+         "topics": [[prefix, build_messages(topic, prefix)] for topic, prefix in topics]},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _write_json_atomic(path: str, data: Any):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str = CACHE_CONFIG["dir"],
+                 max_bytes: int = CACHE_CONFIG["max_bytes"],
+                 max_age_days: float = CACHE_CONFIG["max_age_days"]):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # 최근 사용 시각을 갱신해 용량 기반 제거 시 LRU 순서가 되도록 한다
+        os.utime(path)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_json_atomic(path, entry)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> int:
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total = 0
+        # 최신 항목부터 용량을 채우고, 만료되었거나 한도를 넘는 항목은 제거
+        for mtime, size, path in sorted(entries, reverse=True):
+            if now - mtime > self.max_age or total + size > self.max_bytes:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            else:
+                total += size
+        return removed
+
+
+class RunManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.samples: Dict[str, str] = {}
+        self.outputs: Dict[str, List[str]] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.samples = data.get("samples", {})
+            self.outputs = data.get("outputs", {})
+
+    @classmethod
+    def for_run(cls, run_id: str, manifest_dir: str = CACHE_CONFIG["manifest_dir"], fresh: bool = False) -> "RunManifest":
+        os.makedirs(manifest_dir, exist_ok=True)
+        path = os.path.join(manifest_dir, f"{run_id}.json")
+        if fresh and os.path.exists(path):
+            # 이전 출력을 남겨 두면 다시 생성한 레코드가 새 샤드에 중복으로 쌓인다
+            removed = cls(path).remove_outputs()
+            if removed:
+                print(f"Removed {len(removed)} output files from the previous run")
+            os.remove(path)
+        return cls(path)
+
+    def remove_outputs(self) -> List[str]:
+        removed = []
+        for output_files in self.outputs.values():
+            for shard_path in output_files:
+                for path in (shard_path, index_path(shard_path)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                        removed.append(path)
+        self.outputs = {}
+        return removed
+
+    def is_done(self, prefix: str, sample: int) -> bool:
+        return f"{prefix}:{sample}" in self.samples
+
+    def mark_done(self, prefix: str, samples: List[Tuple[int, str]]):
+        for sample, key in samples:
+            self.samples[f"{prefix}:{sample}"] = key
+        self.save()
+
+    def output_files(self, prefix: str) -> List[str]:
+        return self.outputs.get(prefix, [])
+
+    def add_output_files(self, prefix: str, output_files: List[str]):
+        self.outputs.setdefault(prefix, []).extend(output_files)
+        self.save()
+
+    def save(self):
+        _write_json_atomic(self.path, {"samples": self.samples, "outputs": self.outputs})
@@ -0,0 +1,58 @@
+# canned.py
+# training_data의 대화를 API 응답처럼 재생하는 오프라인 응답기 (배치 스탠드인, 모의 서버용)
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+from config import OPENAI_MODEL, OUTPUT_DIR
+from converter import list_jsonl_files, open_jsonl
+
+
+def load_canned_texts(data_dir: str = OUTPUT_DIR) -> List[str]:
+    texts = []
+    for path in list_jsonl_files(data_dir):
+        with open_jsonl(path) as f:
+            for line in f:
+                messages = json.loads(line)["messages"]
+                turns = [m for m in messages if m["role"] in ("user", "assistant")]
+                texts.append('\n'.join(
+                    f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in turns
+                ))
+    if not texts:
+        texts.append("User: 정보보안의 기본 원칙은 무엇인가요?\nAssistant: 기밀성, 무결성, 가용성입니다.")
+    return texts
+
+
+class CannedResponder:
+    def __init__(self, data_dir: str = OUTPUT_DIR):
+        self.texts = load_canned_texts(data_dir)
+        self.counter = 0
+
+    def pick(self, body: Dict, index: int = 0) -> str:
+        # 같은 요청에는 같은 대화를, 다른 샘플에는 다른 대화를 돌려준다
+        digest = hashlib.sha256(json.dumps(body, ensure_ascii=False, sort_keys=True).encode('utf-8')).digest()
+        return self.texts[(int.from_bytes(digest[:4], "big") + index) % len(self.texts)]
+
+    def completion(self, body: Dict, salt: Optional[str] = None) -> Dict:
+        self.counter += 1
+        n = body.get("n", 1)
+        keyed = dict(body, salt=salt) if salt is not None else body
+        contents = [self.pick(keyed, i) for i in range(n)]
+        prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 2
+        completion_tokens = sum(len(c) for c in contents) // 2
+
+        return {
+            "id": f"chatcmpl-canned-{self.counter}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", OPENAI_MODEL),
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": c}, "finish_reason": "stop"}
+                for i, c in enumerate(contents)
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
@@ -0,0 +1,61 @@
+# client.py
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+from config import HTTP_POOL_CONFIG, RATE_LIMIT_CONFIG
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_env_loaded = False
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_CONFIG["max_connections"],
+        max_keepalive_connections=HTTP_POOL_CONFIG["max_keepalive_connections"],
+        keepalive_expiry=HTTP_POOL_CONFIG["keepalive_expiry"]
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_POOL_CONFIG["timeout"], connect=HTTP_POOL_CONFIG["connect_timeout"])
+
+
+def get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _load_env()
+        _client = OpenAI(
+            timeout=_timeout(),
+            max_retries=RATE_LIMIT_CONFIG["max_retries"],
+            http_client=httpx.Client(limits=_limits(), timeout=_timeout())
+        )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        _load_env()
+        # 재시도는 ratelimit.call_with_retries가 담당하므로 SDK 자체 재시도는 끈다
+        _async_client = AsyncOpenAI(
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
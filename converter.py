@@ -1,8 +1,12 @@
 from dataclasses import dataclass
+import glob
+import gzip
+import io
 import json
+import os
 import re
-import emoji
-from typing import List, Dict
+from typing import List, Dict, Optional
+from corpus_index import ShardIndexWriter, index_path
 
 @dataclass
 class NormalizationConfig:
@@ -11,43 +15,308 @@ class NormalizationConfig:
     normalize_whitespace: bool = True
     max_consecutive_chars: int = 3
 
+_MULTIPLE_DOTS = re.compile(r'[.]{2,}')  # 여러 개의 마침표를 ...으로
+_REPEATED_MARKS = re.compile(r'([!?])\1+')  # 반복되는 ! 또는 ?를 하나로
+_PUNCT_SPACING = re.compile(r'(?=[\s.,!?])\s*+([.,!?])\s*+')  # 문장부호 주변 공백 정규화
+_PUNCT_CHARS = frozenset('.,!?')
+
+# json.dump는 조각 단위로 write를 호출하므로, 한 번에 인코딩하는 인코더를 재사용한다 (출력 형식은 동일)
+_encoder = json.JSONEncoder(ensure_ascii=False)
+JSONL_SUFFIXES = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+
+# emoji 패키지는 이모지 제거를 쓸 때만 불러온다 (데이터 명령의 시작 시간 단축)
+_emoji = None
+_emoji_chars = None
+_emoji_starts = None
+_emoji_max_len = 0
+# 태그 문자(U+E0020–U+E007F)는 깃발 하위 구역 시퀀스를 이룬다
+_TAG_CHARS = re.compile('[\U000e0020-\U000e007f]')
+
+
+def _load_emoji_tables():
+    global _emoji, _emoji_chars, _emoji_starts, _emoji_max_len
+    if _emoji_chars is None:
+        import emoji
+        _emoji = emoji
+        keys = emoji.EMOJI_DATA.keys()
+        _emoji_max_len = max(len(k) for k in keys)
+        _emoji_starts = re.compile('|'.join(sorted({re.escape(k[0]) for k in keys}, key=len, reverse=True)))
+        # 모든 이모지 시퀀스는 비ASCII 문자를 하나 이상 포함하므로 이 집합과 겹치지 않으면 제거할 것이 없다
+        _emoji_chars = frozenset(c for k in keys for c in k if not c.isascii())
+
+
+def strip_emoji(text: str) -> str:
+    _load_emoji_tables()
+    if _emoji_chars.isdisjoint(text):
+        return text
+
+    # ZWJ 시퀀스, 변형 선택자(U+FE0F), 태그 시퀀스는 emoji 패키지의 토크나이저 규칙을 그대로 따른다
+    if '\u200d' in text or '\ufe0f' in text or _TAG_CHARS.search(text):
+        return _emoji.replace_emoji(text, '')
+
+    # 후보 위치에서 가장 긴 이모지 시퀀스를 사전 조회로 찾는다 (leftmost-longest)
+    data = _emoji.EMOJI_DATA
+    parts = []
+    pos = 0
+    for match in _emoji_starts.finditer(text):
+        start = match.start()
+        if start < pos:
+            continue
+        for end in range(min(len(text), start + _emoji_max_len), start, -1):
+            if text[start:end] in data:
+                parts.append(text[pos:start])
+                pos = end
+                break
+
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
 class TextNormalizer:
     def __init__(self, config: NormalizationConfig):
         self.config = config
-        
+
+    def _normalize_punctuation(self, text: str) -> str:
+        if '..' in text:
+            text = _MULTIPLE_DOTS.sub('...', text)
+        if '!!' in text or '??' in text:
+            text = _REPEATED_MARKS.sub(r'\1', text)
+        if not _PUNCT_CHARS.isdisjoint(text):
+            text = _PUNCT_SPACING.sub(r'\1 ', text)
+        return text
+
     def normalize(self, text: str) -> str:
         if not text:
             return text
             
         if self.config.remove_emojis:
-            text = emoji.replace_emoji(text, '')
+            text = strip_emoji(text)
         
         if self.config.normalize_punctuation:
-            text = re.sub(r'[.]{2,}', '...', text)  # 여러 개의 마침표를 ...으로
-            text = re.sub(r'([!?])\1+', r'\1', text)  # 반복되는 ! 또는 ?를 하나로
-            text = re.sub(r'\s*([.,!?])\s*', r'\1 ', text)  # 문장부호 주변 공백 정규화
+            text = self._normalize_punctuation(text)
             
         if self.config.normalize_whitespace:
-            text = ' '.join(text.split())
+            # split/join 결과에는 앞뒤 공백이 남지 않으므로 strip이 필요 없다
+            return ' '.join(text.split())
             
         return text.strip()
 
+    def normalize_batch(self, texts: List[str]) -> List[str]:
+        normalize = self.normalize
+        return [normalize(text) for text in texts]
+
+def encode_record(record: Dict) -> str:
+    return _encoder.encode(record) + '\n'
+
+def validate_messages(messages) -> List[str]:
+    # DataConverter가 만드는 레이아웃: system 메시지 뒤에 user/assistant가 번갈아 나온다
+    if not isinstance(messages, list) or not messages:
+        return ["messages must be a non-empty list"]
+
+    errors = []
+    for i, message in enumerate(messages):
+        if not isinstance(message, dict):
+            errors.append(f"message {i} is not an object")
+            continue
+
+        expected = "system" if i == 0 else ("user" if i % 2 == 1 else "assistant")
+        if message.get("role") != expected:
+            errors.append(f"message {i} has role {message.get('role')!r}, expected {expected!r}")
+        content = message.get("content")
+        if not isinstance(content, str) or not content.strip():
+            errors.append(f"message {i} has empty content")
+
+    if len(messages) < 3:
+        errors.append("conversation has no user/assistant turns")
+    elif len(messages) % 2 == 0:
+        errors.append("conversation does not end with an assistant message")
+    return errors
+
 class DataConverter:
     def __init__(self, system_message: str = "You are a helpful assistant."):
         self.system_message = system_message
         self.normalizer = TextNormalizer(NormalizationConfig())
         
+    def to_messages(self, conv: List[str]) -> List[Dict[str, str]]:
+        messages = [{"role": "system", "content": self.system_message}]
+
+        for i, text in enumerate(conv):
+            role = "user" if i % 2 == 0 else "assistant"
+            messages.append({
+                "role": role,
+                "content": self.normalizer.normalize(text)
+            })
+
+        return messages
+
+    def encode(self, conv: List[str]) -> str:
+        return encode_record({"messages": self.to_messages(conv)})
+
+    def write_jsonl(self, conversations: List[List[str]], f):
+        f.write(''.join(self.encode(conv) for conv in conversations))
+
     def save_to_jsonl(self, conversations: List[List[str]], output_file: str):
         with open(output_file, 'w', encoding='utf-8') as f:
-            for conv in conversations:
-                messages = [{"role": "system", "content": self.system_message}]
-                
-                for i, text in enumerate(conv):
-                    role = "user" if i % 2 == 0 else "assistant"
-                    messages.append({
-                        "role": role,
-                        "content": self.normalizer.normalize(text)
-                    })
-                    
-                json.dump({"messages": messages}, f, ensure_ascii=False)
-                f.write('\n')
\ No newline at end of file
+            self.write_jsonl(conversations, f)
+
+    def append_to_jsonl(self, conversations: List[List[str]], output_file: str):
+        with open(output_file, 'a', encoding='utf-8') as f:
+            self.write_jsonl(conversations, f)
+
+    def open_writer(self, base_path: str, **kwargs) -> "ShardedJsonlWriter":
+        return ShardedJsonlWriter(self, base_path, **kwargs)
+
+
+def open_compressed(path: str, mode: str, compression: Optional[str]):
+    if compression == "gzip":
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression requires the 'zstandard' package") from e
+        if 'r' in mode:
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    return open(path, mode)
+
+
+def compression_for(path: str) -> Optional[str]:
+    if path.endswith('.gz'):
+        return "gzip"
+    if path.endswith('.zst'):
+        return "zstd"
+    return None
+
+
+def open_jsonl(path: str):
+    # 압축 여부와 관계없이 텍스트 모드로 JSONL 샤드를 연다
+    return io.TextIOWrapper(open_compressed(path, 'rb', compression_for(path)), encoding='utf-8')
+
+
+def list_jsonl_files(directory: str) -> List[str]:
+    paths = []
+    for suffix in JSONL_SUFFIXES:
+        paths.extend(glob.glob(os.path.join(directory, f"*{suffix}")))
+    return sorted(paths)
+
+
+class ShardedJsonlWriter:
+    SUFFIXES = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+    def __init__(self, converter: DataConverter, base_path: str,
+                 max_records: Optional[int] = None, max_bytes: Optional[int] = None,
+                 compression: Optional[str] = None, append: bool = True,
+                 buffer_size: int = 1024 * 1024, index: bool = True, prefix: Optional[str] = None):
+        if compression not in self.SUFFIXES:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.converter = converter
+        self.base_path = base_path
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.buffer_size = buffer_size
+        # 압축 샤드는 바이트 오프셋으로 임의 접근할 수 없으므로 인덱스를 만들지 않는다
+        self.index = index and compression is None
+        self.prefix = prefix or os.path.basename(base_path)
+        self.index_writer: Optional[ShardIndexWriter] = None
+        self.shards: List[str] = []
+
+        # append 모드에서는 기존 샤드를 건드리지 않고 다음 번호부터 이어서 쓴다
+        self.next_index = self._last_index() + 1 if append else 0
+        self.file = None
+        self.path: Optional[str] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.records = 0
+        self.bytes = 0
+
+    def _last_index(self) -> int:
+        last = -1
+        pattern = re.compile(re.escape(os.path.basename(self.base_path)) + r'-(\d{5})\.jsonl')
+        for path in glob.glob(f"{glob.escape(self.base_path)}-*.jsonl*"):
+            match = pattern.match(os.path.basename(path))
+            if match:
+                last = max(last, int(match.group(1)))
+        return last
+
+    def _open_shard(self):
+        self.path = f"{self.base_path}-{self.next_index:05d}{self.SUFFIXES[self.compression]}"
+        self.next_index += 1
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open_compressed(f"{self.path}.tmp", 'wb', self.compression)
+        if self.index:
+            self.index_writer = ShardIndexWriter(f"{index_path(self.path)}.tmp", self.prefix)
+        self.records = 0
+        self.bytes = 0
+
+    def _flush(self):
+        if self.buffer:
+            self.file.write(b''.join(self.buffer))
+            self.buffer = []
+            self.buffered = 0
+
+    def _close_shard(self):
+        self._flush()
+        self.file.close()
+        # 닫힌 샤드만 최종 이름으로 바꿔 중단 시 잘린 파일이 남지 않게 한다
+        os.replace(f"{self.path}.tmp", self.path)
+        if self.index_writer is not None:
+            self.index_writer.close()
+            os.replace(f"{index_path(self.path)}.tmp", index_path(self.path))
+            self.index_writer = None
+        self.shards.append(self.path)
+        self.file = None
+
+    def write_line(self, line: str, turns: int = 0, chars: int = 0):
+        if self.file is None:
+            self._open_shard()
+
+        data = line.encode('utf-8')
+        if self.index_writer is not None:
+            self.index_writer.add(len(data), turns, chars)
+        self.buffer.append(data)
+        self.buffered += len(data)
+        self.records += 1
+        self.bytes += len(data)
+        if self.buffered >= self.buffer_size:
+            self._flush()
+
+        if (self.max_records and self.records >= self.max_records) or \
+                (self.max_bytes and self.bytes >= self.max_bytes):
+            self._close_shard()
+
+    def write(self, conv: List[str]):
+        messages = self.converter.to_messages(conv)
+        self.write_line(encode_record({"messages": messages}), len(conv),
+                        sum(len(m["content"]) for m in messages[1:]))
+
+    def write_many(self, conversations: List[List[str]]):
+        for conv in conversations:
+            self.write(conv)
+
+    def close(self) -> List[str]:
+        if self.file is not None:
+            self._close_shard()
+        return self.shards
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            os.remove(f"{self.path}.tmp")
+            self.file = None
+        if self.index_writer is not None:
+            self.index_writer.close()
+            os.remove(f"{index_path(self.path)}.tmp")
+            self.index_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
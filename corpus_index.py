@@ -0,0 +1,304 @@
+# corpus_index.py
+# JSONL 샤드 옆에 두는 바이트 오프셋 인덱스(<shard>.idx).
+# 전체 파일을 파싱하지 않고 mmap으로 임의 접근, 주제별 층화 샘플링, train/validation 분할을 한다.
+#   python corpus_index.py build [training_data]
+#   python corpus_index.py stats [training_data]
+#   python corpus_index.py sample N [training_data] [--per-topic] [--seed S] [--output FILE]
+#   python corpus_index.py split [training_data] [--val-ratio 0.05] [--seed S] [--output-dir DIR]
+import argparse
+import bisect
+import glob
+import hashlib
+import json
+import mmap
+import os
+import random
+import re
+import struct
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import OUTPUT_DIR
+
+MAGIC = b"DWIDX1\0\0"
+HEADER = struct.Struct("<8s56s")  # 매직, 주제 prefix (UTF-8, NUL 패딩)
+ENTRY = struct.Struct("<QIII")  # 레코드 오프셋, 바이트 길이, 턴 수, 글자 수
+
+# <prefix>[.<worker>][-NNNNN|_타임스탬프].jsonl (worker는 jobqueue 워커별 샤드 이름)
+_SHARD_SUFFIX = re.compile(r'(\.[0-9A-Za-z]+)?(-\d{5}|_\d{8,14})?\.jsonl$')
+
+
+def index_path(shard_path: str) -> str:
+    return f"{shard_path}.idx"
+
+
+def prefix_from_path(shard_path: str) -> str:
+    return _SHARD_SUFFIX.sub('', os.path.basename(shard_path))
+
+
+def record_stats(record: Dict) -> Tuple[int, int]:
+    turns = [m for m in record.get("messages", []) if m.get("role") != "system"]
+    return len(turns), sum(len(m.get("content") or "") for m in turns)
+
+
+class ShardIndexWriter:
+    def __init__(self, path: str, prefix: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, prefix.encode('utf-8')[:56]))
+        self.offset = 0
+
+    def add(self, length: int, turns: int, chars: int):
+        self.file.write(ENTRY.pack(self.offset, length, turns, chars))
+        self.offset += length
+
+    def close(self):
+        self.file.close()
+
+
+class ShardIndex:
+    def __init__(self, shard_path: str):
+        self.shard_path = shard_path
+        with open(index_path(shard_path), 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, prefix = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path(shard_path)} is not a shard index")
+        self.prefix = prefix.rstrip(b"\0").decode('utf-8')
+        self.count = (len(self.mm) - HEADER.size) // ENTRY.size
+        self._data = None
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, i: int) -> Tuple[int, int, int, int]:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return ENTRY.unpack_from(self.mm, HEADER.size + i * ENTRY.size)
+
+    def read(self, i: int) -> bytes:
+        offset, length, _, _ = self.entry(i)
+        if self._data is None:
+            with open(self.shard_path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data[offset:offset + length]
+
+    def record(self, i: int) -> Dict:
+        return json.loads(self.read(i))
+
+    def close(self):
+        self.mm.close()
+        if self._data is not None:
+            self._data.close()
+
+
+def build_index(shard_path: str, prefix: Optional[str] = None) -> int:
+    # 인덱스 없이 쓰인 기존 JSONL 샤드에 인덱스를 만든다
+    tmp_path = f"{index_path(shard_path)}.tmp"
+    writer = ShardIndexWriter(tmp_path, prefix or prefix_from_path(shard_path))
+    count = 0
+    with open(shard_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                turns, chars = record_stats(json.loads(line))
+            else:
+                turns = chars = 0
+            writer.add(len(line), turns, chars)
+            count += 1
+    writer.close()
+    os.replace(tmp_path, index_path(shard_path))
+    return count
+
+
+def _permutation(n: int, seed: int) -> Iterator[int]:
+    # 4라운드 Feistel 네트워크와 cycle walking으로 0..n-1의 순열을 O(1) 메모리로 만든다
+    if n <= 0:
+        return
+    bits = max(2, (n - 1).bit_length() + ((n - 1).bit_length() & 1))
+    half = bits // 2
+    mask = (1 << half) - 1
+    keys = [int.from_bytes(hashlib.blake2b(f"{seed}:{r}".encode(), digest_size=8).digest(), "big") for r in range(4)]
+
+    def encrypt(x: int) -> int:
+        left, right = x >> half, x & mask
+        for key in keys:
+            left, right = right, left ^ (((right * 0x9E3779B1) ^ key) * 0x85EBCA6B >> 7 & mask)
+        return (left << half) | right
+
+    for i in range(1 << bits):
+        x = encrypt(i)
+        if x < n:
+            yield x
+
+
+class CorpusIndex:
+    def __init__(self, directory: str = OUTPUT_DIR, build_missing: bool = False):
+        # build_missing이 False면 디렉터리에 아무것도 쓰지 않고, 인덱스가 없거나 오래된 샤드는 unindexed에 둔다
+        self.shards: List[ShardIndex] = []
+        self.unindexed: List[str] = []
+        for shard_path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+            if not os.path.exists(index_path(shard_path)) or \
+                    os.path.getmtime(index_path(shard_path)) < os.path.getmtime(shard_path):
+                if not build_missing:
+                    self.unindexed.append(shard_path)
+                    continue
+                build_index(shard_path)
+            self.shards.append(ShardIndex(shard_path))
+
+        self.starts = []
+        total = 0
+        for shard in self.shards:
+            self.starts.append(total)
+            total += len(shard)
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def locate(self, record_id: int) -> Tuple[ShardIndex, int]:
+        if not 0 <= record_id < self.total:
+            raise IndexError(record_id)
+        shard_no = bisect.bisect_right(self.starts, record_id) - 1
+        return self.shards[shard_no], record_id - self.starts[shard_no]
+
+    def read(self, record_id: int) -> bytes:
+        shard, i = self.locate(record_id)
+        return shard.read(i)
+
+    def record(self, record_id: int) -> Dict:
+        return json.loads(self.read(record_id))
+
+    def topics(self) -> Dict[str, List[int]]:
+        # 주제별 샤드 번호 목록 (레코드 단위가 아니므로 샤드 수에 비례하는 메모리만 쓴다)
+        topics = defaultdict(list)
+        for shard_no, shard in enumerate(self.shards):
+            topics[shard.prefix].append(shard_no)
+        return topics
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        stats = defaultdict(Counter)
+        for shard in self.shards:
+            entry = stats[shard.prefix]
+            for i in range(len(shard)):
+                _, length, turns, chars = shard.entry(i)
+                entry["records"] += 1
+                entry["bytes"] += length
+                entry["turns"] += turns
+                entry["chars"] += chars
+        # 인덱스가 없는 샤드는 인덱스를 만들지 않고 직접 읽어서 센다
+        for shard_path in self.unindexed:
+            entry = stats[prefix_from_path(shard_path)]
+            with open(shard_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        turns, chars = record_stats(json.loads(line))
+                        entry["records"] += 1
+                        entry["bytes"] += len(line)
+                        entry["turns"] += turns
+                        entry["chars"] += chars
+        return {prefix: {key: counter[key] for key in ("records", "bytes", "turns", "chars")}
+                for prefix, counter in sorted(stats.items())}
+
+    def shuffled(self, seed: int = 0) -> Iterator[int]:
+        return _permutation(self.total, seed)
+
+    def sample(self, n: int, seed: int = 0, per_topic: bool = False) -> List[int]:
+        rng = random.Random(seed)
+        if not per_topic:
+            return rng.sample(range(self.total), min(n, self.total))
+
+        # 주제별로 같은 수를 뽑되, 레코드가 부족한 주제의 몫은 다른 주제에 나눈다
+        topics = self.topics()
+        sizes = {prefix: sum(len(self.shards[s]) for s in shard_nos) for prefix, shard_nos in topics.items()}
+        quota = {}
+        remaining = min(n, self.total)
+        pending = sorted(sizes, key=sizes.get)
+        while pending:
+            prefix = pending.pop(0)
+            quota[prefix] = min(sizes[prefix], -(-remaining // (len(pending) + 1)))
+            remaining -= quota[prefix]
+
+        sampled = []
+        for prefix, shard_nos in topics.items():
+            ends = []
+            for shard_no in shard_nos:
+                ends.append((ends[-1] if ends else 0) + len(self.shards[shard_no]))
+            for k in rng.sample(range(sizes[prefix]), quota[prefix]):
+                j = bisect.bisect_right(ends, k)
+                sampled.append(self.starts[shard_nos[j]] + k - (ends[j - 1] if j else 0))
+        rng.shuffle(sampled)
+        return sampled
+
+    def split(self, val_ratio: float, seed: int = 0) -> Iterator[Tuple[int, bool]]:
+        # 레코드 위치의 해시로 나누므로 같은 시드면 매번 같은 분할이 나온다
+        threshold = int(val_ratio * (1 << 64))
+        for shard_no, shard in enumerate(self.shards):
+            name = os.path.basename(shard.shard_path)
+            for i in range(len(shard)):
+                digest = hashlib.blake2b(f"{seed}:{name}:{i}".encode(), digest_size=8).digest()
+                yield self.starts[shard_no] + i, int.from_bytes(digest, "big") < threshold
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Byte-offset index for JSONL shards")
+    parser.add_argument("command", choices=["build", "stats", "sample", "split"])
+    parser.add_argument("args", nargs="*", help="sample: N [DIR], 그 외: [DIR]")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--per-topic", action="store_true", help="주제별로 같은 수를 샘플링")
+    parser.add_argument("--val-ratio", type=float, default=0.05)
+    parser.add_argument("--output", help="sample 결과 JSONL 경로 (기본값: 표준 출력)")
+    parser.add_argument("--output-dir", default="splits")
+    args = parser.parse_args(argv)
+
+    positional = list(args.args)
+    count = int(positional.pop(0)) if args.command == "sample" else 0
+    directory = positional[0] if positional else OUTPUT_DIR
+
+    if args.command == "build":
+        for shard_path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+            print(f"{index_path(shard_path)}: {build_index(shard_path)} records")
+        return 0
+
+    # 임의 접근이 필요한 sample/split만 빠진 인덱스를 만든다. stats는 읽기만 한다
+    with CorpusIndex(directory, build_missing=args.command != "stats") as corpus:
+        if args.command == "stats":
+            stats = corpus.stats()
+            for prefix, entry in stats.items():
+                print(f"{prefix}: {entry['records']} records, {entry['turns']} turns, "
+                      f"{entry['chars']} chars, {entry['bytes']} bytes")
+            print(f"total: {sum(e['records'] for e in stats.values())} records in "
+                  f"{len(corpus.shards) + len(corpus.unindexed)} shards")
+        elif args.command == "sample":
+            out = open(args.output, 'wb') if args.output else None
+            for record_id in corpus.sample(count, args.seed, args.per_topic):
+                line = corpus.read(record_id).rstrip(b"\n") + b"\n"
+                if out:
+                    out.write(line)
+                else:
+                    print(line.decode('utf-8'), end='')
+            if out:
+                out.close()
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+            with open(os.path.join(args.output_dir, "train.jsonl"), 'wb') as train, \
+                    open(os.path.join(args.output_dir, "validation.jsonl"), 'wb') as val:
+                counts = Counter()
+                for record_id, is_val in corpus.split(args.val_ratio, args.seed):
+                    (val if is_val else train).write(corpus.read(record_id).rstrip(b"\n") + b"\n")
+                    counts["validation" if is_val else "train"] += 1
+            print(f"train: {counts['train']}, validation: {counts['validation']} -> {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+# dedup.py
+# 정규화된 assistant 턴에 대한 MinHash/LSH 인덱스로 유사 중복 대화를 찾는다.
+#   python dedup.py [training_data] [--threshold 0.8] [--rewrite] [--index PATH]
+import argparse
+import json
+import os
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from config import DEDUP_CONFIG, OUTPUT_DIR
+from converter import NormalizationConfig, TextNormalizer, list_jsonl_files, open_jsonl
+
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15
+_EMPTY = _MASK64
+
+_normalizer = TextNormalizer(NormalizationConfig())
+
+
+def conversation_text(conversation: List[str]) -> str:
+    # DataConverter 레이아웃에서 홀수 번째 턴이 assistant 답변이다
+    return '\n'.join(_normalizer.normalize(text) for text in conversation[1::2])
+
+
+def record_text(messages: List[Dict[str, str]]) -> str:
+    return '\n'.join(m.get("content") or "" for m in messages if m.get("role") == "assistant")
+
+
+class MinHashLSH:
+    def __init__(self, num_perm: int = DEDUP_CONFIG["num_perm"],
+                 bands: int = DEDUP_CONFIG["bands"],
+                 threshold: float = DEDUP_CONFIG["threshold"],
+                 shingle_bytes: int = DEDUP_CONFIG["shingle_bytes"],
+                 path: Optional[str] = None):
+        if num_perm & (num_perm - 1) or num_perm % bands:
+            raise ValueError("num_perm must be a power of two divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_bytes = shingle_bytes
+        self.bin_bits = num_perm.bit_length() - 1
+        self.path = path
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._insert(entry["id"], tuple(entry["sig"]))
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        # one-permutation hashing: 각 shingle 해시를 한 번만 계산해 상위 비트로 bin을 고르고
+        # bin별 최솟값을 취한 뒤, 빈 bin은 다음 bin 값을 빌려 채운다 (rotation densification)
+        data = text.encode('utf-8')
+        k = self.shingle_bytes
+        shift = 64 - self.bin_bits
+        sig = [_EMPTY] * self.num_perm
+
+        for i in range(max(1, len(data) - k + 1)):
+            h = (zlib.crc32(data[i:i + k]) * _MIX) & _MASK64
+            b = h >> shift
+            v = h & ((1 << shift) - 1)
+            if v < sig[b]:
+                sig[b] = v
+
+        if _EMPTY in sig and any(v != _EMPTY for v in sig):
+            for b in range(self.num_perm):
+                step = 1
+                while sig[b] == _EMPTY:
+                    donor = sig[(b + step) % self.num_perm]
+                    if donor != _EMPTY:
+                        sig[b] = donor + step
+                    step += 1
+        return tuple(sig)
+
+    def _band_keys(self, sig: Tuple[int, ...]):
+        rows = self.rows
+        return [hash(sig[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def _insert(self, doc_id: str, sig: Tuple[int, ...]):
+        self.signatures[doc_id] = sig
+        for band, key in enumerate(self._band_keys(sig)):
+            self.buckets[band][key].append(doc_id)
+
+    def similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+
+    def query(self, sig: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        best = None
+        seen = set()
+        for band, key in enumerate(self._band_keys(sig)):
+            for candidate in self.buckets[band].get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = self.similarity(sig, self.signatures[candidate])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (candidate, score)
+        return best
+
+    def add(self, doc_id: str, sig: Tuple[int, ...]):
+        self._insert(doc_id, sig)
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"id": doc_id, "sig": list(sig)}) + '\n')
+
+    def check_and_add(self, doc_id: str, text: str, add_duplicates: bool = False) -> Optional[Tuple[str, float]]:
+        # 같은 ID(예: 캐시에서 다시 읽은 동일 요청)는 자기 자신과 비교하지 않는다
+        if doc_id in self.signatures:
+            return None
+        sig = self.signature(text)
+        match = self.query(sig)
+        if match is None or add_duplicates:
+            self.add(doc_id, sig)
+        return match
+
+    def __len__(self):
+        return len(self.signatures)
+
+
+def dedup_corpus(paths: List[str], index: MinHashLSH, rewrite: bool = False) -> int:
+    from reprocess import AtomicFileWriter
+
+    duplicates = 0
+    for path in paths:
+        writer = AtomicFileWriter(path) if rewrite else None
+        removed = 0
+        with open_jsonl(path) as f:
+            for line_no, line in enumerate(f):
+                if not line.strip():
+                    continue
+                doc_id = f"{os.path.basename(path)}:{line_no}"
+                match = index.check_and_add(doc_id, record_text(json.loads(line)["messages"]))
+                if match is not None:
+                    removed += 1
+                    print(f"{doc_id} duplicates {match[0]} (similarity {match[1]:.2f})")
+                elif writer is not None:
+                    writer.write_lines([line])
+
+        if writer is not None:
+            writer.commit() if removed else writer.abort()
+        duplicates += removed
+    return duplicates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate conversations with MinHash/LSH")
+    parser.add_argument("input", nargs="?", default=OUTPUT_DIR, help="JSONL 파일 또는 디렉터리")
+    parser.add_argument("--threshold", type=float, default=DEDUP_CONFIG["threshold"])
+    parser.add_argument("--index", help="결과를 누적할 영구 인덱스 경로 (기본값: 메모리에서만 검사)")
+    parser.add_argument("--rewrite", action="store_true", help="중복 레코드를 제거해 파일을 다시 쓴다")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        paths = list_jsonl_files(args.input)
+    else:
+        paths = [args.input]
+
+    index = MinHashLSH(threshold=args.threshold, path=args.index)
+    duplicates = dedup_corpus(paths, index, args.rewrite)
+    print(f"\n{duplicates} near-duplicate records, {len(index)} unique records indexed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
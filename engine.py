@@ -0,0 +1,488 @@
+# engine.py
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from openai import RateLimitError
+from config import (
+    OPENAI_MODEL,
+    MAX_TOKENS,
+    TEMPERATURE,
+    TOPICS,
+    DEFAULT_CONFIG,
+    OUTPUT_DIR,
+    OUTPUT_CONFIG,
+    DEDUP_CONFIG,
+    QUALITY_CONFIG,
+    HTTP_POOL_CONFIG
+)
+from accounting import BudgetExhausted, BudgetScheduler, UsageTracker, count_records
+from cache import ResponseCache, RunManifest, request_key
+from converter import DataConverter, ShardedJsonlWriter, encode_record
+from dedup import MinHashLSH, conversation_text
+from hedging import HedgePolicy, hedged
+from prompts import TurnParser, build_answer_messages, build_continue_messages, build_messages, parse_turns
+from quality import Issue, append_rejects, check_batch, check_conversation, plan_repair
+from ratelimit import AdaptiveRateLimiter, DeadlineExceeded, call_with_retries, estimate_tokens, parse_retry_after
+from tracing import LatencyTracer
+
+
+@dataclass
+class TopicResult:
+    topic: str
+    prefix: str
+    conversations: List[List[str]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    output_files: List[str] = field(default_factory=list)
+    api_calls: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    repaired: int = 0
+    rejected: int = 0
+
+
+# 파싱된 응답 하나: (턴 목록, 턴별 역할, finish_reason)
+Parsed = Tuple[List[str], List[str], Optional[str]]
+
+
+def _usage_dict(usage) -> Optional[Dict]:
+    return usage.model_dump() if hasattr(usage, "model_dump") else usage
+
+
+class AsyncGenerationEngine:
+    def __init__(self, client, converter: DataConverter,
+                 concurrency: int = DEFAULT_CONFIG["concurrency"],
+                 num_sets: int = DEFAULT_CONFIG["num_sets"],
+                 max_n: int = DEFAULT_CONFIG["max_n"],
+                 output_dir: str = OUTPUT_DIR,
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 manifest: Optional[RunManifest] = None,
+                 stream: bool = DEFAULT_CONFIG["stream"],
+                 dedup: Optional[MinHashLSH] = None,
+                 dedup_mode: str = DEDUP_CONFIG["mode"],
+                 compression: Optional[str] = OUTPUT_CONFIG["compression"],
+                 tracker: Optional[UsageTracker] = None,
+                 scheduler: Optional[BudgetScheduler] = None,
+                 tracer: Optional[LatencyTracer] = None,
+                 quality: Dict = QUALITY_CONFIG,
+                 hedge: Optional[HedgePolicy] = None,
+                 deadline: Optional[float] = HTTP_POOL_CONFIG["deadline"]):
+        self.client = client
+        self.converter = converter
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.cache = cache
+        self.manifest = manifest
+        self.stream = stream
+        self.dedup = dedup
+        self.dedup_mode = dedup_mode
+        self.compression = compression
+        self.tracker = tracker or UsageTracker()
+        self.scheduler = scheduler
+        self.tracer = tracer or LatencyTracer()
+        self.quality = quality
+        self.hedge = hedge
+        self.deadline = deadline
+        self.existing: Dict[str, int] = {}
+        self.num_sets = num_sets
+        self.max_n = max_n
+        self.output_dir = output_dir
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def _complete(self, prefix: str, messages: List[Dict[str, str]], n: int,
+                        first_token: Optional[asyncio.Event] = None) -> List[Tuple[Dict, Parsed]]:
+        start = time.perf_counter()
+        with self.tracer.span("request", prefix):
+            response = await self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS,
+                n=n
+            )
+        if first_token is not None:
+            first_token.set()
+        if self.hedge is not None:
+            # 스트리밍이 아니면 첫 토큰과 완료 시점이 같다
+            elapsed = time.perf_counter() - start
+            self.hedge.observe("ttft", elapsed, n)
+            self.hedge.observe("total", elapsed, n)
+
+        results = []
+        for choice in sorted(response.choices, key=lambda c: c.index):
+            entry = {"content": choice.message.content or "", "finish_reason": choice.finish_reason, "usage": None}
+            with self.tracer.span("parse", prefix):
+                turns, roles = parse_turns(entry["content"])
+            results.append((entry, (turns, roles, choice.finish_reason)))
+        # 사용량은 요청 단위이므로 첫 번째 선택지에만 기록한다
+        results[0][0]["usage"] = _usage_dict(getattr(response, "usage", None))
+        return results
+
+    async def _stream_completion(self, prefix: str, messages: List[Dict[str, str]], n: int,
+                                 first_token: Optional[asyncio.Event] = None) -> List[Tuple[Dict, Parsed]]:
+        # n개의 선택지가 한 스트림에 섞여 오므로 choice.index별로 파서를 둔다
+        parsers = [TurnParser() for _ in range(n)]
+        # 캐시에 저장할 때만 원문 전체를 모은다
+        parts: Optional[List[List[str]]] = [[] for _ in range(n)] if self.cache is not None else None
+        entries = [{"content": None, "finish_reason": None, "usage": None} for _ in range(n)]
+        # 파싱은 수신과 번갈아 일어나므로 feed에 쓴 시간만 합산한다
+        parse_time = 0.0
+        first_token_at = None
+
+        start = time.perf_counter()
+        stream = await self.client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            n=n,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    entries[0]["usage"] = _usage_dict(chunk.usage)
+
+                for choice in chunk.choices:
+                    index = choice.index or 0
+                    delta = choice.delta.content
+                    if delta:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            self.tracer.observe("ttft", prefix, first_token_at - start)
+                            if self.hedge is not None:
+                                self.hedge.observe("ttft", first_token_at - start, n)
+                            if first_token is not None:
+                                first_token.set()
+                        feed_start = time.perf_counter()
+                        parsers[index].feed(delta)
+                        parse_time += time.perf_counter() - feed_start
+                        if parts is not None:
+                            parts[index].append(delta)
+                    if choice.finish_reason:
+                        entries[index]["finish_reason"] = choice.finish_reason
+        finally:
+            # 복제 요청 경쟁에서 져서 취소되면 연결을 닫아 서버가 생성을 멈추게 한다
+            await stream.close()
+
+        self.tracer.observe("request", prefix, time.perf_counter() - start)
+        if self.hedge is not None:
+            self.hedge.observe("total", time.perf_counter() - start, n)
+        feed_start = time.perf_counter()
+        for parser in parsers:
+            parser.close()
+        self.tracer.observe("parse", prefix, parse_time + time.perf_counter() - feed_start)
+        if parts is not None:
+            for entry, chunks in zip(entries, parts):
+                entry["content"] = "".join(chunks)
+        return [(entry, (parser.turns, parser.roles, entry["finish_reason"]))
+                for entry, parser in zip(entries, parsers)]
+
+    async def _attempt(self, complete, prefix: str, messages: List[Dict[str, str]], n: int,
+                       first_token: Optional[asyncio.Event] = None) -> List[Tuple[Dict, Parsed]]:
+        # httpx 타임아웃은 읽기마다 적용되므로, 토큰이 조금씩 계속 오는 스트림도 끝나도록 시도 전체에 기한을 둔다
+        if not self.deadline:
+            return await complete(prefix, messages, n, first_token)
+        try:
+            async with asyncio.timeout(self.deadline):
+                return await complete(prefix, messages, n, first_token)
+        except TimeoutError:
+            raise DeadlineExceeded(f"request exceeded the {self.deadline:g}s deadline") from None
+
+    async def _hedged(self, complete, prefix: str, messages: List[Dict[str, str]], n: int,
+                      tokens: int) -> List[Tuple[Dict, Parsed]]:
+        if self.hedge is None:
+            return await self._attempt(complete, prefix, messages, n)
+
+        async def backup(first_token: asyncio.Event) -> List[Tuple[Dict, Parsed]]:
+            # 복제 요청도 예산과 처리율 한도를 소모한다. 실패하면 주 요청만 기다린다
+            reservation = None
+            if self.scheduler is not None:
+                reservation = self.scheduler.try_reserve(tokens, n)
+                if reservation is None:
+                    raise BudgetExhausted("no budget left for a hedged request")
+            try:
+                await self.limiter.acquire(tokens)
+                try:
+                    return await self._attempt(complete, prefix, messages, n, first_token)
+                except RateLimitError as e:
+                    self.limiter.release(tokens)
+                    self.limiter.on_throttle(parse_retry_after(e))
+                    raise
+            finally:
+                if reservation is not None:
+                    self.scheduler.release(reservation)
+
+        return await hedged(lambda first_token: self._attempt(complete, prefix, messages, n, first_token),
+                            backup, self.hedge, n)
+
+    async def fetch_conversations(self, prefix: str, messages: List[Dict[str, str]],
+                                  keys: List[str]) -> Tuple[List[Parsed], bool]:
+        conversations: List[Optional[Parsed]] = [None] * len(keys)
+        if self.cache is not None:
+            for i, key in enumerate(keys):
+                entry = self.cache.get(key)
+                if entry is not None:
+                    self.tracker.record(prefix, entry.get("usage"), [entry.get("finish_reason")], cached=True)
+                    conversations[i] = (*parse_turns(entry["content"]), entry.get("finish_reason"))
+
+        # 캐시에 없는 샘플만 모아 n개의 선택지를 한 요청으로 받는다 (프롬프트 토큰은 한 번만 과금)
+        missing = [i for i, conv in enumerate(conversations) if conv is None]
+        if not missing:
+            return conversations, False
+
+        complete = self._stream_completion if self.stream else self._complete
+        n = len(missing)
+        tokens = estimate_tokens(messages, MAX_TOKENS * n)
+        wait_start = time.perf_counter()
+        async with self.semaphore:
+            self.tracer.observe("wait", prefix, time.perf_counter() - wait_start)
+            # 세마포어 안에서 예약해야 동시에 대기 중인 요청이 예산을 한꺼번에 넘기지 않는다
+            reservation = await self.scheduler.reserve(tokens, n) if self.scheduler is not None else None
+            try:
+                results = await call_with_retries(
+                    lambda: self._hedged(complete, prefix, messages, n, tokens),
+                    self.limiter,
+                    tokens
+                )
+                # 예약을 풀기 전에 실제 사용량을 기록해, 기다리던 요청이 실측치로 다시 예약하게 한다
+                self.tracker.record(prefix, results[0][0]["usage"], [entry["finish_reason"] for entry, _ in results])
+            finally:
+                if reservation is not None:
+                    self.scheduler.release(reservation)
+
+        for i, (entry, parsed) in zip(missing, results):
+            if self.cache is not None:
+                self.cache.put(keys[i], entry)
+            conversations[i] = parsed
+        return conversations, True
+
+    async def repair_conversation(self, topic: str, prefix: str, sample: int, parsed: Parsed,
+                                  issues: List[Issue], result: TopicResult) -> Tuple[List[str], List[Issue]]:
+        # 검사에 실패한 답변이나 빠진/잘린 턴만 다시 요청하고, 통과한 턴은 그대로 둔다
+        turns, roles, finish_reason = parsed
+        params = {"temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}
+        for attempt in range(self.quality["max_repairs"]):
+            action, targets = plan_repair(turns, roles, issues, self.quality)
+            if action == "answer":
+                requests = [build_answer_messages(topic, prefix, turns, i, self.quality["min_answer_chars"])
+                            for i in targets]
+            elif action == "continue":
+                turns, roles = turns[:targets[0]], roles[:targets[0]]
+                requests = [build_continue_messages(topic, prefix, turns, self.quality["pairs"])]
+            else:
+                break
+
+            # 시도 번호를 키에 넣어 캐시된 불합격 응답이 다음 시도에서 그대로 재사용되지 않게 한다
+            keys = [request_key(OPENAI_MODEL, messages, dict(params, repair=attempt), sample)
+                    for messages in requests]
+            replies = await asyncio.gather(*(self.fetch_conversations(prefix, messages, [key])
+                                             for messages, key in zip(requests, keys)))
+            result.api_calls += sum(1 for _, from_api in replies if from_api)
+
+            # 답변만 다시 생성해도 잘린 마지막 턴은 그대로 남으므로, "continue"로 바뀌기 전까지 잘림 상태를 유지한다
+            if action == "answer":
+                turns = list(turns)
+                for i, ([(new_turns, _, reason)], _) in zip(targets, replies):
+                    # 한 턴만 요청했으므로 첫 턴을 답변으로 쓴다. 잘린 답변은 다음 검사에서 다시 걸린다
+                    if new_turns and reason != "length":
+                        turns[i] = new_turns[0]
+            else:
+                [(new_turns, new_roles, finish_reason)], _ = replies[0]
+                turns, roles = turns + new_turns, roles + new_roles
+
+            issues = check_conversation(turns, roles, finish_reason, self.quality)
+            if not issues:
+                result.repaired += 1
+                break
+        return turns, issues
+
+    async def generate_samples(self, topic: str, prefix: str, samples: List[int],
+                               result: TopicResult, writer: ShardedJsonlWriter) -> List[Tuple[int, str]]:
+        # 품질 검사에서 끝내 불합격한 샘플은 돌려주지 않는다 (호출 측이 완료로 기록하지 않아 다음 실행에서 다시 생성)
+        start = time.perf_counter()
+        messages = build_messages(topic, prefix)
+        params = {"temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}
+        keys = [request_key(OPENAI_MODEL, messages, params, sample) for sample in samples]
+
+        parsed, from_api = await self.fetch_conversations(prefix, messages, keys)
+        if from_api:
+            result.api_calls += 1
+
+        conversations = [turns for turns, _, _ in parsed]
+        rejected = set()
+        if self.quality["mode"] != "off":
+            results = check_batch(parsed, self.quality)
+            failing = [i for i, issues in enumerate(results) if issues]
+            if failing and self.quality["mode"] == "repair":
+                repairs = await asyncio.gather(*(
+                    self.repair_conversation(topic, prefix, samples[i], parsed[i], results[i], result)
+                    for i in failing
+                ))
+                for i, (turns, issues) in zip(failing, repairs):
+                    conversations[i], results[i] = turns, issues
+
+            rejects = []
+            for i, issues in enumerate(results):
+                if issues:
+                    result.rejected += 1
+                    rejects.append({"prefix": prefix, "sample": samples[i], "key": keys[i],
+                                    "issues": [str(issue) for issue in issues], "turns": conversations[i]})
+                    conversations[i] = []
+                    rejected.add(samples[i])
+                    # 캐시에 남겨 두면 재시도해도 같은 불합격 응답을 다시 읽게 된다
+                    if self.cache is not None:
+                        self.cache.delete(keys[i])
+            # 끝내 통과하지 못한 대화는 저장하지 않고 사유와 함께 따로 모아 둔다
+            append_rejects(self.quality["rejects_path"], rejects)
+
+        for sample, key, conversation in zip(samples, keys, conversations):
+            if conversation and self.dedup is not None and self.dedup_mode != "off":
+                match = self.dedup.check_and_add(key, conversation_text(conversation))
+                if match is not None:
+                    result.duplicates += 1
+                    print(f"Near-duplicate of {match[0]} for {prefix} sample {sample} (similarity {match[1]:.2f})")
+                    if self.dedup_mode == "reject":
+                        conversation = []
+
+            # 완성된 대화는 주제의 다른 요청을 기다리지 않고 바로 샤드에 기록한다
+            if conversation:
+                with self.tracer.span("normalize", prefix):
+                    records = self.converter.to_messages(conversation)
+                with self.tracer.span("encode", prefix):
+                    line = encode_record({"messages": records})
+                with self.tracer.span("write", prefix):
+                    writer.write_line(line, len(conversation), sum(len(m["content"]) for m in records[1:]))
+                result.conversations.append(conversation)
+                self.tracker.record_written(prefix)
+        self.tracer.observe("sample", prefix, time.perf_counter() - start)
+        return [(sample, key) for sample, key in zip(samples, keys) if sample not in rejected]
+
+    def top_up_samples(self, topic: str, prefix: str, deficit: int) -> List[int]:
+        # 샘플 번호는 이미 있는 레코드 수 다음부터 매긴다. 0부터 다시 세면 run ID가 바뀐 실행에서 캐시가
+        # 이미 기록된 대화를 돌려주고, dedup도 같은 키는 비교하지 않아 중복 레코드가 쌓인다.
+        # 앞선 실행에서 일부 샘플이 빠져 번호가 겹치면 이미 기록했거나 dedup에 등록된 키는 건너뛴다
+        messages = build_messages(topic, prefix)
+        params = {"temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}
+        samples, sample = [], self.existing.get(prefix, 0)
+        while len(samples) < deficit:
+            done = self.manifest is not None and self.manifest.is_done(prefix, sample)
+            seen = self.dedup is not None and \
+                request_key(OPENAI_MODEL, messages, params, sample) in self.dedup.signatures
+            if not (done or seen):
+                samples.append(sample)
+            sample += 1
+        return samples
+
+    async def run_topic(self, topic: str, prefix: str) -> TopicResult:
+        result = TopicResult(topic, prefix)
+        deficit = self.scheduler.deficit(prefix, self.existing) if self.scheduler is not None else None
+        if self.manifest is not None:
+            result.output_files = list(self.manifest.output_files(prefix))
+        if deficit is None:
+            pending = [i for i in range(self.num_sets)
+                       if self.manifest is None or not self.manifest.is_done(prefix, i)]
+        else:
+            # 목표 레코드 수가 있으면 num_sets 대신 목표까지 모자란 만큼만 새 샘플을 만든다
+            pending = self.top_up_samples(topic, prefix, deficit)
+        if not pending:
+            print(f"Skipping {prefix}: already written to {', '.join(result.output_files)}")
+            return result
+
+        writer = self.converter.open_writer(
+            f"{self.output_dir}/{prefix}",
+            max_records=OUTPUT_CONFIG["shard_max_records"],
+            max_bytes=OUTPUT_CONFIG["shard_max_bytes"],
+            compression=self.compression
+        )
+        # 같은 주제의 샘플은 max_n개씩 묶어 n 파라미터로 한 번에 요청한다
+        groups = [pending[i:i + self.max_n] for i in range(0, len(pending), self.max_n)]
+        try:
+            samples = await asyncio.gather(
+                *(self.generate_samples(topic, prefix, group, result, writer) for group in groups),
+                return_exceptions=True
+            )
+            shards = await asyncio.to_thread(writer.close)
+        except BaseException:
+            writer.abort()
+            raise
+
+        # 샤드가 최종 이름으로 바뀐 뒤에만 완료로 기록해, 중단되면 캐시에서 다시 쓰도록 한다
+        done = []
+        for group, sample in zip(groups, samples):
+            if isinstance(sample, BudgetExhausted):
+                # 예산 부족으로 건너뛴 샘플은 완료로 기록하지 않아 다음 실행에서 이어서 생성된다
+                result.skipped += len(group)
+            elif isinstance(sample, BaseException):
+                result.errors.append(str(sample))
+                print(f"Error generating conversation for {topic}: {str(sample)}")
+            else:
+                done.extend(sample)
+
+        result.output_files.extend(shards)
+        if self.manifest is not None:
+            self.manifest.add_output_files(prefix, shards)
+            self.manifest.mark_done(prefix, done)
+
+        if result.conversations:
+            print(f"\nSaved {len(result.conversations)} conversations to {', '.join(shards)}")
+
+        return result
+
+    async def run(self, topics: Sequence[Tuple[str, str]] = TOPICS) -> List[TopicResult]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.cache is not None:
+            removed = await asyncio.to_thread(self.cache.evict)
+            if removed:
+                print(f"Evicted {removed} stale cache entries")
+
+        if self.scheduler is not None:
+            self.existing = await asyncio.to_thread(count_records, self.output_dir)
+            scheduled = self.scheduler.order(topics, self.existing)
+            if len(scheduled) < len(topics):
+                print(f"Skipping {len(topics) - len(scheduled)} topics already at "
+                      f"{self.scheduler.target_records} records")
+            topics = scheduled
+
+        results = await asyncio.gather(
+            *(self.run_topic(topic, prefix) for topic, prefix in topics),
+            return_exceptions=True
+        )
+
+        # 한 주제의 실패가 전체 스윕을 중단시키지 않도록 예외를 결과로 변환
+        completed = []
+        for (topic, prefix), result in zip(topics, results):
+            if isinstance(result, BaseException):
+                print(f"Error processing topic {topic}: {str(result)}")
+                result = TopicResult(topic, prefix, errors=[str(result)])
+            completed.append(result)
+
+        failed = [r.prefix for r in completed
+                  if r.errors or not (r.output_files or r.duplicates or r.skipped or r.rejected)]
+        print(f"\nCompleted {len(completed) - len(failed)}/{len(completed)} topics "
+              f"({sum(r.api_calls for r in completed)} API calls, "
+              f"{sum(r.duplicates for r in completed)} near-duplicates)")
+        if failed:
+            print(f"Failed topics: {', '.join(failed)}")
+
+        total = self.tracker.total
+        print(f"Usage: {total.prompt_tokens} prompt + {total.completion_tokens} completion tokens "
+              f"(${total.cost:.4f}), {total.cached} cache hits, {total.truncated} truncated")
+        if self.tracer.enabled and self.tracer.samples:
+            print("Stage latency:")
+            self.tracer.print_summary()
+        repaired, rejected = sum(r.repaired for r in completed), sum(r.rejected for r in completed)
+        if repaired or rejected:
+            print(f"Quality gate: {repaired} conversations repaired, {rejected} rejected "
+                  f"(see {self.quality['rejects_path']})")
+        if self.hedge is not None and self.hedge.requests:
+            hedge = self.hedge.summary()
+            print(f"Hedging: {hedge['hedges']} hedged requests for {hedge['hedge_requests']} requests "
+                  f"({hedge['hedge_wins']} won, {hedge['hedges_denied']} denied by budget)")
+        skipped = sum(r.skipped for r in completed)
+        if skipped:
+            print(f"Budget exhausted: skipped {skipped} samples")
+
+        return completed
@@ -0,0 +1,330 @@
+# export.py
+# 생성된 JSONL 코퍼스를 학습용 포맷으로 내보낸다.
+#   python export.py columnar [training_data] --output export/columnar
+#   python export.py tokens [training_data] --output export/tokens [--tokenizer bytes|tiktoken:o200k_base]
+#   python export.py parquet [training_data] --output export/corpus.parquet   (pyarrow 필요)
+import argparse
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config import OUTPUT_DIR
+from converter import list_jsonl_files, open_jsonl
+from corpus_index import prefix_from_path
+
+FORMAT_VERSION = 1
+ROLES = ["user", "assistant"]
+
+
+def iter_records(input_path: str) -> Iterator[Tuple[str, List[Dict[str, str]]]]:
+    paths = list_jsonl_files(input_path) if os.path.isdir(input_path) else [input_path]
+    for path in paths:
+        prefix = prefix_from_path(path.rsplit('.jsonl', 1)[0] + '.jsonl')
+        with open_jsonl(path) as f:
+            for line in f:
+                if line.strip():
+                    yield prefix, json.loads(line)["messages"]
+
+
+class _Interner:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def __call__(self, value: str) -> int:
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+        return self.ids[value]
+
+
+class _ArrayFile:
+    # 오프셋/ID 배열을 메모리에 모으지 않고 일정 크기마다 파일에 이어 쓴다
+    def __init__(self, path: str, typecode: str, flush_every: int = 65536):
+        self.file = open(path, 'wb')
+        self.data = array(typecode)
+        self.flush_every = flush_every
+
+    def append(self, value: int):
+        self.data.append(value)
+        if len(self.data) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.data.tofile(self.file)
+        del self.data[:]
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def _write_meta(output_dir: str, meta: Dict):
+    with open(os.path.join(output_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def export_columnar(input_path: str, output_dir: str) -> Dict:
+    # 레이아웃: system 프롬프트와 prefix는 meta.json에 한 번만 저장하고, 레코드는 ID로 참조한다.
+    # 턴 본문은 text.bin 하나에 이어 붙이고 turn_offsets로 경계를 표시한다.
+    os.makedirs(output_dir, exist_ok=True)
+    systems, prefixes = _Interner(), _Interner()
+    record_system = _ArrayFile(os.path.join(output_dir, "record_system.u32"), 'I')
+    record_prefix = _ArrayFile(os.path.join(output_dir, "record_prefix.u16"), 'H')
+    record_turns = _ArrayFile(os.path.join(output_dir, "record_turns.u64"), 'Q')
+    turn_roles = _ArrayFile(os.path.join(output_dir, "turn_roles.u8"), 'B')
+    turn_offsets = _ArrayFile(os.path.join(output_dir, "turn_offsets.u64"), 'Q')
+
+    records = turns = offset = 0
+    record_turns.append(0)
+    turn_offsets.append(0)
+    with open(os.path.join(output_dir, "text.bin"), 'wb') as text:
+        for prefix, messages in iter_records(input_path):
+            system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+            record_system.append(systems(system))
+            record_prefix.append(prefixes(prefix))
+            for message in messages:
+                if message["role"] == "system":
+                    continue
+                data = message["content"].encode('utf-8')
+                text.write(data)
+                offset += len(data)
+                turn_roles.append(ROLES.index(message["role"]))
+                turn_offsets.append(offset)
+                turns += 1
+            records += 1
+            record_turns.append(turns)
+
+    for column in (record_system, record_prefix, record_turns, turn_roles, turn_offsets):
+        column.close()
+
+    meta = {"format": "columnar", "version": FORMAT_VERSION, "byteorder": sys.byteorder,
+            "records": records, "turns": turns, "text_bytes": offset,
+            "roles": ROLES, "systems": systems.values, "prefixes": prefixes.values}
+    _write_meta(output_dir, meta)
+    return meta
+
+
+def get_tokenizer(spec: str) -> Tuple[Callable[[str], List[int]], int]:
+    if spec == "bytes":
+        return lambda text: list(text.encode('utf-8')), 256
+    if spec.startswith("tiktoken:"):
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError("the tiktoken tokenizer requires the 'tiktoken' package") from e
+        encoding = tiktoken.get_encoding(spec.split(":", 1)[1])
+        return lambda text: encoding.encode(text, disallowed_special=()), encoding.n_vocab
+    raise ValueError(f"Unknown tokenizer: {spec}")
+
+
+def _token_dtype(vocab_size: int) -> Tuple[str, str]:
+    if vocab_size <= 1 << 8:
+        return 'B', "u8"
+    if vocab_size <= 1 << 16:
+        return 'H', "u16"
+    return 'I', "u32"
+
+
+def render_message(role: str, content: str) -> str:
+    return f"<|{role}|>\n{content}\n"
+
+
+def export_tokens(input_path: str, output_dir: str, tokenizer: str = "bytes") -> Dict:
+    # system 프롬프트 토큰은 system_tokens에 한 번만 저장하고, 레코드 토큰에는 user/assistant 턴만 담는다
+    os.makedirs(output_dir, exist_ok=True)
+    encode, vocab_size = get_tokenizer(tokenizer)
+    typecode, suffix = _token_dtype(vocab_size)
+
+    systems = _Interner()
+    system_tokens: List[array] = []
+    record_system = _ArrayFile(os.path.join(output_dir, "record_system.u32"), 'I')
+    token_offsets = _ArrayFile(os.path.join(output_dir, "token_offsets.u64"), 'Q')
+    tokens = _ArrayFile(os.path.join(output_dir, f"tokens.{suffix}"), typecode)
+
+    records = total = 0
+    token_offsets.append(0)
+    for _, messages in iter_records(input_path):
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        system_id = systems(system)
+        if system_id == len(system_tokens):
+            system_tokens.append(array(typecode, encode(render_message("system", system)) if system else []))
+        record_system.append(system_id)
+
+        for message in messages:
+            if message["role"] != "system":
+                ids = encode(render_message(message["role"], message["content"]))
+                tokens.data.extend(ids)
+                total += len(ids)
+        if len(tokens.data) >= tokens.flush_every:
+            tokens.flush()
+        token_offsets.append(total)
+        records += 1
+
+    for column in (record_system, token_offsets, tokens):
+        column.close()
+
+    with open(os.path.join(output_dir, f"system_tokens.{suffix}"), 'wb') as f, \
+            open(os.path.join(output_dir, "system_token_offsets.u64"), 'wb') as g:
+        offsets = array('Q', [0])
+        for ids in system_tokens:
+            ids.tofile(f)
+            offsets.append(offsets[-1] + len(ids))
+        offsets.tofile(g)
+
+    meta = {"format": "tokens", "version": FORMAT_VERSION, "byteorder": sys.byteorder,
+            "tokenizer": tokenizer, "vocab_size": vocab_size, "dtype": suffix,
+            "records": records, "tokens": total, "systems": systems.values}
+    _write_meta(output_dir, meta)
+    return meta
+
+
+def export_parquet(input_path: str, output_path: str, row_group_size: int = 10000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("parquet export requires the 'pyarrow' package") from e
+
+    # system/prefix 열은 사전 인코딩되어 같은 문자열이 파일에 한 번만 저장된다
+    schema = pa.schema([
+        ("prefix", pa.string()),
+        ("system", pa.string()),
+        ("roles", pa.list_(pa.string())),
+        ("contents", pa.list_(pa.string()))
+    ])
+    writer = pq.ParquetWriter(output_path, schema, use_dictionary=["prefix", "system"],
+                              compression="zstd")
+    rows = {name: [] for name in schema.names}
+    count = 0
+
+    def flush():
+        if rows["prefix"]:
+            writer.write_table(pa.table(rows, schema=schema))
+            for column in rows.values():
+                column.clear()
+
+    for prefix, messages in iter_records(input_path):
+        turns = [m for m in messages if m["role"] != "system"]
+        rows["prefix"].append(prefix)
+        rows["system"].append(messages[0]["content"] if messages and messages[0]["role"] == "system" else "")
+        rows["roles"].append([m["role"] for m in turns])
+        rows["contents"].append([m["content"] for m in turns])
+        count += 1
+        if len(rows["prefix"]) >= row_group_size:
+            flush()
+    flush()
+    writer.close()
+    return count
+
+
+class _MappedArrays:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"{directory} was exported with {self.meta['byteorder']}-endian arrays")
+        self._maps = []
+        self._views: List[memoryview] = []
+
+    def _map(self, name: str, typecode: str) -> memoryview:
+        # 파일을 mmap으로 열어 복사 없이 타입이 지정된 memoryview로 본다
+        path = os.path.join(self.directory, name)
+        if os.path.getsize(path) == 0:
+            return memoryview(array(typecode))
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        base = memoryview(mm)
+        view = base.cast(typecode)
+        # 뷰가 mmap을 내보내고 있으면 닫을 수 없으므로 close()에서 먼저 해제하도록 모아 둔다
+        self._views.extend((view, base))
+        return view
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        for mm in self._maps:
+            mm.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ColumnarDataset(_MappedArrays):
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.record_system = self._map("record_system.u32", 'I')
+        self.record_prefix = self._map("record_prefix.u16", 'H')
+        self.record_turns = self._map("record_turns.u64", 'Q')
+        self.turn_roles = self._map("turn_roles.u8", 'B')
+        self.turn_offsets = self._map("turn_offsets.u64", 'Q')
+        self.text = self._map("text.bin", 'B')
+
+    def __len__(self):
+        return self.meta["records"]
+
+    def prefix(self, i: int) -> str:
+        return self.meta["prefixes"][self.record_prefix[i]]
+
+    def messages(self, i: int) -> List[Dict[str, str]]:
+        messages = [{"role": "system", "content": self.meta["systems"][self.record_system[i]]}]
+        for t in range(self.record_turns[i], self.record_turns[i + 1]):
+            content = bytes(self.text[self.turn_offsets[t]:self.turn_offsets[t + 1]]).decode('utf-8')
+            messages.append({"role": ROLES[self.turn_roles[t]], "content": content})
+        return messages
+
+
+class TokenDataset(_MappedArrays):
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        typecode = _token_dtype(self.meta["vocab_size"])[0]
+        self.tokens = self._map(f"tokens.{self.meta['dtype']}", typecode)
+        self.offsets = self._map("token_offsets.u64", 'Q')
+        self.record_system = self._map("record_system.u32", 'I')
+        self.system_tokens = self._map(f"system_tokens.{self.meta['dtype']}", typecode)
+        self.system_offsets = self._map("system_token_offsets.u64", 'Q')
+
+    def __len__(self):
+        return self.meta["records"]
+
+    def __getitem__(self, i: int) -> memoryview:
+        # user/assistant 턴 토큰 (복사 없는 슬라이스)
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def system(self, i: int) -> memoryview:
+        system_id = self.record_system[i]
+        return self.system_tokens[self.system_offsets[system_id]:self.system_offsets[system_id + 1]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the generated corpus for training")
+    parser.add_argument("format", choices=["columnar", "tokens", "parquet"])
+    parser.add_argument("input", nargs="?", default=OUTPUT_DIR, help="JSONL 파일 또는 디렉터리")
+    parser.add_argument("--output", required=True, help="출력 디렉터리 (parquet은 파일 경로)")
+    parser.add_argument("--tokenizer", default="bytes", help="bytes 또는 tiktoken:<encoding>")
+    args = parser.parse_args(argv)
+
+    if args.format == "columnar":
+        meta = export_columnar(args.input, args.output)
+        print(f"Exported {meta['records']} records, {meta['turns']} turns, "
+              f"{len(meta['systems'])} distinct system prompts to {args.output}")
+    elif args.format == "tokens":
+        meta = export_tokens(args.input, args.output, args.tokenizer)
+        print(f"Exported {meta['records']} records, {meta['tokens']} tokens ({meta['dtype']}) to {args.output}")
+    else:
+        count = export_parquet(args.input, args.output)
+        print(f"Exported {count} records to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+# hedging.py
+# 느린 요청 복제(hedged request). 최근 지연 분포의 백분위수를 넘도록 첫 토큰(또는 완료)이 없으면
+# 같은 요청을 한 번 더 보내고, 먼저 성공한 쪽을 쓰고 나머지는 취소한다.
+import asyncio
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from config import HEDGE_CONFIG
+from tracing import percentile
+
+T = TypeVar("T")
+
+# 요청 하나를 시작하는 함수. 첫 토큰을 받으면 인자로 받은 이벤트를 설정해야 한다
+Attempt = Callable[[asyncio.Event], Awaitable[T]]
+
+
+class HedgePolicy:
+    def __init__(self, trigger: str = HEDGE_CONFIG["trigger"],
+                 quantile: float = HEDGE_CONFIG["percentile"],
+                 window: int = HEDGE_CONFIG["window"],
+                 min_samples: int = HEDGE_CONFIG["min_samples"],
+                 min_delay: float = HEDGE_CONFIG["min_delay"],
+                 max_delay: float = HEDGE_CONFIG["max_delay"],
+                 budget_ratio: float = HEDGE_CONFIG["budget_ratio"],
+                 max_hedges: Optional[int] = HEDGE_CONFIG["max_hedges"]):
+        if trigger not in ("ttft", "total"):
+            raise ValueError(f"Unknown hedge trigger: {trigger}")
+        self.trigger = trigger
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.max_hedges = max_hedges
+        # 완료 시간은 선택지 수(n)에 비례하므로 n별로 따로 모은다. 첫 토큰 지연은 n과 무관
+        self.latencies: Dict[int, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.denied = 0
+
+    def _key(self, n: int) -> int:
+        return n if self.trigger == "total" else 0
+
+    def observe(self, stage: str, seconds: float, n: int = 1):
+        # 끝까지 받은 시도만 관측한다 (취소된 쪽의 지연은 알 수 없다)
+        if stage == self.trigger:
+            self.latencies[self._key(n)].append(seconds)
+
+    def delay(self, n: int = 1) -> Optional[float]:
+        values = self.latencies[self._key(n)]
+        if len(values) < self.min_samples:
+            return None
+        return min(self.max_delay, max(self.min_delay, percentile(sorted(values), self.quantile)))
+
+    def allow(self) -> bool:
+        # 주 요청 수 대비 비율과 실행당 상한으로 추가 비용을 제한한다
+        over_ratio = self.hedges >= self.budget_ratio * self.requests
+        over_max = self.max_hedges is not None and self.hedges >= self.max_hedges
+        if over_ratio or over_max:
+            self.denied += 1
+            return False
+        self.hedges += 1
+        return True
+
+    def summary(self) -> Dict:
+        return {
+            "hedge_trigger": self.trigger,
+            "hedge_requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.wins,
+            "hedges_denied": self.denied
+        }
+
+
+async def _cancel(*tasks: asyncio.Future):
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged(primary: Attempt, backup: Attempt, policy: HedgePolicy, n: int = 1) -> T:
+    policy.requests += 1
+    delay = policy.delay(n)
+    first_token = asyncio.Event()
+    primary_task = asyncio.ensure_future(primary(first_token))
+    if delay is None:
+        return await primary_task
+
+    waiters = {primary_task}
+    if policy.trigger == "ttft":
+        waiters.add(asyncio.ensure_future(first_token.wait()))
+    backup_task = None
+    try:
+        done, _ = await asyncio.wait(waiters, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+        if done or not policy.allow():
+            return await primary_task
+
+        backup_task = asyncio.ensure_future(backup(asyncio.Event()))
+        pending = {primary_task, backup_task}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is backup_task:
+                        policy.wins += 1
+                    return task.result()
+        # 둘 다 실패하면 주 요청의 오류를 올려 호출 측의 재시도 로직이 처리하게 한다
+        return primary_task.result()
+    finally:
+        await _cancel(*waiters, *([backup_task] if backup_task is not None else []))
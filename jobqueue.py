@@ -0,0 +1,460 @@
+# jobqueue.py
+# (주제 prefix, 샘플 번호) 단위 작업을 SQLite에 저장해 여러 워커 프로세스/호스트가 한 스윕을 나눠 처리한다.
+# 작업은 임대(lease)로 가져가고 하트비트로 연장하며, 임대가 끊기면 다른 워커가 다시 가져간다.
+# 워커는 생성한 레코드를 메모리에 모았다가 작업을 완료 처리한 뒤에만 자기 이름이 붙은 샤드
+# (<prefix>.<worker>-NNNNN.jsonl)에 쓴다. 실패하거나 임대를 잃은 작업의 레코드는 남지 않는다.
+#   python jobqueue.py enqueue [--num-sets N]
+#   python jobqueue.py work [--worker-id ID] [--concurrency N] [--wait]
+#   python jobqueue.py status | dead | requeue-dead
+import argparse
+import asyncio
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import (
+    DEFAULT_CONFIG,
+    OUTPUT_DIR,
+    OUTPUT_CONFIG,
+    QUEUE_CONFIG
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    prefix TEXT NOT NULL,
+    sample INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, leased, done, dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    output TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (prefix, sample)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    prefix: str
+    sample: int
+    topic: str
+    attempts: int
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+class _RecordBuffer:
+    # generate_samples가 쓰는 write_line을 받아 완료 처리 전까지 레코드를 메모리에 모은다
+    def __init__(self):
+        self.records: List[Tuple[str, int, int]] = []
+
+    def write_line(self, line: str, turns: int = 0, chars: int = 0):
+        self.records.append((line, turns, chars))
+
+
+def default_worker_id() -> str:
+    # 샤드 파일 이름에 들어가므로 영숫자만 쓴다
+    host = re.sub(r'[^0-9A-Za-z]', '', socket.gethostname())[:16] or "host"
+    return f"{host}{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path: str = QUEUE_CONFIG["path"],
+                 lease_seconds: float = QUEUE_CONFIG["lease_seconds"],
+                 max_attempts: int = QUEUE_CONFIG["max_attempts"],
+                 retry_delay: float = QUEUE_CONFIG["retry_delay"]):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # 워커 안에서는 asyncio.to_thread로 호출하므로 연결 하나를 잠금으로 보호해 공유한다
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=QUEUE_CONFIG["busy_timeout"],
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute(f"PRAGMA journal_mode={QUEUE_CONFIG['journal_mode']}")
+        self.conn.executescript(SCHEMA)
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 여러 프로세스가 같은 작업을 동시에 가져가지 못하게 한다
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, topics: Optional[Sequence[Tuple[str, str]]] = None,
+                num_sets: int = DEFAULT_CONFIG["num_sets"]) -> int:
+        if topics is None:
+            from config import TOPICS as topics
+        now = time.time()
+        rows = [(prefix, sample, topic, now) for topic, prefix in topics for sample in range(num_sets)]
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (prefix, sample, topic, updated) VALUES (?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+        return self._transaction(insert)
+
+    def claim(self, worker: str, limit: int = DEFAULT_CONFIG["max_n"]) -> List[Job]:
+        # 한 번에 같은 주제의 작업만 가져와 n 파라미터로 묶어 요청할 수 있게 한다
+        def claim_jobs(conn):
+            now = time.time()
+            # 임대가 만료된 작업: 시도 횟수가 남았으면 다시 대기열로, 아니면 dead-letter로
+            conn.execute("UPDATE jobs SET status = 'dead', worker = NULL, last_error = 'lease expired', updated = ? "
+                         "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                         (now, now, self.max_attempts))
+            conn.execute("UPDATE jobs SET status = 'pending', worker = NULL, updated = ? "
+                         "WHERE status = 'leased' AND lease_expires < ?", (now, now))
+
+            first = conn.execute("SELECT prefix FROM jobs WHERE status = 'pending' AND available_at <= ? "
+                                 "ORDER BY available_at, prefix, sample LIMIT 1", (now,)).fetchone()
+            if first is None:
+                return []
+            rows = conn.execute("SELECT prefix, sample, topic, attempts FROM jobs "
+                                "WHERE status = 'pending' AND available_at <= ? AND prefix = ? "
+                                "ORDER BY sample LIMIT ?", (now, first[0], limit)).fetchall()
+            conn.executemany("UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                             "attempts = attempts + 1, updated = ? WHERE prefix = ? AND sample = ?",
+                             [(worker, now + self.lease_seconds, now, prefix, sample)
+                              for prefix, sample, _, _ in rows])
+            return [Job(prefix, sample, topic, attempts + 1) for prefix, sample, topic, attempts in rows]
+        return self._transaction(claim_jobs)
+
+    def heartbeat(self, worker: str, jobs: Sequence[Job]) -> List[Job]:
+        # 임대를 연장하고, 아직 이 워커가 쥐고 있는 작업만 돌려준다
+        def renew(conn):
+            now = time.time()
+            held = []
+            for job in jobs:
+                cursor = conn.execute("UPDATE jobs SET lease_expires = ?, updated = ? "
+                                      "WHERE prefix = ? AND sample = ? AND status = 'leased' AND worker = ?",
+                                      (now + self.lease_seconds, now, job.prefix, job.sample, worker))
+                if cursor.rowcount:
+                    held.append(job)
+            return held
+        return self._transaction(renew)
+
+    def complete(self, worker: str, jobs: Sequence[Job], output: Optional[str] = None) -> int:
+        # 전부 아니면 전무: 하나라도 이 워커의 임대가 아니면 아무것도 완료 처리하지 않는다
+        def mark_done(conn):
+            now = time.time()
+            done = sum(conn.execute("UPDATE jobs SET status = 'done', output = ?, lease_expires = NULL, updated = ? "
+                                    "WHERE prefix = ? AND sample = ? AND status = 'leased' AND worker = ?",
+                                    (output, now, job.prefix, job.sample, worker)).rowcount for job in jobs)
+            if done < len(jobs):
+                raise _LeaseLost
+            return done
+        try:
+            return self._transaction(mark_done)
+        except _LeaseLost:
+            return 0
+
+    def set_output(self, jobs: Sequence[Job], output: str):
+        def update(conn):
+            conn.executemany("UPDATE jobs SET output = ? WHERE prefix = ? AND sample = ? AND status = 'done'",
+                             [(output, job.prefix, job.sample) for job in jobs])
+        self._transaction(update)
+
+    def fail(self, worker: str, jobs: Sequence[Job], error: str) -> int:
+        # 시도 횟수를 다 쓴 작업은 dead-letter로 옮기고, 나머지는 지수적으로 늦춰 다시 대기열에 넣는다
+        def mark_failed(conn):
+            now = time.time()
+            dead = 0
+            for job in jobs:
+                if job.attempts >= self.max_attempts:
+                    status, available_at = 'dead', now
+                    dead += 1
+                else:
+                    status, available_at = 'pending', now + self.retry_delay * 2 ** (job.attempts - 1)
+                conn.execute("UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, available_at = ?, "
+                             "last_error = ?, updated = ? "
+                             "WHERE prefix = ? AND sample = ? AND status = 'leased' AND worker = ?",
+                             (status, available_at, error[:1000], now, job.prefix, job.sample, worker))
+            return dead
+        return self._transaction(mark_failed)
+
+    def release(self, worker: str, jobs: Sequence[Job]):
+        # 작업 자체의 실패가 아닌 이유(예산 소진, 종료)로 돌려줄 때는 시도 횟수를 되돌린다
+        def unlease(conn):
+            now = time.time()
+            conn.executemany("UPDATE jobs SET status = 'pending', worker = NULL, lease_expires = NULL, "
+                             "attempts = attempts - 1, updated = ? "
+                             "WHERE prefix = ? AND sample = ? AND status = 'leased' AND worker = ?",
+                             [(now, job.prefix, job.sample, worker) for job in jobs])
+        self._transaction(unlease)
+
+    def requeue_dead(self) -> int:
+        def requeue(conn):
+            return conn.execute("UPDATE jobs SET status = 'pending', attempts = 0, available_at = 0, updated = ? "
+                                "WHERE status = 'dead'", (time.time(),)).rowcount
+        return self._transaction(requeue)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def dead_letters(self) -> List[Tuple[str, int, int, str]]:
+        with self.lock:
+            return self.conn.execute("SELECT prefix, sample, attempts, last_error FROM jobs WHERE status = 'dead' "
+                                     "ORDER BY prefix, sample").fetchall()
+
+    def remaining(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class QueueWorker:
+    def __init__(self, queue: JobQueue, engine, worker_id: Optional[str] = None,
+                 slots: int = DEFAULT_CONFIG["concurrency"],
+                 heartbeat_interval: float = QUEUE_CONFIG["heartbeat_interval"],
+                 commit_records: int = QUEUE_CONFIG["commit_records"],
+                 poll_interval: float = QUEUE_CONFIG["poll_interval"]):
+        from engine import TopicResult
+
+        self.queue = queue
+        self.engine = engine
+        self.worker_id = worker_id or default_worker_id()
+        self.slots = slots
+        self.heartbeat_interval = heartbeat_interval
+        self.commit_records = commit_records
+        self.poll_interval = poll_interval
+        self.held: Dict[Tuple[str, int], Job] = {}
+        # 주제별로 생성을 마쳤지만 아직 완료 처리하지 않은 작업과 그 레코드
+        self.uncommitted: Dict[str, List[Job]] = defaultdict(list)
+        self.records: Dict[str, List[Tuple[str, int, int]]] = defaultdict(list)
+        # 같은 샤드 이름에서 다음 번호를 고르므로 커밋은 한 번에 하나씩 한다
+        self.commit_lock = asyncio.Lock()
+        self.results: Dict[str, "TopicResult"] = {}
+        self.result_type = TopicResult
+        self.completed = 0
+        self.failed = 0
+
+    def _write_shards(self, prefix: str, records: List[Tuple[str, int, int]]) -> List[str]:
+        with self.engine.converter.open_writer(
+            f"{self.engine.output_dir}/{prefix}.{self.worker_id}",
+            max_records=OUTPUT_CONFIG["shard_max_records"],
+            max_bytes=OUTPUT_CONFIG["shard_max_bytes"],
+            compression=self.engine.compression,
+            prefix=prefix
+        ) as writer:
+            for line, turns, chars in records:
+                writer.write_line(line, turns, chars)
+        return writer.shards
+
+    async def _commit(self, prefix: str):
+        jobs = self.uncommitted.pop(prefix, [])
+        records = self.records.pop(prefix, [])
+        if not jobs:
+            return
+        async with self.commit_lock:
+            # 작업을 먼저 완료 처리하고, 성공한 경우에만 레코드를 샤드에 쓴다. 다른 워커가 가져간 작업이
+            # 섞여 있으면 그 워커가 다시 생성하므로 이 레코드는 버려 두 번 저장되지 않게 한다
+            # (완료 처리 직후 프로세스가 죽으면 그 레코드는 잃는다. 중복보다 누락을 택한다)
+            held = await asyncio.to_thread(self.queue.heartbeat, self.worker_id, jobs)
+            completed = 0
+            if len(held) == len(jobs):
+                completed = await asyncio.to_thread(self.queue.complete, self.worker_id, jobs)
+            if not completed:
+                await asyncio.to_thread(self.queue.release, self.worker_id, held)
+                print(f"Lost lease on {prefix} jobs; discarded {len(records)} uncommitted records")
+            else:
+                self.completed += completed
+                if records:
+                    shards = await asyncio.to_thread(self._write_shards, prefix, records)
+                    await asyncio.to_thread(self.queue.set_output, jobs, ",".join(shards))
+                    print(f"Committed {len(jobs)} {prefix} jobs to {', '.join(shards)}")
+        self._forget(jobs)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if self.held:
+                await asyncio.to_thread(self.queue.heartbeat, self.worker_id, list(self.held.values()))
+
+    async def _process(self, jobs: List[Job]):
+        from accounting import BudgetExhausted
+
+        prefix, topic = jobs[0].prefix, jobs[0].topic
+        result = self.results.setdefault(prefix, self.result_type(topic, prefix))
+        # 요청 묶음마다 따로 모아, 실패한 묶음의 레코드는 샤드에 섞이지 않게 한다
+        buffer = _RecordBuffer()
+        try:
+            accepted = await self.engine.generate_samples(topic, prefix, [job.sample for job in jobs], result, buffer)
+        except BudgetExhausted:
+            await asyncio.to_thread(self.queue.release, self.worker_id, jobs)
+            self._forget(jobs)
+            raise
+        except Exception as e:
+            print(f"Error generating {prefix} samples {[job.sample for job in jobs]}: {str(e)}")
+            dead = await asyncio.to_thread(self.queue.fail, self.worker_id, jobs, str(e))
+            self.failed += len(jobs)
+            if dead:
+                print(f"Moved {dead} {prefix} jobs to the dead-letter queue")
+            self._forget(jobs)
+            return
+
+        # 품질 검사에서 불합격한 작업은 실패로 돌려 재시도 대기 후 다시 생성하게 한다 (레코드는 쓰이지 않았다)
+        done = {sample for sample, _ in accepted}
+        rejected = [job for job in jobs if job.sample not in done]
+        if rejected:
+            dead = await asyncio.to_thread(self.queue.fail, self.worker_id, rejected, "rejected by the quality gate")
+            self.failed += len(rejected)
+            if dead:
+                print(f"Moved {dead} {prefix} jobs to the dead-letter queue")
+            self._forget(rejected)
+            jobs = [job for job in jobs if job.sample in done]
+
+        self.uncommitted[prefix].extend(jobs)
+        self.records[prefix].extend(buffer.records)
+        if len(self.uncommitted[prefix]) >= self.commit_records:
+            await self._commit(prefix)
+
+    def _forget(self, jobs: List[Job]):
+        for job in jobs:
+            self.held.pop((job.prefix, job.sample), None)
+
+    async def run(self, wait: bool = False) -> Dict[str, int]:
+        # 슬롯마다 같은 주제의 작업을 최대 max_n개씩 가져와 처리하고, 큐가 비면 샤드를 닫고 끝낸다
+        from accounting import BudgetExhausted
+
+        heartbeat = asyncio.create_task(self._heartbeat())
+        running = set()
+        stopping = False
+        try:
+            while True:
+                while not stopping and len(running) < self.slots:
+                    jobs = await asyncio.to_thread(self.queue.claim, self.worker_id, self.engine.max_n)
+                    if not jobs:
+                        break
+                    self.held.update(((job.prefix, job.sample), job) for job in jobs)
+                    running.add(asyncio.create_task(self._process(jobs)))
+
+                if not running:
+                    # 가져갈 작업이 없으면 모아 둔 작업부터 완료 처리한다
+                    # (그러지 않으면 --wait 중인 워커끼리 서로의 미완료 작업을 기다리게 된다)
+                    for prefix in list(self.uncommitted):
+                        await self._commit(prefix)
+                    if stopping or not wait or not await asyncio.to_thread(self.queue.remaining):
+                        break
+                    # 다른 워커가 쥔 작업의 임대가 끝나거나 재시도 대기가 끝날 때까지 기다린다
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if isinstance(task.exception(), BudgetExhausted):
+                        stopping = True
+        finally:
+            heartbeat.cancel()
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for prefix in list(self.uncommitted):
+                await self._commit(prefix)
+            if self.held:
+                await asyncio.to_thread(self.queue.release, self.worker_id, list(self.held.values()))
+                self.held.clear()
+
+        if stopping:
+            print("Budget exhausted: released remaining jobs")
+        return {"completed": self.completed, "failed": self.failed}
+
+
+async def run_worker(args) -> Dict[str, int]:
+    from client import close_async_client, get_async_client
+    from config import DEDUP_CONFIG, QUALITY_CONFIG, SYSTEM_PROMPTS
+    from converter import DataConverter
+    from cache import ResponseCache
+    from dedup import MinHashLSH
+    from engine import AsyncGenerationEngine
+    from hedging import HedgePolicy
+
+    queue = JobQueue(args.queue)
+    engine = AsyncGenerationEngine(
+        get_async_client(), DataConverter(system_message=SYSTEM_PROMPTS["security_expert"]),
+        concurrency=args.concurrency, output_dir=args.output_dir,
+        cache=None if args.no_cache else ResponseCache(),
+        dedup=MinHashLSH(path=DEDUP_CONFIG["index_path"]) if args.dedup != "off" else None,
+        dedup_mode=args.dedup, compression=args.compression,
+        quality=dict(QUALITY_CONFIG, mode=args.quality),
+        hedge=HedgePolicy() if args.hedge else None
+    )
+    worker = QueueWorker(queue, engine, args.worker_id, slots=args.concurrency)
+    print(f"Worker {worker.worker_id} started")
+    try:
+        summary = await worker.run(wait=args.wait)
+    finally:
+        await close_async_client()
+        queue.close()
+    print(f"Worker {worker.worker_id}: {summary['completed']} jobs completed, {summary['failed']} failed")
+    return summary
+
+
+def main(argv=None):
+    from config import DEDUP_CONFIG, HEDGE_CONFIG, QUALITY_CONFIG
+
+    parser = argparse.ArgumentParser(description="Shared SQLite job queue for multi-worker sweeps")
+    parser.add_argument("command", choices=["enqueue", "work", "status", "dead", "requeue-dead"])
+    parser.add_argument("--queue", default=QUEUE_CONFIG["path"], help="큐 데이터베이스 경로 (워커 간 공유)")
+    parser.add_argument("--num-sets", type=int, default=DEFAULT_CONFIG["num_sets"])
+    parser.add_argument("--worker-id", help="샤드 이름에 붙일 워커 ID (영숫자, 기본값: 호스트명+PID)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONFIG["concurrency"])
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--wait", action="store_true", help="다른 워커가 쥔 작업이 끝날 때까지 기다린 뒤 종료")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--dedup", choices=["reject", "flag", "off"], default=DEDUP_CONFIG["mode"])
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=OUTPUT_CONFIG["compression"])
+    parser.add_argument("--quality", choices=["repair", "reject", "off"], default=QUALITY_CONFIG["mode"])
+    parser.add_argument("--hedge", action=argparse.BooleanOptionalAction, default=HEDGE_CONFIG["enabled"])
+    args = parser.parse_args(argv)
+
+    if args.worker_id and not re.fullmatch(r'[0-9A-Za-z]+', args.worker_id):
+        parser.error("--worker-id must be alphanumeric")
+
+    if args.command == "work":
+        asyncio.run(run_worker(args))
+        return 0
+
+    queue = JobQueue(args.queue)
+    try:
+        if args.command == "enqueue":
+            # 주제 목록은 enqueue에서만 쓰므로 여기서 불러온다 (status/dead는 topics.py를 읽지 않는다)
+            from config import TOPICS
+            added = queue.enqueue(TOPICS, args.num_sets)
+            print(f"Enqueued {added} new jobs ({len(TOPICS)} topics x {args.num_sets} sets)")
+        elif args.command == "status":
+            for status, count in sorted(queue.stats().items()):
+                print(f"{status}: {count}")
+        elif args.command == "dead":
+            for prefix, sample, attempts, error in queue.dead_letters():
+                print(f"{prefix}:{sample} after {attempts} attempts: {error}")
+        elif args.command == "requeue-dead":
+            print(f"Requeued {queue.requeue_dead()} dead jobs")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,81 +1,173 @@
 # main.py
-import os
-from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
+# 단일 진입점. 하위 명령마다 필요한 모듈만 불러온다 (API 클라이언트와 emoji는 generate에서만).
+#   python main.py [generate] [--concurrency 8 ...]
+#   python main.py normalize|stats|export|index|dedup|quality|batch|queue [...]
+import argparse
+import asyncio
+import importlib
+import sys
 from config import (
     OPENAI_MODEL,
     MAX_TOKENS,
     TEMPERATURE,
-    TOPICS,
-    TOPIC_KEYWORDS,
     DEFAULT_CONFIG,
-    SYSTEM_PROMPTS,
-    OUTPUT_DIR
+    DEDUP_CONFIG,
+    OUTPUT_CONFIG,
+    BUDGET_CONFIG,
+    TRACE_CONFIG,
+    QUALITY_CONFIG,
+    HEDGE_CONFIG,
+    HTTP_POOL_CONFIG,
+    SYSTEM_PROMPTS
 )
-from converter import DataConverter  # JSONL 저장용 컨버터 클래스
+
+# 하위 명령 -> (모듈, 앞에 붙일 인자). 모듈은 해당 명령을 실행할 때만 import한다.
+COMMANDS = {
+    "normalize": ("reprocess", []),
+    "stats": ("corpus_index", ["stats"]),
+    "export": ("export", []),
+    "index": ("corpus_index", []),
+    "dedup": ("dedup", []),
+    "quality": ("quality", []),
+    "batch": ("batch", []),
+    "queue": ("jobqueue", []),
+}
+
 
 def generate_conversations(topic: str, prefix: str, num_sets: int = DEFAULT_CONFIG["num_sets"]):
-    load_dotenv()
-    client = OpenAI(timeout=60.0)
-    
-    keywords = TOPIC_KEYWORDS.get(prefix, [])
-    keywords_text = "\n".join(f"- {k}" for k in keywords)
-    
-    prompt = f"""주제 '{topic}'에 대한 자연스럽고 심도 있는 대화를 생성합니다. 
-
-주요 키워드:
-{keywords_text}
-
-대화 형식:
-- 총 3개의 질문-답변 쌍으로 구성합니다.
-- 유저는 Assistant의 답변에 단순 공감이나 단조로운 피드백을 하지 않고, 구체적이고 실질적인 질문을 통해 대화를 확장시킵니다.
-- 각 응답은 최소 500자 이상으로 작성해 주세요.
-
-구성 예시:
-1. User는 기본 개념에 대한 질문을 합니다.
-2. Assistant는 개념 설명 후, 실무와의 관련성을 묻는 질문을 던집니다.
-3. User는 단순 공감 없이, 실무 적용 사례나 추가 궁금증을 바탕으로 추가 질문을 이어갑니다.
-4. Assistant는 이에 대해 깊이 있는 답변과 함께, 관련된 최신 동향을 언급하고, User의 의견을 묻는 질문으로 마무리합니다.
-
-구체적인 형식은 다음과 같습니다:
-User: [구체적인 질문]
-Assistant: [상세한 답변과 유도 질문]"""
+    from client import get_client
+    from prompts import build_messages, parse_conversation
+
+    client = get_client()
 
     try:
         response = client.chat.completions.create(
             model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPTS["security_expert"]},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_messages(topic, prefix),
             temperature=TEMPERATURE,
             max_tokens=MAX_TOKENS,
+            n=num_sets,
             timeout=30
         )
-        
-        text = response.choices[0].message.content
-        conversation = []
-        
-        for line in text.strip().split('\n'):
-            if line.startswith(('User:', 'Assistant:')):
-                content = line.split(':', 1)[1].strip()
-                if content:
-                    conversation.append(content)
-        
-        return [conversation] if conversation else []
+
+        conversations = [parse_conversation(choice.message.content or "") for choice in response.choices]
+        return [conv for conv in conversations if conv]
             
     except Exception as e:
         print(f"Error generating conversation for {topic}: {str(e)}")
         return []
-    
-if __name__ == "__main__":
+
+async def run_sweep(concurrency: int, num_sets: int, use_cache: bool = True,
+                    run_id: str = None, fresh: bool = False, stream: bool = DEFAULT_CONFIG["stream"],
+                    dedup_mode: str = DEDUP_CONFIG["mode"], compression: str = OUTPUT_CONFIG["compression"],
+                    token_budget: int = BUDGET_CONFIG["token_budget"],
+                    cost_budget: float = BUDGET_CONFIG["cost_budget"],
+                    target_records: int = BUDGET_CONFIG["target_records"],
+                    trace_output: str = TRACE_CONFIG["output"],
+                    quality_mode: str = QUALITY_CONFIG["mode"],
+                    hedge: bool = HEDGE_CONFIG["enabled"],
+                    deadline: float = HTTP_POOL_CONFIG["deadline"]):
+    from config import TOPICS
+    from accounting import BudgetScheduler, UsageTracker
+    from cache import ResponseCache, RunManifest, run_signature
+    from client import close_async_client, get_async_client
+    from converter import DataConverter  # JSONL 저장용 컨버터 클래스
+    from dedup import MinHashLSH
+    from engine import AsyncGenerationEngine
+    from hedging import HedgePolicy
+    from tracing import LatencyTracer
+
     converter = DataConverter(system_message=SYSTEM_PROMPTS["security_expert"])
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    for topic, prefix in TOPICS:
-        conversations = generate_conversations(topic, prefix)  # prefix 전달
-        if conversations:
-            output_file = f"{OUTPUT_DIR}/{prefix}_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl"
-            converter.save_to_jsonl(conversations, output_file)
-            print(f"\nSaved {len(conversations)} conversations to {output_file}")
\ No newline at end of file
+    cache = manifest = None
+    if use_cache:
+        cache = ResponseCache()
+        run_id = run_id or run_signature(
+            OPENAI_MODEL, {"temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}, TOPICS, num_sets
+        )
+        manifest = RunManifest.for_run(run_id, fresh=fresh)
+        print(f"Run ID: {run_id}")
+
+    dedup = MinHashLSH(path=DEDUP_CONFIG["index_path"]) if dedup_mode != "off" else None
+
+    tracker = UsageTracker()
+    scheduler = None
+    if token_budget is not None or cost_budget is not None or target_records is not None:
+        scheduler = BudgetScheduler(tracker, token_budget, cost_budget, target_records)
+
+    engine = AsyncGenerationEngine(get_async_client(), converter, concurrency=concurrency, num_sets=num_sets,
+                                   cache=cache, manifest=manifest, stream=stream,
+                                   dedup=dedup, dedup_mode=dedup_mode, compression=compression,
+                                   tracker=tracker, scheduler=scheduler,
+                                   tracer=LatencyTracer(enabled=bool(trace_output)),
+                                   quality=dict(QUALITY_CONFIG, mode=quality_mode),
+                                   hedge=HedgePolicy() if hedge else None, deadline=deadline)
+
+    try:
+        return await engine.run(TOPICS)
+    finally:
+        await close_async_client()
+        report = tracker.write_report(run_id=run_id, **(scheduler.summary() if scheduler else {}),
+                                      **(engine.hedge.summary() if engine.hedge else {}))
+        print(f"Usage report: {report}")
+        if trace_output:
+            print(f"Latency report: {engine.tracer.write(trace_output)}")
+
+
+def generate_main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate security conversation datasets")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONFIG["concurrency"])
+    parser.add_argument("--num-sets", type=int, default=DEFAULT_CONFIG["num_sets"])
+    parser.add_argument("--no-cache", action="store_true", help="응답 캐시와 재개용 매니페스트를 사용하지 않음")
+    parser.add_argument("--run-id", help="재개할 실행 ID (기본값: 설정 해시)")
+    parser.add_argument("--fresh", action="store_true", help="매니페스트를 초기화하고 캐시에서 전체 출력을 다시 생성")
+    parser.add_argument("--no-stream", action="store_true", help="스트리밍 없이 전체 응답을 한 번에 받음")
+    parser.add_argument("--dedup", choices=["reject", "flag", "off"], default=DEDUP_CONFIG["mode"],
+                        help="유사 중복 대화 처리 방식")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=OUTPUT_CONFIG["compression"])
+    parser.add_argument("--token-budget", type=int, default=BUDGET_CONFIG["token_budget"],
+                        help="실행당 최대 토큰 수")
+    parser.add_argument("--cost-budget", type=float, default=BUDGET_CONFIG["cost_budget"],
+                        help="실행당 최대 비용 (USD)")
+    parser.add_argument("--target-records", type=int, default=BUDGET_CONFIG["target_records"],
+                        help="주제별 목표 레코드 수 (기존 출력이 적은 주제부터 생성)")
+    parser.add_argument("--trace-output", default=TRACE_CONFIG["output"],
+                        help="단계별 지연 시간 보고서 경로 (.prom이면 Prometheus textfile, 빈 값이면 비활성화)")
+    parser.add_argument("--quality", choices=["repair", "reject", "off"], default=QUALITY_CONFIG["mode"],
+                        help="품질 검사 불합격 대화 처리 방식 (repair: 실패한 턴만 다시 생성)")
+    parser.add_argument("--hedge", action=argparse.BooleanOptionalAction, default=HEDGE_CONFIG["enabled"],
+                        help="첫 토큰이 최근 지연의 백분위수보다 늦으면 같은 요청을 한 번 더 보내고 먼저 끝난 쪽을 사용")
+    parser.add_argument("--deadline", type=float, default=HTTP_POOL_CONFIG["deadline"],
+                        help="요청 시도 하나의 전체 제한 시간(초). 넘기면 취소하고 재시도 (0이면 제한 없음)")
+    parser.add_argument("--profile", nargs="?", const=TRACE_CONFIG["profile_output"],
+                        help="cProfile로 실행을 감싸고 상위 함수 통계를 출력 (경로를 주면 pstats 파일도 저장)")
+    args = parser.parse_args(argv)
+
+    sweep = run_sweep(args.concurrency, args.num_sets, not args.no_cache, args.run_id, args.fresh,
+                      not args.no_stream, args.dedup, args.compression,
+                      args.token_budget, args.cost_budget, args.target_records, args.trace_output,
+                      args.quality, args.hedge, args.deadline)
+    if args.profile:
+        from tracing import profiled
+        with profiled(args.profile):
+            asyncio.run(sweep)
+    else:
+        asyncio.run(sweep)
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in COMMANDS:
+        module_name, prefix_args = COMMANDS[argv[0]]
+        return importlib.import_module(module_name).main(prefix_args + argv[1:])
+    if argv and argv[0] == "generate":
+        argv = argv[1:]
+    elif argv and argv[0] in ("-h", "--help"):
+        print(f"usage: main.py [generate|{'|'.join(COMMANDS)}] [options]")
+        print("하위 명령 없이 실행하면 generate로 동작한다. 명령별 옵션은 'main.py <명령> --help'로 확인한다.")
+        return 0
+    return generate_main(argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
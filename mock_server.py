@@ -0,0 +1,213 @@
+# mock_server.py
+# chat completions 엔드포인트의 로컬 스탠드인. training_data의 대화를 재생하며
+# 지연, 스트리밍 청크, 429/5xx 주입과 토큰 사용량을 흉내 낸다.
+#   python mock_server.py [--port 8765] [--latency 0.3] [--rate-limit-rate 0.05] [--slow-rate 0.02]
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock python main.py
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import MOCK_SERVER_CONFIG, OUTPUT_DIR
+from canned import CannedResponder
+
+
+class MockChatHandler(BaseHTTPRequestHandler):
+    # 커넥션 풀 재사용을 흉내 내도록 keep-alive를 지원한다
+    protocol_version = "HTTP/1.1"
+    server: "MockOpenAIServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, data: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+
+        request_no, fault = self.server.pick_fault()
+        if fault == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests",
+                                            "code": "rate_limit_exceeded"}},
+                            {"retry-after": str(self.server.retry_after)})
+            return
+        if fault:
+            self._send_json(fault, {"error": {"message": "The server had an error (mock)", "type": "server_error"}})
+            return
+
+        # 같은 프롬프트의 반복 요청에도 실제 API처럼 다른 대화를 돌려주도록 요청 번호를 섞는다
+        completion = self.server.responder.completion(body, salt=str(request_no))
+        time.sleep(self.server.first_token_delay())
+        try:
+            if body.get("stream"):
+                include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                self._stream(completion, include_usage)
+            else:
+                chunks = sum(len(self.server.split(c["message"]["content"])) for c in completion["choices"])
+                time.sleep(chunks * self.server.chunk_delay)
+                self._send_json(200, completion)
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 응답 도중 연결을 끊음 (예: 복제 요청 경쟁에서 진 쪽)
+            with self.server.lock:
+                self.server.stats["disconnected"] += 1
+            self.close_connection = True
+
+    def _stream(self, completion: Dict, include_usage: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in self.server.stream_events(completion, include_usage):
+            self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = MOCK_SERVER_CONFIG["host"], port: int = MOCK_SERVER_CONFIG["port"],
+                 responder: Optional[CannedResponder] = None,
+                 latency: float = MOCK_SERVER_CONFIG["latency"],
+                 latency_jitter: float = MOCK_SERVER_CONFIG["latency_jitter"],
+                 chunk_chars: int = MOCK_SERVER_CONFIG["chunk_chars"],
+                 chunk_delay: float = MOCK_SERVER_CONFIG["chunk_delay"],
+                 rate_limit_rate: float = MOCK_SERVER_CONFIG["rate_limit_rate"],
+                 server_error_rate: float = MOCK_SERVER_CONFIG["server_error_rate"],
+                 retry_after: float = MOCK_SERVER_CONFIG["retry_after"],
+                 slow_rate: float = MOCK_SERVER_CONFIG["slow_rate"],
+                 slow_latency: float = MOCK_SERVER_CONFIG["slow_latency"],
+                 seed: int = MOCK_SERVER_CONFIG["seed"]):
+        super().__init__((host, port), MockChatHandler)
+        self.responder = responder or CannedResponder(OUTPUT_DIR)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def pick_fault(self) -> Tuple[int, int]:
+        with self.lock:
+            self.stats["requests"] += 1
+            request_no = self.stats["requests"]
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                fault = 429
+            elif roll < self.rate_limit_rate + self.server_error_rate:
+                fault = self.rng.choice((500, 503))
+            else:
+                fault = 0
+            self.stats[str(fault or 200)] += 1
+            return request_no, fault
+
+    def first_token_delay(self) -> float:
+        with self.lock:
+            jitter = self.rng.expovariate(1 / self.latency_jitter) if self.latency_jitter > 0 else 0.0
+            # 느린 복제본에 배정된 요청처럼 드물게 큰 지연을 더한다
+            if self.slow_rate and self.rng.random() < self.slow_rate:
+                self.stats["slow"] += 1
+                jitter += self.slow_latency
+        return self.latency + jitter
+
+    def split(self, text: str) -> List[str]:
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+
+    def stream_events(self, completion: Dict, include_usage: bool) -> Iterator[Dict]:
+        # n개의 선택지는 실제 API처럼 choice.index를 달고 번갈아 흘려보낸다
+        base = {"id": completion["id"], "object": "chat.completion.chunk",
+                "created": completion["created"], "model": completion["model"]}
+        pieces: List[Tuple[int, List[str]]] = [
+            (choice["index"], self.split(choice["message"]["content"])) for choice in completion["choices"]
+        ]
+        for position in range(max(len(parts) for _, parts in pieces)):
+            for index, parts in pieces:
+                if position < len(parts):
+                    delta = {"content": parts[position]}
+                    if position == 0:
+                        delta["role"] = "assistant"
+                    yield dict(base, choices=[{"index": index, "delta": delta, "finish_reason": None}])
+        for choice in completion["choices"]:
+            yield dict(base, choices=[{"index": choice["index"], "delta": {},
+                                       "finish_reason": choice["finish_reason"]}])
+        if include_usage:
+            yield dict(base, choices=[], usage=completion["usage"])
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self.serve_forever, name="mock-openai", daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions endpoint")
+    parser.add_argument("--host", default=MOCK_SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=MOCK_SERVER_CONFIG["port"])
+    parser.add_argument("--data", default=OUTPUT_DIR, help="재생할 대화가 있는 디렉터리")
+    parser.add_argument("--latency", type=float, default=MOCK_SERVER_CONFIG["latency"])
+    parser.add_argument("--latency-jitter", type=float, default=MOCK_SERVER_CONFIG["latency_jitter"])
+    parser.add_argument("--chunk-chars", type=int, default=MOCK_SERVER_CONFIG["chunk_chars"])
+    parser.add_argument("--chunk-delay", type=float, default=MOCK_SERVER_CONFIG["chunk_delay"])
+    parser.add_argument("--rate-limit-rate", type=float, default=MOCK_SERVER_CONFIG["rate_limit_rate"])
+    parser.add_argument("--server-error-rate", type=float, default=MOCK_SERVER_CONFIG["server_error_rate"])
+    parser.add_argument("--slow-rate", type=float, default=MOCK_SERVER_CONFIG["slow_rate"])
+    parser.add_argument("--slow-latency", type=float, default=MOCK_SERVER_CONFIG["slow_latency"])
+    parser.add_argument("--seed", type=int, default=MOCK_SERVER_CONFIG["seed"])
+    args = parser.parse_args(argv)
+
+    server = MockOpenAIServer(args.host, args.port, CannedResponder(args.data), args.latency, args.latency_jitter,
+                              args.chunk_chars, args.chunk_delay, args.rate_limit_rate, args.server_error_rate,
+                              slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=args.seed)
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.stats['requests']} requests: "
+              f"{', '.join(f'{code}={n}' for code, n in sorted(server.stats.items()) if code != 'requests')}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+# prompts.py
+from typing import List, Dict, Optional, Tuple
+from config import TOPIC_KEYWORDS, SYSTEM_PROMPTS
+
+
+# 모든 주제가 공유하는 형식 지시문. 시스템 프롬프트 바로 뒤에 두어 요청 간 공통 접두부를 최대화하고
+# (공급자 측 프롬프트 캐시 적중), 주제별로 달라지는 부분은 맨 끝에 붙인다.
+FORMAT_INSTRUCTIONS = """아래에 주어진 주제에 대한 자연스럽고 심도 있는 대화를 생성합니다.
+
+대화 형식:
+- 총 3개의 질문-답변 쌍으로 구성합니다.
+- 유저는 Assistant의 답변에 단순 공감이나 단조로운 피드백을 하지 않고, 구체적이고 실질적인 질문을 통해 대화를 확장시킵니다.
+- 각 응답은 최소 500자 이상으로 작성해 주세요.
+
+구성 예시:
+1. User는 기본 개념에 대한 질문을 합니다.
+2. Assistant는 개념 설명 후, 실무와의 관련성을 묻는 질문을 던집니다.
+3. User는 단순 공감 없이, 실무 적용 사례나 추가 궁금증을 바탕으로 추가 질문을 이어갑니다.
+4. Assistant는 이에 대해 깊이 있는 답변과 함께, 관련된 최신 동향을 언급하고, User의 의견을 묻는 질문으로 마무리합니다.
+
+구체적인 형식은 다음과 같습니다:
+User: [구체적인 질문]
+Assistant: [상세한 답변과 유도 질문]"""
+
+
+def build_prompt(topic: str, prefix: str) -> str:
+    keywords = TOPIC_KEYWORDS.get(prefix, [])
+    keywords_text = "\n".join(f"- {k}" for k in keywords)
+
+    return f"""{FORMAT_INSTRUCTIONS}
+
+주제: {topic}
+
+주요 키워드:
+{keywords_text}"""
+
+
+def build_messages(topic: str, prefix: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPTS["security_expert"]},
+        {"role": "user", "content": build_prompt(topic, prefix)}
+    ]
+
+
+def format_turns(turns: List[str]) -> str:
+    return '\n'.join(f"{'User' if i % 2 == 0 else 'Assistant'}: {text}" for i, text in enumerate(turns))
+
+
+def build_answer_messages(topic: str, prefix: str, turns: List[str], index: int,
+                          min_chars: int) -> List[Dict[str, str]]:
+    # 원래 요청과 같은 접두부 뒤에 지금까지의 대화를 붙이고, index번째 답변 하나만 다시 쓰게 한다
+    return build_messages(topic, prefix) + [
+        {"role": "assistant", "content": format_turns(turns[:index])},
+        {"role": "user", "content": f"위 대화의 마지막 User 질문에 대한 답변만 다시 작성해 주세요. "
+                                    f"최소 {min_chars}자 이상으로 구체적으로 작성하고, "
+                                    f"'Assistant:'로 시작하는 한 턴만 출력합니다."}
+    ]
+
+
+def build_continue_messages(topic: str, prefix: str, turns: List[str], pairs: int) -> List[Dict[str, str]]:
+    # 검증을 통과한 앞부분은 유지하고 빠지거나 잘린 턴부터 이어서 생성하게 한다
+    return build_messages(topic, prefix) + [
+        {"role": "assistant", "content": format_turns(turns)},
+        {"role": "user", "content": f"위 대화를 이어서 총 {pairs}개의 질문-답변 쌍이 되도록 남은 턴만 "
+                                    f"같은 형식(User:/Assistant:)으로 작성해 주세요. 이미 작성된 턴은 반복하지 않습니다."}
+    ]
+
+
+class TurnParser:
+    # 스트리밍 청크를 받아 'User:'/'Assistant:' 표지로 턴을 나누는 상태 기계.
+    # 청크 경계에 걸친 줄과 여러 줄로 된 답변 본문을 하나의 턴으로 모은다.
+    MARKERS = ('User:', 'Assistant:')
+
+    def __init__(self):
+        self.partial = ""
+        self.current: Optional[List[str]] = None
+        self.current_role: Optional[str] = None
+        self.turns: List[str] = []
+        self.roles: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        completed = []
+        self.partial += chunk
+        *lines, self.partial = self.partial.split('\n')
+        for line in lines:
+            self._feed_line(line, completed)
+        return completed
+
+    def close(self) -> List[str]:
+        completed = []
+        if self.partial:
+            self._feed_line(self.partial, completed)
+            self.partial = ""
+        self._finish_turn(completed)
+        return completed
+
+    def _feed_line(self, line: str, completed: List[str]):
+        if line.startswith(self.MARKERS):
+            self._finish_turn(completed)
+            self.current = [line.split(':', 1)[1]]
+            self.current_role = "user" if line.startswith('User:') else "assistant"
+        elif self.current is not None:
+            self.current.append(line)
+
+    def _finish_turn(self, completed: List[str]):
+        if self.current is not None:
+            content = '\n'.join(self.current).strip()
+            if content:
+                completed.append(content)
+                self.turns.append(content)
+                self.roles.append(self.current_role)
+            self.current = None
+
+
+def parse_turns(text: str) -> Tuple[List[str], List[str]]:
+    parser = TurnParser()
+    parser.feed(text)
+    parser.close()
+    return parser.turns, parser.roles
+
+
+def parse_conversation(text: str) -> List[str]:
+    return parse_turns(text)[0]
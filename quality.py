@@ -0,0 +1,158 @@
+# quality.py
+# 파싱된 대화가 프롬프트 요구사항(질문-답변 쌍 수, 역할 교대, 답변 길이, 한글 비율, 잘림)을
+# 만족하는지 저장 전에 검사하고, 실패한 부분만 다시 생성하도록 복구 계획을 세운다.
+#   python quality.py [training_data] [--rejects PATH]
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from config import OUTPUT_DIR, QUALITY_CONFIG
+from converter import list_jsonl_files, open_jsonl
+
+_HANGUL = re.compile('[가-힣ㄱ-ㆎ]+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass(frozen=True)
+class Issue:
+    kind: str  # turns, alternation, short, hangul, truncated
+    turn: Optional[int] = None
+    detail: str = ""
+
+    def __str__(self):
+        where = f" (turn {self.turn})" if self.turn is not None else ""
+        return f"{self.kind}{where}: {self.detail}" if self.detail else f"{self.kind}{where}"
+
+
+def hangul_ratio(text: str) -> float:
+    # 문자 단위 findall 대신 제거 전후 길이 차이로 센다
+    letters = len(_WHITESPACE.sub('', text))
+    if not letters:
+        return 0.0
+    return (len(text) - len(_HANGUL.sub('', text))) / letters
+
+
+def expected_roles(count: int) -> List[str]:
+    return ["user" if i % 2 == 0 else "assistant" for i in range(count)]
+
+
+def valid_prefix(roles: Sequence[str]) -> int:
+    # user로 시작해 번갈아 나오는 가장 긴 앞부분의 길이
+    for i, role in enumerate(roles):
+        if role != ("user" if i % 2 == 0 else "assistant"):
+            return i
+    return len(roles)
+
+
+def check_conversation(turns: List[str], roles: Optional[List[str]] = None,
+                       finish_reason: Optional[str] = None, config: Dict = QUALITY_CONFIG) -> List[Issue]:
+    issues = []
+    expected = config["pairs"] * 2
+    if finish_reason == "length":
+        issues.append(Issue("truncated", len(turns) - 1 if turns else None, "finish_reason is 'length'"))
+    if len(turns) != expected:
+        issues.append(Issue("turns", detail=f"{len(turns)} turns, expected {expected}"))
+    if roles is not None:
+        prefix = valid_prefix(roles)
+        if prefix < len(roles):
+            issues.append(Issue("alternation", prefix, f"unexpected {roles[prefix]!r} turn"))
+
+    for i in range(1, len(turns), 2):
+        answer = turns[i]
+        if len(answer) < config["min_answer_chars"]:
+            issues.append(Issue("short", i, f"{len(answer)} chars, expected >= {config['min_answer_chars']}"))
+        ratio = hangul_ratio(answer)
+        if ratio < config["min_hangul_ratio"]:
+            issues.append(Issue("hangul", i, f"ratio {ratio:.2f}, expected >= {config['min_hangul_ratio']}"))
+    return issues
+
+
+def check_batch(items: Iterable[Tuple[List[str], Optional[List[str]], Optional[str]]],
+                config: Dict = QUALITY_CONFIG) -> List[List[Issue]]:
+    return [check_conversation(turns, roles, finish_reason, config) for turns, roles, finish_reason in items]
+
+
+def plan_repair(turns: List[str], roles: Optional[List[str]], issues: List[Issue],
+                config: Dict = QUALITY_CONFIG) -> Tuple[str, List[int]]:
+    # 한 번에 한 가지만 고친다. 유지할 수 있는 앞부분 안의 답변 문제는 그 답변만 다시 생성하고,
+    # 그다음 빠지거나 잘리거나 역할이 어긋난 턴은 유지한 앞부분에서부터 이어서 생성한다.
+    expected = config["pairs"] * 2
+    keep = min(len(turns), expected)
+    if roles is not None:
+        keep = min(keep, valid_prefix(roles))
+    if any(issue.kind == "truncated" for issue in issues):
+        keep = min(keep, len(turns) - 1)
+    keep = max(keep, 0)
+
+    answers = sorted({issue.turn for issue in issues
+                      if issue.kind in ("short", "hangul") and issue.turn is not None and issue.turn < keep})
+    if answers:
+        return "answer", answers
+    if keep < expected or len(turns) != expected:
+        return "continue", [keep]
+    return "none", []
+
+
+def record_turns(messages: List[Dict]) -> Tuple[List[str], List[str]]:
+    turns = [m for m in messages if m.get("role") != "system"]
+    return [m.get("content") or "" for m in turns], [m.get("role") for m in turns]
+
+
+def append_rejects(path: str, records: List[Dict]):
+    if not records:
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+
+
+def check_corpus(paths: List[str], rejects_path: Optional[str] = None,
+                 config: Dict = QUALITY_CONFIG) -> Tuple[int, int, Counter]:
+    total = failed = 0
+    kinds = Counter()
+    for path in paths:
+        with open_jsonl(path) as f:
+            lines = [line for line in f if line.strip()]
+        parsed = [record_turns(json.loads(line)["messages"]) for line in lines]
+        results = check_batch(((turns, roles, None) for turns, roles in parsed), config)
+
+        rejects = []
+        for line_no, ((turns, _), issues) in enumerate(zip(parsed, results)):
+            if issues:
+                failed += 1
+                kinds.update(issue.kind for issue in issues)
+                rejects.append({"source": f"{os.path.basename(path)}:{line_no}",
+                                "issues": [str(issue) for issue in issues], "turns": turns})
+        total += len(lines)
+        if rejects_path:
+            append_rejects(rejects_path, rejects)
+    return total, failed, kinds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check conversations against the prompt's quality requirements")
+    parser.add_argument("input", nargs="?", default=OUTPUT_DIR, help="JSONL 파일 또는 디렉터리")
+    parser.add_argument("--rejects", help="검사에 실패한 레코드와 사유를 기록할 JSONL 경로")
+    parser.add_argument("--min-answer-chars", type=int, default=QUALITY_CONFIG["min_answer_chars"])
+    parser.add_argument("--min-hangul-ratio", type=float, default=QUALITY_CONFIG["min_hangul_ratio"])
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        paths = list_jsonl_files(args.input)
+    else:
+        paths = [args.input]
+
+    config = dict(QUALITY_CONFIG, min_answer_chars=args.min_answer_chars, min_hangul_ratio=args.min_hangul_ratio)
+    total, failed, kinds = check_corpus(paths, args.rejects, config)
+    print(f"{total - failed}/{total} records passed")
+    for kind, count in kinds.most_common():
+        print(f"  {kind}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+# ratelimit.py
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from config import MAX_TOKENS, RATE_LIMIT_CONFIG
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    # 요청 시도가 전체 제한 시간을 넘김. 타임아웃처럼 재시도한다
+    pass
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int = MAX_TOKENS) -> int:
+    # 서버는 요청 시점에 max_tokens 전체를 TPM 한도에서 차감하므로 그대로 예약한다.
+    # 한국어는 대략 1~2자당 1토큰이므로 프롬프트는 보수적으로 글자 수의 절반으로 추정
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 2 + max_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, rate_scale: float):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity * rate_scale / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, rate_scale: float) -> float:
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / (self.capacity * rate_scale)
+
+
+class AdaptiveRateLimiter:
+    def __init__(self,
+                 requests_per_minute: float = RATE_LIMIT_CONFIG["requests_per_minute"],
+                 tokens_per_minute: float = RATE_LIMIT_CONFIG["tokens_per_minute"],
+                 min_scale: float = RATE_LIMIT_CONFIG["min_scale"],
+                 increase_step: float = RATE_LIMIT_CONFIG["increase_step"],
+                 decrease_factor: float = RATE_LIMIT_CONFIG["decrease_factor"]):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.min_scale = min_scale
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        # 단일 요청이 버킷 용량을 넘으면 영원히 대기하게 되므로 용량으로 제한
+        tokens = min(tokens, self.tokens.capacity)
+
+        async with self.lock:
+            while True:
+                delay = self.blocked_until - time.monotonic()
+                if delay <= 0:
+                    self.requests.refill(self.scale)
+                    self.tokens.refill(self.scale)
+                    delay = max(self.requests.wait_time(1, self.scale),
+                                self.tokens.wait_time(tokens, self.scale))
+                    if delay <= 0:
+                        self.requests.tokens -= 1
+                        self.tokens.tokens -= tokens
+                        return
+                await asyncio.sleep(delay)
+
+    def release(self, tokens: int):
+        # 거절된 요청은 서버 한도를 소모하지 않으므로 예약분을 돌려준다
+        self.requests.tokens = min(self.requests.capacity, self.requests.tokens + 1)
+        self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + min(tokens, self.tokens.capacity))
+
+    def on_success(self):
+        # AIMD: 성공 시 가산 증가
+        self.scale = min(1.0, self.scale + self.increase_step)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        # AIMD: 429 수신 시 승산 감소, Retry-After 동안 모든 요청을 멈춘다
+        self.scale = max(self.min_scale, self.scale * self.decrease_factor)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int,
+                  base_delay: float = RATE_LIMIT_CONFIG["base_delay"],
+                  max_delay: float = RATE_LIMIT_CONFIG["max_delay"]) -> float:
+    # full jitter 지수 백오프
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def call_with_retries(call: Callable[[], Awaitable[T]],
+                            limiter: AdaptiveRateLimiter,
+                            tokens: int,
+                            max_retries: int = RATE_LIMIT_CONFIG["max_retries"]) -> T:
+    attempt = 0
+    while True:
+        await limiter.acquire(tokens)
+        try:
+            result = await call()
+        except RateLimitError as e:
+            if attempt >= max_retries:
+                raise
+            retry_after = parse_retry_after(e)
+            limiter.release(tokens)
+            limiter.on_throttle(retry_after)
+            delay = retry_after + random.uniform(0, 1.0) if retry_after is not None else backoff_delay(attempt)
+            print(f"Rate limited, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+        except (APITimeoutError, APIConnectionError, InternalServerError, DeadlineExceeded) as e:
+            if attempt >= max_retries:
+                raise
+            retry_after = parse_retry_after(e)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            print(f"{type(e).__name__}: retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+        else:
+            limiter.on_success()
+            return result
+
+        attempt += 1
+        await asyncio.sleep(delay)
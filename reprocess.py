@@ -0,0 +1,221 @@
+# reprocess.py
+# OUTPUT_DIR의 JSONL을 다시 정규화하고 스키마를 검사해 원자적으로 다시 쓴다.
+#   python reprocess.py [training_data] [--output-dir DIR] [--workers N] [--drop-invalid] [--dry-run]
+import argparse
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+from config import OUTPUT_DIR
+from corpus_index import index_path
+from converter import (
+    NormalizationConfig,
+    TextNormalizer,
+    compression_for,
+    list_jsonl_files,
+    open_compressed,
+    open_jsonl,
+    validate_messages
+)
+
+_normalizer: Optional[TextNormalizer] = None
+
+
+@dataclass
+class FileStats:
+    path: str
+    records: int = 0
+    changed: int = 0
+    invalid: int = 0
+    dropped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _init_worker(config: NormalizationConfig):
+    global _normalizer
+    _normalizer = TextNormalizer(config)
+
+
+def process_chunk(lines: List[str], drop_invalid: bool = False) -> Tuple[List[str], int, int, List[str]]:
+    output = []
+    changed = invalid = 0
+    errors = []
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            messages = record["messages"]
+        except (ValueError, KeyError, TypeError) as e:
+            problems = [f"unreadable record: {e}"]
+            messages = None
+        else:
+            if isinstance(messages, list):
+                for message in messages:
+                    if isinstance(message, dict) and message.get("role") in ("user", "assistant") \
+                            and isinstance(message.get("content"), str):
+                        message["content"] = _normalizer.normalize(message["content"])
+            problems = validate_messages(messages)
+
+        if problems:
+            invalid += 1
+            errors.extend(problems[:1])
+            # 기본값은 원본 줄을 그대로 남긴다. 잘못된 레코드를 조용히 잃지 않도록 삭제는 명시적으로만 한다
+            if not drop_invalid:
+                output.append(line if line.endswith('\n') else line + '\n')
+            continue
+
+        encoded = json.dumps({**record, "messages": messages}, ensure_ascii=False) + '\n'
+        if encoded.rstrip('\n') != line.rstrip('\n'):
+            changed += 1
+        output.append(encoded)
+
+    return output, changed, invalid, errors
+
+
+def iter_chunks(paths: List[str], chunk_size: int) -> Iterator[Tuple[str, List[str]]]:
+    # 파일마다 마지막 청크(비어 있을 수 있음)를 반드시 내보내 파일 경계를 표시한다
+    for path in paths:
+        with open_jsonl(path) as f:
+            chunk = []
+            for line in f:
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield path, chunk
+                    chunk = []
+            yield path, chunk
+
+
+class AtomicFileWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        # 원본과 같은 압축 형식으로 쓴다
+        self.file = open_compressed(self.tmp_path, 'wb', compression_for(path))
+
+    def write_lines(self, lines: List[str]):
+        self.file.write(''.join(lines).encode('utf-8'))
+
+    def commit(self):
+        self.file.close()
+        with open(self.tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+        # 레코드 오프셋이 바뀌었으므로 기존 인덱스는 지운다 (corpus_index가 다시 만든다)
+        if os.path.exists(index_path(self.path)):
+            os.remove(index_path(self.path))
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+
+def reprocess(paths: List[str], output_dir: Optional[str] = None,
+              config: Optional[NormalizationConfig] = None,
+              workers: Optional[int] = None, chunk_size: int = 1000,
+              drop_invalid: bool = False, dry_run: bool = False) -> List[FileStats]:
+    config = config or NormalizationConfig()
+    workers = workers or os.cpu_count() or 1
+    if output_dir and not dry_run:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    current: Optional[FileStats] = None
+    writer: Optional[AtomicFileWriter] = None
+
+    def finish():
+        if writer is not None:
+            writer.commit()
+        results.append(current)
+        print(f"{current.path}: {current.records} records, {current.changed} changed, {current.invalid} invalid"
+              + (f", {current.dropped} dropped" if current.dropped else ""))
+        for error in current.errors[:5]:
+            print(f"  - {error}")
+
+    # 처리 중인 청크 수를 제한해 메모리 사용량을 코어 수에 비례하는 수준으로 묶는다
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+        pending = deque()
+        chunks = iter_chunks(paths, chunk_size)
+
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    item = next(chunks, None)
+                    if item is None:
+                        break
+                    path, lines = item
+                    pending.append((path, pool.submit(process_chunk, lines, drop_invalid)))
+                if not pending:
+                    break
+
+                path, future = pending.popleft()
+                lines, changed, invalid, errors = future.result()
+
+                if current is None or current.path != path:
+                    if current is not None:
+                        finish()
+                    current = FileStats(path)
+                    target = os.path.join(output_dir, os.path.basename(path)) if output_dir else path
+                    writer = None if dry_run else AtomicFileWriter(target)
+
+                dropped = invalid if drop_invalid else 0
+                current.records += len(lines) + dropped
+                current.changed += changed
+                current.invalid += invalid
+                current.dropped += 0 if dry_run else dropped
+                current.errors.extend(errors)
+                if writer is not None:
+                    writer.write_lines(lines)
+
+            if current is not None:
+                finish()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-normalize and validate generated JSONL files")
+    parser.add_argument("input", nargs="?", default=OUTPUT_DIR, help="JSONL 파일 또는 디렉터리")
+    parser.add_argument("--output-dir", help="결과를 쓸 디렉터리 (기본값: 제자리에 덮어쓰기)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--drop-invalid", action="store_true",
+                        help="스키마 검사에 실패한 레코드를 삭제 (기본값: 그대로 유지하고 개수만 보고)")
+    parser.add_argument("--dry-run", action="store_true", help="파일을 쓰지 않고 검사만 수행")
+    parser.add_argument("--remove-emojis", action="store_true")
+    parser.add_argument("--no-punctuation", action="store_true")
+    parser.add_argument("--no-whitespace", action="store_true")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        paths = list_jsonl_files(args.input)
+    else:
+        paths = [args.input]
+
+    config = NormalizationConfig(remove_emojis=args.remove_emojis,
+                                 normalize_punctuation=not args.no_punctuation,
+                                 normalize_whitespace=not args.no_whitespace)
+    results = reprocess(paths, args.output_dir, config, args.workers, args.chunk_size,
+                        args.drop_invalid, args.dry_run)
+
+    total = sum(r.records for r in results)
+    invalid = sum(r.invalid for r in results)
+    dropped = sum(r.dropped for r in results)
+    detail = f"{invalid} invalid"
+    if dropped:
+        detail += f", {dropped} dropped"
+    elif invalid and not args.dry_run:
+        detail += " kept as is; pass --drop-invalid to remove them"
+    print(f"\nProcessed {total} records in {len(results)} files ({detail})")
+    return 1 if invalid and args.dry_run else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
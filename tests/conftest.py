@@ -0,0 +1,34 @@
+# tests/conftest.py
+import itertools
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+LONG_ANSWER = "정보보안 실무에서는 위험을 식별하고 통제를 설계합니다. " * 20
+
+
+def conversation_text(turns: List[str]) -> str:
+    return "\n".join(f"{'User' if i % 2 == 0 else 'Assistant'}: {text}" for i, text in enumerate(turns))
+
+
+def counting_respond(answer: str = LONG_ANSWER):
+    # 선택지마다 질문 번호가 다른 대화를 돌려준다 (같은 요청이 다시 오면 다른 대화)
+    counter = itertools.count()
+    return lambda messages, n: [(conversation_text([f"질문 {next(counter)}", answer]), "stop") for _ in range(n)]
+
+
+class StubCompletions:
+    # chat.completions.create를 흉내 낸다. respond(messages, n)는 선택지별 (content, finish_reason) 목록을 돌려준다
+    def __init__(self, respond: Callable[[List[Dict], int], List[Tuple[str, str]]]):
+        self.respond = respond
+        self.calls: List[Dict] = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        choices = [SimpleNamespace(index=i, message=SimpleNamespace(content=content), finish_reason=reason)
+                   for i, (content, reason) in enumerate(self.respond(kwargs["messages"], kwargs.get("n", 1)))]
+        return SimpleNamespace(choices=choices, usage={"prompt_tokens": 10, "completion_tokens": 100})
+
+
+class StubClient:
+    def __init__(self, respond):
+        self.chat = SimpleNamespace(completions=StubCompletions(respond))
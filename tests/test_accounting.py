@@ -0,0 +1,182 @@
+# tests/test_accounting.py
+import asyncio
+import gzip
+import hashlib
+import itertools
+import json
+
+import pytest
+
+from accounting import BudgetExhausted, BudgetScheduler, UsageTracker, count_records
+from cache import ResponseCache, RunManifest
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from dedup import MinHashLSH
+from engine import AsyncGenerationEngine
+from tracing import LatencyTracer
+
+from conftest import StubClient, conversation_text, counting_respond
+
+TOPICS = [("정보보안 기초", "security_basics"), ("네트워크 보안", "network_security"),
+          ("암호학", "cryptography"), ("침해 대응", "incident_response")]
+# StubCompletions는 요청마다 prompt 10 + completion 100 토큰을 보고한다
+REQUEST_TOKENS = 110
+
+
+def distinct_respond():
+    # dedup에 걸리지 않도록 선택지마다 내용이 전혀 다른 답변을 만든다
+    counter = itertools.count()
+
+    def respond(messages, n):
+        replies = []
+        for _ in range(n):
+            i = next(counter)
+            answer = " ".join(hashlib.sha256(f"{i}-{j}".encode()).hexdigest() for j in range(20))
+            replies.append((conversation_text([f"질문 {i}", answer]), "stop"))
+        return replies
+    return respond
+
+
+def make_engine(tmp_path, respond=None, manifest=None, **kwargs):
+    quality = dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "rejected.jsonl"))
+    kwargs.setdefault("dedup", None)
+    return AsyncGenerationEngine(StubClient(respond or counting_respond()), DataConverter(),
+                                 output_dir=str(tmp_path / "out"), cache=ResponseCache(str(tmp_path / "cache")),
+                                 manifest=manifest, stream=False, compression=None,
+                                 dedup_mode="reject" if kwargs["dedup"] is not None else "off",
+                                 tracer=LatencyTracer(enabled=False), quality=quality, **kwargs)
+
+
+def written_conversations(tmp_path):
+    return [json.loads(line)["messages"][1]["content"] for path in sorted((tmp_path / "out").glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_usage_averages_per_completion_and_request():
+    tracker = UsageTracker()
+    assert tracker.average_completion_tokens() is None
+    tracker.record("a", {"prompt_tokens": 100, "completion_tokens": 300}, ["stop", "length", "stop"])
+    tracker.record("a", {"prompt_tokens": 50, "completion_tokens": 100}, ["stop"])
+    tracker.record("a", None, ["stop"], cached=True)
+
+    assert tracker.average_completion_tokens() == 100
+    assert tracker.average_prompt_tokens() == 75
+    total = tracker.total
+    assert (total.requests, total.completions, total.cached, total.truncated) == (2, 4, 1, 1)
+
+
+def test_first_reservation_is_capped_to_remaining_budget():
+    async def run():
+        scheduler = BudgetScheduler(UsageTracker(), token_budget=30000, cost_budget=None, target_records=None)
+        first = await scheduler.reserve(25000 * 2, completions=2)
+        assert first[0] == 30000
+        assert scheduler.try_reserve(25000) is None and not scheduler.exhausted
+
+        # 다른 요청은 첫 요청의 실제 사용량이 정산될 때까지 기다렸다가 실측 평균으로 예약한다
+        waiting = asyncio.ensure_future(scheduler.reserve(25000 * 2, completions=2))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        scheduler.tracker.record("a", {"prompt_tokens": 500, "completion_tokens": 2000}, ["stop", "stop"])
+        scheduler.release(first)
+        second = await asyncio.wait_for(waiting, 1)
+        assert second[0] == 500 + 2000
+        assert (scheduler.reserved_tokens, scheduler.outstanding) == (2500, 1)
+    asyncio.run(run())
+
+
+def test_reservations_are_reconciled_and_exhausted():
+    async def run():
+        tracker = UsageTracker()
+        tracker.record("a", {"prompt_tokens": 100, "completion_tokens": 400}, ["stop"])
+        scheduler = BudgetScheduler(tracker, token_budget=1800, cost_budget=None, target_records=None)
+
+        reservations = [await scheduler.reserve(12400) for _ in range(2)]
+        assert scheduler.reserved_tokens == 1000
+        # 진행 중인 예약을 풀면 들어갈 수 있으므로 예산 소진으로 보지 않고 기다린다
+        waiting = asyncio.ensure_future(scheduler.reserve(12400))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        # 실제 사용량이 예약보다 적으면 정산 후 줄어든 평균으로 예약한다
+        tracker.record("a", {"prompt_tokens": 100, "completion_tokens": 100}, ["stop"])
+        scheduler.release(reservations[0])
+        third = await asyncio.wait_for(waiting, 1)
+        assert third[0] == 100 + 250
+        assert scheduler.reserved_tokens == 500 + 350
+
+        # 실제 사용량만으로 예산을 넘으면 더 기다리지 않는다
+        tracker.record("a", {"prompt_tokens": 100, "completion_tokens": 900}, ["stop"])
+        with pytest.raises(BudgetExhausted):
+            await asyncio.wait_for(scheduler.reserve(12400), 1)
+        assert scheduler.exhausted and scheduler.summary()["budget_exhausted"]
+        assert scheduler.try_reserve(1) is None
+    asyncio.run(run())
+
+
+def test_small_token_budget_does_not_stall_the_sweep(tmp_path):
+    tracker = UsageTracker()
+    scheduler = BudgetScheduler(tracker, token_budget=30000, cost_budget=None, target_records=None)
+    engine = make_engine(tmp_path, num_sets=2, tracker=tracker, scheduler=scheduler)
+    results = asyncio.run(engine.run(TOPICS))
+
+    assert sum(r.skipped for r in results) == 0 and not scheduler.exhausted
+    assert len(engine.client.chat.completions.calls) == len(TOPICS)
+    assert len(written_conversations(tmp_path)) == 2 * len(TOPICS)
+    assert scheduler.reserved_tokens == 0 and scheduler.outstanding == 0
+
+
+def test_budget_exhaustion_skips_remaining_samples(tmp_path):
+    tracker = UsageTracker()
+    scheduler = BudgetScheduler(tracker, token_budget=3 * REQUEST_TOKENS, cost_budget=None, target_records=None)
+    engine = make_engine(tmp_path, num_sets=1, concurrency=1, tracker=tracker, scheduler=scheduler)
+    results = asyncio.run(engine.run(TOPICS))
+
+    assert len(engine.client.chat.completions.calls) == 3
+    assert sum(r.skipped for r in results) == 1 and scheduler.exhausted
+    assert tracker.total.total_tokens == 3 * REQUEST_TOKENS
+
+
+def test_target_records_tops_up_without_reusing_written_samples(tmp_path):
+    dedup = MinHashLSH()
+    respond = distinct_respond()
+    first = make_engine(tmp_path, respond, RunManifest(str(tmp_path / "run1.json")), num_sets=2, dedup=dedup)
+    asyncio.run(first.run(TOPICS[:1]))
+    assert len(written_conversations(tmp_path)) == 2
+
+    # run ID가 바뀐 실행(다른 manifest)이 목표 레코드 수까지 채운다
+    scheduler = BudgetScheduler(UsageTracker(), token_budget=None, cost_budget=None, target_records=5)
+    second = make_engine(tmp_path, respond, RunManifest(str(tmp_path / "run2.json")), dedup=dedup,
+                         tracker=scheduler.tracker, scheduler=scheduler)
+    results = asyncio.run(second.run(TOPICS[:1]))
+
+    conversations = written_conversations(tmp_path)
+    assert len(conversations) == len(set(conversations)) == 5
+    assert results[0].duplicates == 0 and scheduler.tracker.total.cached == 0
+    assert second.manifest.samples.keys() == {f"security_basics:{i}" for i in (2, 3, 4)}
+
+    # 목표를 채운 주제는 다시 요청하지 않는다
+    again = make_engine(tmp_path, respond, RunManifest(str(tmp_path / "run3.json")), dedup=dedup,
+                        scheduler=BudgetScheduler(UsageTracker(), None, None, target_records=5))
+    asyncio.run(again.run(TOPICS[:1]))
+    assert again.client.chat.completions.calls == []
+
+
+def test_top_up_skips_samples_already_in_the_dedup_index(tmp_path):
+    dedup = MinHashLSH()
+    engine = make_engine(tmp_path, distinct_respond(), num_sets=3, dedup=dedup)
+    asyncio.run(engine.run(TOPICS[:1]))
+    # 샘플 1이 빠진 것처럼 기존 레코드 수를 2로 두면 번호 2는 이미 dedup에 등록된 키다
+    engine.existing = {"security_basics": 2}
+    assert engine.top_up_samples(*TOPICS[0], deficit=2) == [3, 4]
+
+
+def test_count_records_reads_unindexed_and_compressed_shards(tmp_path):
+    with DataConverter().open_writer(str(tmp_path / "security_basics")) as writer:
+        writer.write_many([["질문", "답변"]] * 3)
+    with DataConverter().open_writer(str(tmp_path / "network_security"), index=False) as writer:
+        writer.write_many([["질문", "답변"]] * 2)
+    with gzip.open(tmp_path / "cryptography-00000.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write('{"messages": []}\n' * 4)
+
+    assert count_records(str(tmp_path)) == {"security_basics": 3, "network_security": 2, "cryptography": 4}
+    assert not (tmp_path / "network_security-00000.jsonl.idx").exists()
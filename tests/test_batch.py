@@ -0,0 +1,105 @@
+# tests/test_batch.py
+# LocalBatchBackend로 제출 → 대기 → 수집 흐름을 오프라인에서 확인한다
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from batch import BatchRunner, LocalBatchBackend
+from canned import CannedResponder
+from config import OUTPUT_DIR, QUALITY_CONFIG
+from converter import DataConverter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOPICS = [("정보보안 기초", "security_basics"), ("네트워크 보안", "network_security")]
+
+
+@pytest.fixture
+def runner(tmp_path):
+    backend = LocalBatchBackend(str(tmp_path / "batch"), CannedResponder(os.path.join(ROOT, OUTPUT_DIR)))
+    return BatchRunner(backend, DataConverter(), state_dir=str(tmp_path / "state"), output_dir=str(tmp_path / "out"),
+                       quality=dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "rejected.jsonl")))
+
+
+def written(tmp_path):
+    return {path.name: len(path.read_text(encoding="utf-8").splitlines())
+            for path in sorted((tmp_path / "out").glob("*.jsonl"))}
+
+
+def test_submit_wait_ingest(runner, tmp_path):
+    batch_id = runner.submit(TOPICS, num_sets=3)
+    assert runner.load_state(batch_id)["requests"] == len(TOPICS)
+
+    # 상태 조회는 배치를 진행시키지 않는다
+    for _ in range(3):
+        assert runner.backend.retrieve(batch_id)["status"] == "validating"
+
+    info = runner.wait(batch_id, poll_interval=0)
+    assert info["status"] == "completed" and info["output_file_id"]
+    outputs = runner.ingest(batch_id)
+
+    assert sorted(outputs) == ["network_security", "security_basics"]
+    assert sum(written(tmp_path).values()) == 3 * len(TOPICS)
+    state = runner.load_state(batch_id)
+    assert state["ingested"] and not state["ingesting"] and state["failed"] == []
+    assert runner.pending_batches() == []
+
+    # 이미 수집한 배치는 다시 쓰지 않는다
+    assert runner.ingest(batch_id) == outputs
+    assert sum(written(tmp_path).values()) == 3 * len(TOPICS)
+
+
+def test_interrupted_ingest_resumes_without_duplicates(runner, tmp_path, monkeypatch):
+    batch_id = runner.submit(TOPICS, num_sets=2)
+    runner.wait(batch_id, poll_interval=0)
+
+    open_writer = DataConverter.open_writer
+    opened = []
+
+    def failing_open_writer(self, base_path, **kwargs):
+        # 첫 주제의 샤드를 쓴 뒤 두 번째 주제에서 중단된 것처럼 만든다
+        opened.append(base_path)
+        if len(opened) == 2:
+            raise KeyboardInterrupt
+        return open_writer(self, base_path, **kwargs)
+
+    monkeypatch.setattr(DataConverter, "open_writer", failing_open_writer)
+    with pytest.raises(KeyboardInterrupt):
+        runner.ingest(batch_id)
+    assert runner.load_state(batch_id)["ingesting"]
+    assert sum(written(tmp_path).values()) == 2
+    monkeypatch.undo()
+
+    assert runner.pending_batches() == [batch_id]
+    outputs = runner.resume(batch_id, poll_interval=0)
+    assert sorted(outputs) == ["network_security", "security_basics"]
+    assert sum(written(tmp_path).values()) == 2 * len(TOPICS)
+    records = [line for path in (tmp_path / "out").glob("*.jsonl") for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == len(set(records))
+
+
+def test_error_file_requests_are_counted_as_failed(runner, tmp_path):
+    batch_id = runner.submit(TOPICS[:1], num_sets=2)
+    runner.wait(batch_id, poll_interval=0)
+
+    # Batch API는 실패한 요청을 출력 파일이 아닌 오류 파일에 담는다
+    error_path = tmp_path / "errors.jsonl"
+    error_path.write_text(json.dumps({"custom_id": "network_security:0", "response": None,
+                                      "error": {"code": "server_error"}}) + "\n", encoding="utf-8")
+    state = runner.load_state(batch_id)
+    state["error_file_id"] = runner.backend.upload(str(error_path))
+    runner.save_state(state)
+
+    runner.ingest(batch_id)
+    assert runner.load_state(batch_id)["failed"] == ["network_security:0"]
+    shards = written(tmp_path)
+    assert shards and all(name.startswith("security_basics.") for name in shards)
+    assert sum(shards.values()) == 2
+
+
+def test_importing_batch_does_not_load_topics():
+    code = "import sys, batch; print('topics' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
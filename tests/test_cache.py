@@ -0,0 +1,113 @@
+# tests/test_cache.py
+import asyncio
+import json
+import os
+
+import prompts
+from cache import ResponseCache, RunManifest, request_key, run_signature
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from tracing import LatencyTracer
+
+from conftest import StubClient, counting_respond
+
+TOPICS = [("정보보안 기초", "security_basics"), ("네트워크 보안", "network_security")]
+PARAMS = {"temperature": 0.7, "max_tokens": 100}
+
+
+def make_engine(tmp_path, manifest, num_sets=2):
+    quality = dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "rejected.jsonl"))
+    return AsyncGenerationEngine(StubClient(counting_respond()), DataConverter(), output_dir=str(tmp_path / "out"),
+                                 num_sets=num_sets, cache=ResponseCache(str(tmp_path / "cache")), manifest=manifest,
+                                 stream=False, dedup=None, dedup_mode="off", compression=None,
+                                 tracer=LatencyTracer(enabled=False), quality=quality)
+
+
+def record_count(tmp_path):
+    return sum(len(path.read_text(encoding="utf-8").splitlines()) for path in (tmp_path / "out").glob("*.jsonl"))
+
+
+def test_request_key_depends_on_sample():
+    messages = prompts.build_messages(*TOPICS[0])
+    assert request_key("m", messages, PARAMS, 0) == request_key("m", messages, PARAMS, 0)
+    assert request_key("m", messages, PARAMS, 0) != request_key("m", messages, PARAMS, 1)
+
+
+def test_run_signature_covers_keywords_and_template(monkeypatch):
+    base = run_signature("m", PARAMS, TOPICS, 2)
+    assert run_signature("m", PARAMS, TOPICS, 2) == base
+    assert run_signature("m", PARAMS, TOPICS, 3) != base
+
+    monkeypatch.setitem(prompts.TOPIC_KEYWORDS, "security_basics", ["새 키워드"])
+    with_keywords = run_signature("m", PARAMS, TOPICS, 2)
+    assert with_keywords != base
+
+    monkeypatch.setattr(prompts, "FORMAT_INSTRUCTIONS", prompts.FORMAT_INSTRUCTIONS + "\n- 표를 포함합니다.")
+    assert run_signature("m", PARAMS, TOPICS, 2) not in (base, with_keywords)
+
+
+def test_cache_round_trip_and_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=150)
+    assert cache.get("aa01") is None
+    cache.put("aa01", {"content": "x" * 100})
+    assert cache.get("aa01") == {"content": "x" * 100}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    os.utime(cache._path("aa01"), (1, 1))
+    cache.put("bb02", {"content": "y" * 100})
+    # 용량을 넘으면 가장 오래 쓰지 않은 항목부터 지운다
+    assert cache.evict() == 1
+    assert cache.get("aa01") is None and cache.get("bb02") is not None
+
+    cache.delete("bb02")
+    cache.delete("bb02")
+    assert cache.get("bb02") is None
+
+
+def test_resume_requests_only_unfinished_samples(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = RunManifest(manifest_path)
+    manifest.mark_done("security_basics", [(0, "key")])
+
+    engine = make_engine(tmp_path, manifest)
+    asyncio.run(engine.run(TOPICS))
+    assert [call["n"] for call in engine.client.chat.completions.calls] == [1, 2]
+    assert record_count(tmp_path) == 3
+
+    # 모두 완료된 실행을 이어 하면 요청도 새 레코드도 없다
+    resumed = make_engine(tmp_path, RunManifest(manifest_path))
+    results = asyncio.run(resumed.run(TOPICS))
+    assert resumed.client.chat.completions.calls == []
+    assert record_count(tmp_path) == 3
+    assert all(result.output_files for result in results)
+
+
+def test_unfinished_samples_are_served_from_cache(tmp_path):
+    engine = make_engine(tmp_path, RunManifest(str(tmp_path / "manifest.json")))
+    asyncio.run(engine.run(TOPICS[:1]))
+    first = (tmp_path / "out").glob("*.jsonl")
+    written = [json.loads(line) for path in first for line in path.read_text(encoding="utf-8").splitlines()]
+
+    # 샤드를 쓰기 전에 중단된 것처럼 manifest 없이 다시 실행하면 캐시에서 같은 대화를 읽는다
+    for path in (tmp_path / "out").iterdir():
+        path.unlink()
+    again = make_engine(tmp_path, RunManifest(str(tmp_path / "other.json")))
+    asyncio.run(again.run(TOPICS[:1]))
+    assert again.client.chat.completions.calls == []
+    assert [json.loads(line) for path in (tmp_path / "out").glob("*.jsonl")
+            for line in path.read_text(encoding="utf-8").splitlines()] == written
+
+
+def test_fresh_replaces_previous_outputs(tmp_path):
+    manifest_dir = str(tmp_path / "manifests")
+    for _ in range(2):
+        manifest = RunManifest.for_run("run", manifest_dir=manifest_dir, fresh=True)
+        asyncio.run(make_engine(tmp_path, manifest).run(TOPICS))
+        assert record_count(tmp_path) == 4
+        assert len(list((tmp_path / "out").glob("*.jsonl"))) == len(TOPICS)
+
+    manifest = RunManifest.for_run("run", manifest_dir=manifest_dir)
+    assert manifest.is_done("network_security", 1)
+    assert sorted(os.path.basename(path) for _, prefix in TOPICS for path in manifest.output_files(prefix)) == \
+        sorted(path.name for path in (tmp_path / "out").glob("*.jsonl"))
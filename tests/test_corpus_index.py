@@ -0,0 +1,59 @@
+# tests/test_corpus_index.py
+import json
+import os
+
+from converter import DataConverter, ShardedJsonlWriter
+from corpus_index import CorpusIndex, ShardIndex, build_index, index_path
+
+CONVERSATIONS = [[f"질문 {i}", "답변 " * (i + 1)] for i in range(5)]
+
+
+def write_shards(base, conversations=CONVERSATIONS, **kwargs):
+    writer = ShardedJsonlWriter(DataConverter(), str(base), max_records=2, **kwargs)
+    writer.write_many(conversations)
+    return writer, writer.close()
+
+
+def test_index_offsets_match_shard_bytes(tmp_path):
+    _, shards = write_shards(tmp_path / "topic")
+    for path in shards:
+        with open(path, 'rb') as f:
+            data = f.read()
+        lines = data.splitlines(keepends=True)
+        index = ShardIndex(path)
+        try:
+            assert index.prefix == "topic"
+            offset = 0
+            for i, line in enumerate(lines):
+                record = json.loads(line)
+                assert index.entry(i)[:2] == (offset, len(line))
+                assert index.read(i) == line
+                assert index.record(i) == record
+                offset += len(line)
+            assert len(index) == len(lines)
+        finally:
+            index.close()
+
+
+def test_build_index_matches_writer_index(tmp_path):
+    _, shards = write_shards(tmp_path / "topic")
+    with open(index_path(shards[0]), 'rb') as f:
+        written = f.read()
+
+    assert build_index(shards[0]) == 2
+    with open(index_path(shards[0]), 'rb') as f:
+        assert f.read() == written
+
+
+def test_corpus_index_reads_across_shards_without_writing(tmp_path):
+    _, shards = write_shards(tmp_path / "topic")
+    os.remove(index_path(shards[-1]))
+
+    with CorpusIndex(str(tmp_path)) as corpus:
+        assert len(corpus) == 4 and corpus.unindexed == [shards[-1]]
+        assert [corpus.record(i)["messages"][1]["content"] for i in range(len(corpus))] == \
+            [conv[0] for conv in CONVERSATIONS[:4]]
+    assert not os.path.exists(index_path(shards[-1]))
+
+    with CorpusIndex(str(tmp_path), build_missing=True) as corpus:
+        assert len(corpus) == 5 and not corpus.unindexed
@@ -0,0 +1,126 @@
+# tests/test_dedup.py
+import json
+import random
+
+import pytest
+
+from dedup import MinHashLSH, conversation_text, dedup_corpus
+
+WORDS = ("보안 정책 위험 평가 접근 통제 암호화 인증 권한 로그 감사 침해 대응 취약점 패치 네트워크 방화벽 "
+         "탐지 분석 자산 관리 백업 복구 계정 비밀번호 다중 요소 세션 토큰 키 인증서 서버 클라이언트 "
+         "데이터 개인정보 유출 모니터링 경보 사고 보고 교육 훈련 절차 표준 규정 준수 점검 개선 설계 "
+         "구현 운영 검증 시나리오 공격 방어 악성코드 피싱 랜섬웨어 백도어 격리 차단 허용 예외 승인").split()
+
+
+def random_text(rng, words=300):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def shingle_jaccard(a, b, k=12):
+    def shingles(text):
+        data = text.encode("utf-8")
+        return {data[i:i + k] for i in range(len(data) - k + 1)}
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def edit(rng, text, changes):
+    words = text.split()
+    for i in rng.sample(range(len(words)), changes):
+        words[i] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def test_exact_duplicate_is_found():
+    index = MinHashLSH()
+    text = random_text(random.Random(1))
+    assert index.check_and_add("a", text) is None
+    assert index.check_and_add("b", text) == ("a", 1.0)
+    # 중복은 기본적으로 인덱스에 넣지 않는다
+    assert len(index) == 1
+
+
+def test_near_duplicate_is_found_and_similarity_tracks_jaccard():
+    rng = random.Random(2)
+    index = MinHashLSH(num_perm=128, bands=16)
+    original = random_text(rng)
+    index.check_and_add("original", original)
+
+    near = edit(rng, original, 5)
+    match = index.check_and_add("near", near)
+    assert match is not None and match[0] == "original"
+    assert abs(match[1] - shingle_jaccard(original, near)) < 0.15
+
+
+def test_distinct_documents_are_not_merged():
+    rng = random.Random(3)
+    index = MinHashLSH()
+    matches = [index.check_and_add(f"doc{i}", random_text(rng)) for i in range(200)]
+    assert matches == [None] * 200
+    assert len(index) == 200
+
+
+def test_heavily_edited_text_is_not_a_duplicate():
+    rng = random.Random(4)
+    index = MinHashLSH()
+    original = random_text(rng)
+    index.check_and_add("original", original)
+    assert shingle_jaccard(original, edit(rng, original, 150)) < 0.5
+    assert index.check_and_add("edited", edit(rng, original, 150)) is None
+
+
+def test_same_id_is_not_compared_with_itself():
+    index = MinHashLSH()
+    text = random_text(random.Random(5))
+    index.check_and_add("key", text)
+    assert index.check_and_add("key", text) is None
+    assert len(index) == 1
+
+
+def test_index_save_and_load_round_trip(tmp_path):
+    rng = random.Random(6)
+    path = tmp_path / "index" / "dedup.jsonl"
+    texts = [random_text(rng) for _ in range(20)]
+    index = MinHashLSH(path=str(path))
+    for i, text in enumerate(texts):
+        index.check_and_add(f"doc{i}", text)
+
+    loaded = MinHashLSH(path=str(path))
+    assert loaded.signatures == index.signatures
+    assert loaded.check_and_add("again", texts[7]) == ("doc7", 1.0)
+    assert loaded.check_and_add("new", random_text(rng)) is None
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 21
+
+
+def test_signature_edge_cases():
+    index = MinHashLSH()
+    assert len(index.signature("")) == index.num_perm
+    assert index.signature("짧음") == index.signature("짧음")
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=48, bands=8)
+
+
+def test_conversation_text_uses_assistant_turns():
+    assert conversation_text(["질문", "답변 1", "질문 2", "답변 2"]) == "답변 1\n답변 2"
+
+
+def test_dedup_corpus_rewrites_only_files_with_duplicates(tmp_path):
+    rng = random.Random(7)
+    texts = [random_text(rng) for _ in range(3)]
+
+    def write(name, answers):
+        path = tmp_path / name
+        path.write_text("".join(json.dumps({"messages": [{"role": "user", "content": "질문"},
+                                                         {"role": "assistant", "content": a}]},
+                                           ensure_ascii=False) + "\n" for a in answers), encoding="utf-8")
+        return path
+
+    first = write("a-00000.jsonl", texts[:2])
+    second = write("b-00000.jsonl", [texts[2], edit(rng, texts[0], 3)])
+    untouched = first.read_bytes()
+
+    assert dedup_corpus([str(first), str(second)], MinHashLSH(), rewrite=True) == 1
+    assert first.read_bytes() == untouched
+    assert [json.loads(line)["messages"][1]["content"] for line in second.read_text(encoding="utf-8").splitlines()] \
+        == [texts[2]]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a-00000.jsonl", "b-00000.jsonl"]
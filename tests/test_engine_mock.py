@@ -0,0 +1,100 @@
+# tests/test_engine_mock.py
+# 로컬 모의 서버를 띄우고 실제 OpenAI SDK로 AsyncGenerationEngine을 끝까지 돌린다
+import asyncio
+import json
+import os
+
+import pytest
+
+from canned import CannedResponder
+from client import close_async_client, get_async_client
+from config import OUTPUT_DIR, QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from mock_server import MockOpenAIServer
+from ratelimit import AdaptiveRateLimiter
+from topics import TOPICS
+from tracing import LatencyTracer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_TOPICS = TOPICS[:3]
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        options = dict(latency=0.0, latency_jitter=0.0, chunk_delay=0.0, slow_rate=0.0, seed=7)
+        options.update(kwargs)
+        server = MockOpenAIServer("127.0.0.1", 0, CannedResponder(os.path.join(ROOT, OUTPUT_DIR)), **options)
+        monkeypatch.setenv("OPENAI_BASE_URL", server.start())
+        monkeypatch.setenv("OPENAI_API_KEY", "mock")
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def run_engine(tmp_path, **kwargs):
+    async def run():
+        engine = AsyncGenerationEngine(
+            get_async_client(), DataConverter(), output_dir=str(tmp_path / "out"),
+            limiter=AdaptiveRateLimiter(1e6, 1e9), dedup=None, dedup_mode="off", compression=None,
+            quality=dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "rejected.jsonl")),
+            tracer=LatencyTracer(enabled=False), **kwargs)
+        try:
+            return await engine.run(SAMPLE_TOPICS)
+        finally:
+            await close_async_client()
+    return asyncio.run(run())
+
+
+def written_records(tmp_path):
+    return [json.loads(line) for path in sorted((tmp_path / "out").glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_generates_every_topic(tmp_path, mock_server, stream):
+    server = mock_server()
+    results = run_engine(tmp_path, stream=stream, num_sets=2, max_n=1)
+
+    assert [r.errors for r in results] == [[]] * len(SAMPLE_TOPICS)
+    assert server.stats["requests"] == 2 * len(SAMPLE_TOPICS)
+    records = written_records(tmp_path)
+    assert len(records) == 2 * len(SAMPLE_TOPICS)
+    assert all(record["messages"][0]["role"] == "system" and len(record["messages"]) > 2 for record in records)
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_n_choices_share_one_request(tmp_path, mock_server, stream):
+    server = mock_server()
+    results = run_engine(tmp_path, stream=stream, num_sets=3, max_n=3)
+
+    assert sum(r.api_calls for r in results) == server.stats["requests"] == len(SAMPLE_TOPICS)
+    records = written_records(tmp_path)
+    assert len(records) == 3 * len(SAMPLE_TOPICS)
+    # 선택지마다 다른 대화가 나와야 한다
+    for result in results:
+        assert len({json.dumps(conv, ensure_ascii=False) for conv in result.conversations}) == 3
+
+
+def test_retries_rate_limits_with_retry_after(tmp_path, mock_server):
+    server = mock_server(rate_limit_rate=0.4, retry_after=0.05)
+    results = run_engine(tmp_path, stream=True, num_sets=2, max_n=1)
+
+    assert server.stats["429"] > 0
+    assert [r.errors for r in results] == [[]] * len(SAMPLE_TOPICS)
+    assert len(written_records(tmp_path)) == 2 * len(SAMPLE_TOPICS)
+
+
+def test_retries_server_errors(tmp_path, mock_server):
+    server = mock_server(server_error_rate=0.4)
+    results = run_engine(tmp_path, stream=False, num_sets=2, max_n=1)
+
+    assert server.stats["500"] + server.stats["503"] > 0
+    assert [r.errors for r in results] == [[]] * len(SAMPLE_TOPICS)
+    assert len(written_records(tmp_path)) == 2 * len(SAMPLE_TOPICS)
@@ -0,0 +1,62 @@
+# tests/test_export.py
+import json
+
+import pytest
+
+from converter import DataConverter, ShardedJsonlWriter
+from export import ColumnarDataset, TokenDataset, export_columnar, export_tokens, render_message
+
+CONVERSATIONS = {
+    "security_basics": [["기밀성이란?", "허가된 사람만 정보에 접근하게 하는 성질입니다."],
+                        ["무결성이란?", "정보가 허가 없이 바뀌지 않는 성질입니다.", "예시는요?", "해시 검증이 있습니다 🔐"]],
+    "network_security": [["방화벽은 무엇을 하나요?", "트래픽을 정책에 따라 허용하거나 차단합니다."]],
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = tmp_path / "data"
+    for prefix, conversations in CONVERSATIONS.items():
+        with ShardedJsonlWriter(DataConverter(), str(directory / prefix)) as writer:
+            writer.write_many(conversations)
+    return directory
+
+
+def source_records(directory):
+    return [(path.name.split("-")[0], json.loads(line)["messages"])
+            for path in sorted(directory.glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_columnar_round_trip(corpus, tmp_path):
+    meta = export_columnar(str(corpus), str(tmp_path / "columnar"))
+    records = source_records(corpus)
+    assert meta["records"] == len(records) == 3
+    assert meta["turns"] == sum(len(messages) - 1 for _, messages in records)
+    assert len(meta["systems"]) == 1
+
+    with ColumnarDataset(str(tmp_path / "columnar")) as dataset:
+        assert len(dataset) == len(records)
+        assert [(dataset.prefix(i), dataset.messages(i)) for i in range(len(dataset))] == records
+
+
+def test_token_round_trip(corpus, tmp_path):
+    meta = export_tokens(str(corpus), str(tmp_path / "tokens"))
+    records = source_records(corpus)
+    assert meta["dtype"] == "u8" and meta["records"] == len(records)
+
+    dataset = TokenDataset(str(tmp_path / "tokens"))
+    for i, (_, messages) in enumerate(records):
+        turns = "".join(render_message(m["role"], m["content"]) for m in messages[1:])
+        assert bytes(dataset[i]).decode("utf-8") == turns
+        assert bytes(dataset.system(i)).decode("utf-8") == render_message("system", messages[0]["content"])
+    assert sum(len(dataset[i]) for i in range(len(dataset))) == meta["tokens"]
+    dataset.close()
+    dataset.close()
+
+
+def test_close_empty_export(tmp_path):
+    (tmp_path / "data").mkdir()
+    export_columnar(str(tmp_path / "data"), str(tmp_path / "columnar"))
+    with ColumnarDataset(str(tmp_path / "columnar")) as dataset:
+        assert len(dataset) == 0
@@ -0,0 +1,86 @@
+# tests/test_hedging.py
+import asyncio
+
+import pytest
+
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from hedging import HedgePolicy, hedged
+from ratelimit import DeadlineExceeded
+from tracing import LatencyTracer
+
+from conftest import LONG_ANSWER, StubClient, conversation_text
+
+
+def attempt(seconds, result=None, error=None, first_token_after=None):
+    async def run(first_token):
+        if first_token_after is not None:
+            await asyncio.sleep(first_token_after)
+            first_token.set()
+        await asyncio.sleep(seconds)
+        if error is not None:
+            raise error
+        return result
+    return run
+
+
+def warm_policy(**kwargs):
+    policy = HedgePolicy(min_samples=1, min_delay=0.05, **dict({"budget_ratio": 1.0}, **kwargs))
+    policy.observe("ttft", 0.05)
+    return policy
+
+
+def test_backup_wins_when_primary_is_slow():
+    policy = warm_policy()
+    assert asyncio.run(hedged(attempt(2, "primary"), attempt(0.01, "backup"), policy)) == "backup"
+    assert (policy.hedges, policy.wins) == (1, 1)
+
+
+def test_no_hedge_once_first_token_arrives():
+    policy = warm_policy()
+    result = asyncio.run(hedged(attempt(0.2, "primary", first_token_after=0.01), attempt(0.01, "backup"), policy))
+    assert result == "primary" and policy.hedges == 0
+
+
+def test_failed_primary_falls_back_to_backup_and_both_failing_raises_primary_error():
+    policy = warm_policy()
+    assert asyncio.run(hedged(attempt(0.1, error=ValueError("p")), attempt(0.2, "backup"), policy)) == "backup"
+    with pytest.raises(ValueError):
+        asyncio.run(hedged(attempt(0.1, error=ValueError("p")), attempt(0.01, error=KeyError("b")), policy))
+
+
+def test_budget_caps_hedges():
+    policy = warm_policy(budget_ratio=0.0)
+    assert asyncio.run(hedged(attempt(0.2, "primary"), attempt(0.01, "backup"), policy)) == "primary"
+    assert (policy.hedges, policy.denied) == (0, 1)
+
+
+def test_no_hedge_before_min_samples():
+    policy = HedgePolicy(min_samples=5)
+    assert policy.delay() is None
+    assert asyncio.run(hedged(attempt(0.05, "primary"), attempt(0.01, "backup"), policy)) == "primary"
+
+
+def test_deadline_cancels_slow_attempt(tmp_path):
+    calls = []
+
+    async def slow_then_fast(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(5 if len(calls) == 1 else 0)
+        return await fast.create(**kwargs)
+
+    fast = StubClient(lambda messages, n: [(conversation_text(["질문", LONG_ANSWER] * 3), "stop")]).chat.completions
+    client = StubClient(None)
+    client.chat.completions.create = slow_then_fast
+    engine = AsyncGenerationEngine(client, DataConverter(), output_dir=str(tmp_path), stream=False,
+                                   tracer=LatencyTracer(enabled=False), quality=dict(QUALITY_CONFIG, mode="off"),
+                                   deadline=0.1)
+
+    async def run():
+        return await engine._attempt(engine._complete, "security_basics", [], 1)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    [(entry, (turns, _, _))] = asyncio.run(run())
+    assert len(turns) == 6
@@ -0,0 +1,166 @@
+# tests/test_jobqueue.py
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from jobqueue import JobQueue, QueueWorker
+from tracing import LatencyTracer
+
+from conftest import StubClient, counting_respond
+
+TOPICS = [("정보보안 기초", "security_basics")]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"), lease_seconds=0.05, max_attempts=2, retry_delay=0)
+    queue.enqueue(TOPICS, num_sets=2)
+    yield queue
+    queue.close()
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue(TOPICS, num_sets=3) == 1
+    assert queue.stats() == {"pending": 3}
+
+
+def test_expired_lease_is_claimed_by_another_worker(queue):
+    first = queue.claim("a", limit=2)
+    assert [job.attempts for job in first] == [1, 1]
+    assert queue.claim("b", limit=2) == []
+
+    time.sleep(0.1)
+    second = queue.claim("b", limit=2)
+    assert [(job.sample, job.attempts) for job in second] == [(0, 2), (1, 2)]
+    # 임대를 잃은 워커는 연장도 완료도 할 수 없다
+    assert queue.heartbeat("a", first) == []
+    assert queue.complete("a", first) == 0
+    assert queue.complete("b", second, output="out.jsonl") == 2
+    assert queue.stats() == {"done": 2}
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    jobs = queue.claim("a", limit=2)
+    for _ in range(3):
+        time.sleep(0.03)
+        assert queue.heartbeat("a", jobs) == jobs
+    assert queue.claim("b", limit=2) == []
+
+
+def test_expired_lease_is_dead_lettered_after_max_attempts(queue):
+    queue.claim("a", limit=2)
+    time.sleep(0.1)
+    queue.claim("b", limit=2)
+    time.sleep(0.1)
+
+    assert queue.claim("c", limit=2) == []
+    assert queue.stats() == {"dead": 2}
+    assert queue.dead_letters() == [("security_basics", 0, 2, "lease expired"),
+                                    ("security_basics", 1, 2, "lease expired")]
+    assert queue.remaining() == 0
+
+
+def test_failed_jobs_are_retried_then_dead_lettered(queue):
+    assert queue.fail("a", queue.claim("a", limit=2), "boom") == 0
+    assert queue.stats() == {"pending": 2}
+    assert queue.fail("a", queue.claim("a", limit=2), "boom again") == 2
+    assert [row[3] for row in queue.dead_letters()] == ["boom again", "boom again"]
+
+    assert queue.requeue_dead() == 2
+    assert [job.attempts for job in queue.claim("a", limit=2)] == [1, 1]
+
+
+def test_release_does_not_count_an_attempt(queue):
+    queue.release("a", queue.claim("a", limit=2))
+    queue.release("a", queue.claim("a", limit=2))
+    assert [job.attempts for job in queue.claim("a", limit=2)] == [1, 1]
+
+
+def test_complete_is_all_or_nothing(queue):
+    [expired] = queue.claim("a", limit=1)
+    time.sleep(0.1)
+    [stolen] = queue.claim("b", limit=1)
+    [held] = queue.claim("a", limit=1)
+    assert (expired.sample, stolen.sample, held.sample) == (0, 0, 1)
+    # 한 작업이라도 다른 워커에게 넘어갔으면 아직 쥔 작업도 완료 처리하지 않는다
+    assert queue.complete("a", [expired, held]) == 0
+    assert queue.stats() == {"leased": 2}
+    assert queue.complete("a", [held]) == 1 and queue.complete("b", [stolen]) == 1
+
+
+def make_worker(tmp_path, queue, worker_id="a"):
+    engine = AsyncGenerationEngine(StubClient(counting_respond()), DataConverter(), output_dir=str(tmp_path / "out"),
+                                   stream=False, compression=None, dedup=None, dedup_mode="off",
+                                   tracer=LatencyTracer(enabled=False),
+                                   quality=dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "r.jsonl")))
+    return QueueWorker(queue, engine, worker_id, slots=1, poll_interval=0)
+
+
+def written(tmp_path):
+    return [line for path in sorted((tmp_path / "out").glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_failed_attempt_leaves_no_records_and_retry_does_not_duplicate(tmp_path, queue, monkeypatch):
+    worker = make_worker(tmp_path, queue)
+    generate_samples = AsyncGenerationEngine.generate_samples
+    calls = []
+
+    async def fail_after_writing(self, topic, prefix, samples, result, writer):
+        # 첫 시도는 레코드를 쓴 뒤 실패한다
+        calls.append(samples)
+        accepted = await generate_samples(self, topic, prefix, samples, result, writer)
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        return accepted
+
+    monkeypatch.setattr(AsyncGenerationEngine, "generate_samples", fail_after_writing)
+    summary = asyncio.run(worker.run(wait=True))
+
+    assert calls == [[0, 1], [0, 1]]
+    assert summary == {"completed": 2, "failed": 2}
+    assert len(written(tmp_path)) == 2
+    assert queue.stats() == {"done": 2}
+
+
+def test_lost_lease_before_commit_writes_nothing(tmp_path, queue):
+    worker = make_worker(tmp_path, queue)
+    jobs = queue.claim("a", limit=2)
+    worker.held.update(((job.prefix, job.sample), job) for job in jobs)
+    asyncio.run(worker._process(jobs))
+    assert worker.uncommitted["security_basics"] == jobs
+
+    time.sleep(0.1)
+    taken = queue.claim("b", limit=2)
+    asyncio.run(worker._commit("security_basics"))
+
+    assert worker.completed == 0 and not (tmp_path / "out").exists()
+    assert queue.stats() == {"leased": 2}
+    assert queue.complete("b", taken) == 2
+
+
+def test_worker_commits_records_after_completing_jobs(tmp_path, queue):
+    worker = make_worker(tmp_path, queue)
+    assert asyncio.run(worker.run()) == {"completed": 2, "failed": 0}
+    shards = sorted(p.name for p in (tmp_path / "out").glob("*.jsonl"))
+    assert shards == ["security_basics.a-00000.jsonl"] and len(written(tmp_path)) == 2
+    outputs = queue.conn.execute("SELECT DISTINCT output FROM jobs").fetchall()
+    assert [os.path.basename(output) for (output,) in outputs] == shards
+
+
+def test_status_commands_do_not_load_topics(tmp_path):
+    # status/dead는 주제 목록이 필요 없으므로 topics.py를 읽지 않는다
+    db = str(tmp_path / "queue.db")
+    code = ("import sys, main\n"
+            f"for command in ('status', 'dead'):\n    main.main(['queue', command, '--queue', {db!r}])\n"
+            "print('topics' in sys.modules)")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.splitlines()[-1] == "False"
@@ -0,0 +1,78 @@
+# tests/test_normalizer.py
+import itertools
+import random
+import re
+
+import emoji
+import pytest
+
+from converter import NormalizationConfig, TextNormalizer, strip_emoji
+
+
+def reference_normalize(config: NormalizationConfig, text: str) -> str:
+    # 최적화 이전의 TextNormalizer.normalize
+    if not text:
+        return text
+    if config.remove_emojis:
+        text = emoji.replace_emoji(text, '')
+    if config.normalize_punctuation:
+        text = re.sub(r'[.]{2,}', '...', text)
+        text = re.sub(r'([!?])\1+', r'\1', text)
+        text = re.sub(r'\s*([.,!?])\s*', r'\1 ', text)
+    if config.normalize_whitespace:
+        text = ' '.join(text.split())
+    return text.strip()
+
+
+# 이모지 시퀀스의 일부, 결합 문자(ZWJ, FE0F, 피부색, 태그, 키캡)와 일반 텍스트를 섞는다
+_ATOMS = ['a', ' ', '가', '‍', '️', '\U0001f3fb', '\U0001f3ff', '\U000e0067', '\U000e007f',
+          '🏴', '#', '1', '⃣', '🇰', '🇷', '©', '.', '!', '?', '\t', '\n']
+
+
+def generated_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    keys = list(emoji.EMOJI_DATA)
+    sequences = [k for k in keys if len(k) > 1]
+
+    def piece():
+        roll = rng.random()
+        if roll < 0.3:
+            return rng.choice(keys)
+        if roll < 0.5:
+            key = rng.choice(sequences)
+            start = rng.randrange(len(key))
+            return key[start:rng.randrange(start, len(key)) + 1]
+        return rng.choice(_ATOMS)
+
+    return [''.join(piece() for _ in range(rng.randint(1, 6))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("text", [
+    "🗺🏴\U000e0067",
+    "⛄\U000e0067🏴\U000e00671#",
+    "🏴\U000e0067\U000e0062\U000e0065\U000e006e\U000e0067\U000e007f 잉글랜드",
+    "👨‍👩‍👧 가족",
+    "#️⃣ 1️⃣ ©",
+    "👍🏽👍",
+])
+def test_strip_emoji_edge_cases(text):
+    assert strip_emoji(text) == emoji.replace_emoji(text, '')
+
+
+def test_strip_emoji_matches_emoji_package():
+    mismatches = [t for t in generated_texts(20000) if strip_emoji(t) != emoji.replace_emoji(t, '')]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("remove_emojis,punctuation,whitespace", list(itertools.product((False, True), repeat=3)))
+def test_normalizer_matches_baseline(remove_emojis, punctuation, whitespace):
+    config = NormalizationConfig(remove_emojis=remove_emojis, normalize_punctuation=punctuation,
+                                 normalize_whitespace=whitespace)
+    normalizer = TextNormalizer(config)
+    texts = generated_texts(2000, seed=1) + [
+        "", " ", "...", "??!!", "끝 .  ", "  질문 ,답변 ! 정말?? 네..... \t\n 끝 .  ",
+        "a . , ! ? b", "x　. y", "줄\n바꿈 .\n다음",
+    ]
+    expected = [reference_normalize(config, t) for t in texts]
+    assert [normalizer.normalize(t) for t in texts] == expected
+    assert normalizer.normalize_batch(texts) == expected
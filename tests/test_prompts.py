@@ -0,0 +1,59 @@
+# tests/test_prompts.py
+import pytest
+
+from prompts import TurnParser, parse_turns
+
+TEXT = ("대화를 시작합니다.\n"
+        "User: 방화벽 정책은 어떻게 검토하나요?\n"
+        "Assistant: 먼저 규칙 목록을 정리합니다.\n"
+        "\n"
+        "- 사용하지 않는 규칙을 지웁니다.\n"
+        "- 허용 범위가 넓은 규칙을 좁힙니다.\n"
+        "User: 검토 주기는요?\n"
+        "Assistant: 분기마다 한 번 이상 검토합니다.")
+
+EXPECTED = ["방화벽 정책은 어떻게 검토하나요?",
+            "먼저 규칙 목록을 정리합니다.\n\n- 사용하지 않는 규칙을 지웁니다.\n- 허용 범위가 넓은 규칙을 좁힙니다.",
+            "검토 주기는요?",
+            "분기마다 한 번 이상 검토합니다."]
+
+
+def feed_chunks(chunks):
+    parser = TurnParser()
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(chunk))
+    completed.extend(parser.close())
+    return parser, completed
+
+
+def test_parse_turns_joins_multiline_answers():
+    turns, roles = parse_turns(TEXT)
+    assert turns == EXPECTED
+    assert roles == ["user", "assistant", "user", "assistant"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64])
+def test_chunk_boundaries_do_not_change_turns(size):
+    parser, completed = feed_chunks([TEXT[i:i + size] for i in range(0, len(TEXT), size)])
+    assert completed == parser.turns == EXPECTED
+
+
+def test_marker_split_across_chunks():
+    parser, completed = feed_chunks(["User: 질문입니다\nUs", "er: 두 번째 질문\nAssis", "tant", ": 답변"])
+    assert completed == ["질문입니다", "두 번째 질문", "답변"]
+    assert parser.roles == ["user", "user", "assistant"]
+
+
+def test_turn_is_emitted_when_next_marker_arrives():
+    parser = TurnParser()
+    assert parser.feed("User: 질문\nAssistant: 첫 줄\n둘째 줄\n") == ["질문"]
+    assert parser.feed("User: 다음") == []
+    assert parser.feed("\n") == ["첫 줄\n둘째 줄"]
+    assert parser.close() == ["다음"]
+
+
+def test_empty_turns_are_dropped():
+    turns, roles = parse_turns("User:   \nAssistant: 답변\nUser:\n")
+    assert turns == ["답변"]
+    assert roles == ["assistant"]
@@ -0,0 +1,69 @@
+# tests/test_quality.py
+import asyncio
+import json
+
+from cache import ResponseCache, RunManifest
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from quality import check_conversation, plan_repair
+from tracing import LatencyTracer
+
+from conftest import LONG_ANSWER, StubClient, conversation_text
+
+TOPIC, PREFIX = "정보보안 기초", "security_basics"
+
+
+def make_engine(tmp_path, respond, **kwargs):
+    quality = dict(QUALITY_CONFIG, rejects_path=str(tmp_path / "rejected.jsonl"), **kwargs.pop("quality", {}))
+    return AsyncGenerationEngine(StubClient(respond), DataConverter(), output_dir=str(tmp_path / "out"),
+                                 stream=False, tracer=LatencyTracer(enabled=False), quality=quality, **kwargs)
+
+
+def written_records(tmp_path):
+    return [json.loads(line) for path in sorted((tmp_path / "out").glob("*.jsonl"))
+            for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_check_conversation_flags_short_and_truncated():
+    turns = ["질문", "짧음", "질문", LONG_ANSWER, "질문", LONG_ANSWER]
+    kinds = {issue.kind for issue in check_conversation(turns, None, "length")}
+    assert kinds == {"short", "truncated"}
+    assert plan_repair(turns, None, check_conversation(turns, None, "length")) == ("answer", [1])
+    assert plan_repair(turns, None, check_conversation(turns, None, None)) == ("answer", [1])
+
+
+def test_answer_repair_keeps_truncation_until_continued(tmp_path):
+    original = ["질문 1", "짧은 답변", "질문 2", LONG_ANSWER, "질문 3", LONG_ANSWER + " 잘린"]
+    continued = LONG_ANSWER + " 이어서 완성된 답변"
+
+    def respond(messages, n):
+        instruction = messages[-1]["content"]
+        if "답변만 다시" in instruction:
+            return [(f"Assistant: {LONG_ANSWER}", "stop")]
+        if "이어서" in instruction:
+            return [(f"Assistant: {continued}", "stop")]
+        return [(conversation_text(original), "length")]
+
+    engine = make_engine(tmp_path, respond)
+    result = asyncio.run(engine.run_topic(TOPIC, PREFIX))
+
+    instructions = [call["messages"][-1]["content"] for call in engine.client.chat.completions.calls[1:]]
+    assert ["답변만 다시" in text for text in instructions] == [True, False]
+    assert result.repaired == 1 and result.rejected == 0
+    [record] = written_records(tmp_path)
+    assert record["messages"][-1]["content"].endswith("이어서 완성된 답변")
+
+
+def test_rejected_samples_are_retried_on_resume(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"))
+    manifest = RunManifest(str(tmp_path / "manifest.json"))
+    engine = make_engine(tmp_path, lambda messages, n: [("User: 질문\nAssistant: 짧음", "stop")] * n,
+                         num_sets=2, cache=cache, manifest=manifest, quality={"mode": "reject"})
+    result = asyncio.run(engine.run_topic(TOPIC, PREFIX))
+
+    assert result.rejected == 2
+    assert not manifest.is_done(PREFIX, 0) and not manifest.is_done(PREFIX, 1)
+    # 불합격 응답은 캐시에서도 지워 다시 요청하게 한다
+    assert not any(path.is_file() for path in (tmp_path / "cache").rglob("*.json"))
+    assert len((tmp_path / "rejected.jsonl").read_text(encoding="utf-8").splitlines()) == 2
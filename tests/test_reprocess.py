@@ -0,0 +1,143 @@
+# tests/test_reprocess.py
+import gzip
+import json
+import os
+
+import pytest
+
+import reprocess
+from converter import DataConverter, NormalizationConfig, validate_messages
+from corpus_index import index_path
+
+SYSTEM = {"role": "system", "content": "보안 전문가"}
+
+
+def record(*turns):
+    return {"messages": [SYSTEM] + [{"role": "user" if i % 2 == 0 else "assistant", "content": text}
+                                    for i, text in enumerate(turns)]}
+
+
+VALID = [record("방화벽이란?  ", "트래픽을  제어합니다!!"), record("IDS란?", "침입을 탐지합니다.", "IPS는요?", "차단까지 합니다.")]
+INVALID = [record("질문", "답변", "답이 없는 질문"), {"text": "스키마가 다름"}]
+
+
+def write_jsonl(path, records, extra_lines=()):
+    lines = [json.dumps(r, ensure_ascii=False) for r in records] + list(extra_lines)
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.mark.parametrize("messages, expected", [
+    (VALID[1]["messages"], []),
+    ([], ["messages must be a non-empty list"]),
+    ([SYSTEM], ["conversation has no user/assistant turns"]),
+    (INVALID[0]["messages"], ["conversation does not end with an assistant message"]),
+    ([SYSTEM, {"role": "assistant", "content": "a"}, {"role": "user", "content": " "}],
+     ["message 1 has role 'assistant', expected 'user'", "message 2 has role 'user', expected 'assistant'",
+      "message 2 has empty content"]),
+    ([SYSTEM, "user", {"role": "assistant", "content": "a"}], ["message 1 is not an object"]),
+])
+def test_validate_messages(messages, expected):
+    assert validate_messages(messages) == expected
+
+
+def test_process_chunk_normalizes_and_keeps_invalid_records_by_default():
+    reprocess._init_worker(NormalizationConfig())
+    lines = [json.dumps(r, ensure_ascii=False) + "\n" for r in VALID + INVALID] + ["not json\n", "\n"]
+    output, changed, invalid, errors = reprocess.process_chunk(lines)
+
+    assert (changed, invalid) == (1, 3) and len(errors) == 3
+    assert output[2:] == lines[2:5]
+    normalizer = DataConverter().normalizer
+    assert json.loads(output[0])["messages"][2]["content"] == normalizer.normalize("트래픽을  제어합니다!!")
+
+    dropped, _, _, _ = reprocess.process_chunk(lines, drop_invalid=True)
+    assert dropped == output[:2]
+
+
+def test_in_place_rewrite_keeps_invalid_records_and_replaces_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "security_basics-00000.jsonl"
+    write_jsonl(path, VALID + INVALID)
+    index_file = tmp_path / "security_basics-00000.jsonl.idx"
+    index_file.write_bytes(b"stale")
+    original = path.read_text(encoding="utf-8")
+
+    replaced = []
+    os_replace = os.replace
+
+    def spy_replace(src, dst):
+        # 교체 직전까지 원본은 그대로이고 새 내용은 임시 파일에만 있다
+        replaced.append((os.path.basename(src), os.path.basename(dst), path.read_text(encoding="utf-8")))
+        os_replace(src, dst)
+
+    monkeypatch.setattr(reprocess.os, "replace", spy_replace)
+    [stats] = reprocess.reprocess([str(path)], workers=2, chunk_size=1)
+
+    assert replaced == [(f"{path.name}.{os.getpid()}.tmp", path.name, original)]
+    assert (stats.records, stats.changed, stats.invalid, stats.dropped) == (4, 1, 2, 0)
+    assert len(read_jsonl(path)) == 4 and read_jsonl(path)[2:] == INVALID
+    assert not index_file.exists() and not os.path.exists(index_path(str(path)) + ".tmp")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name]
+
+
+def test_drop_invalid_is_reported(tmp_path, capsys):
+    path = tmp_path / "security_basics-00000.jsonl"
+    write_jsonl(path, VALID + INVALID)
+    assert reprocess.main([str(path), "--workers", "1", "--drop-invalid"]) == 0
+
+    assert [validate_messages(r["messages"]) for r in read_jsonl(path)] == [[], []]
+    assert "(2 invalid, 2 dropped)" in capsys.readouterr().out
+
+
+def test_failed_rewrite_leaves_the_original(tmp_path, monkeypatch):
+    path = tmp_path / "security_basics-00000.jsonl"
+    write_jsonl(path, VALID)
+    original = path.read_bytes()
+
+    def fail(self, lines):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(reprocess.AtomicFileWriter, "write_lines", fail)
+    with pytest.raises(OSError):
+        reprocess.reprocess([str(path)], workers=1)
+    assert path.read_bytes() == original
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    path = tmp_path / "security_basics-00000.jsonl"
+    write_jsonl(path, VALID + INVALID)
+    original = path.read_bytes()
+    assert reprocess.main([str(path), "--workers", "1", "--dry-run"]) == 1
+    assert path.read_bytes() == original
+
+
+def test_process_pool_matches_serial_output(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for n in range(3):
+        records = [record(f"질문 {n}-{i}  ", f"답변 {i}!! 🔐") for i in range(25)] + INVALID
+        write_jsonl(source / f"topic{n}-00000.jsonl", records, ["not json"])
+    with gzip.open(source / "topic3-00000.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write("".join(json.dumps(record(f"압축 {i}", "답변"), ensure_ascii=False) + "\n" for i in range(10)))
+    paths = reprocess.list_jsonl_files(str(source))
+    config = NormalizationConfig(remove_emojis=True)
+
+    serial = reprocess.reprocess(paths, str(tmp_path / "serial"), config, workers=1, chunk_size=10 ** 6)
+    parallel = reprocess.reprocess(paths, str(tmp_path / "parallel"), config, workers=4, chunk_size=7)
+
+    assert [(s.records, s.changed, s.invalid) for s in serial] == [(p.records, p.changed, p.invalid) for p in parallel]
+    for path in paths:
+        name = os.path.basename(path)
+        with reprocess.open_jsonl(str(tmp_path / "serial" / name)) as a, \
+                reprocess.open_jsonl(str(tmp_path / "parallel" / name)) as b:
+            assert a.read() == b.read()
+
+    # 풀을 거치지 않고 한 프로세스에서 처리한 결과와도 같다
+    reprocess._init_worker(config)
+    with open(paths[0], encoding="utf-8") as f:
+        expected, _, _, _ = reprocess.process_chunk(f.readlines())
+    assert (tmp_path / "parallel" / os.path.basename(paths[0])).read_text(encoding="utf-8") == "".join(expected)
@@ -0,0 +1,102 @@
+# tests/test_tracing.py
+import asyncio
+import json
+import re
+
+import pytest
+
+from config import QUALITY_CONFIG
+from converter import DataConverter
+from engine import AsyncGenerationEngine
+from tracing import METRIC, LatencyTracer, percentile
+
+from conftest import StubClient, counting_respond
+
+# 이름{레이블} 값 형식의 Prometheus 텍스트 노출 줄
+_SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)\{(?P<labels>[^}]*)\} (?P<value>\S+)$')
+_LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def parse_prometheus(text):
+    comments, samples = [], []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            comments.append(line.split(" ", 3))
+            continue
+        match = _SAMPLE.match(line)
+        assert match, f"not a sample line: {line!r}"
+        samples.append((match["name"], dict(_LABEL.findall(match["labels"])), float(match["value"])))
+    return comments, samples
+
+
+def filled_tracer():
+    # 1ms..100ms 100개와 1s..2s 2개를 두 주제에 나눠 기록한다
+    tracer = LatencyTracer(percentiles=(50, 95, 99))
+    for ms in range(1, 101):
+        tracer.observe("request", "security_basics", ms / 1000)
+    tracer.observe("request", "network_security", 1.0)
+    tracer.observe("request", "network_security", 2.0)
+    tracer.observe("write", "security_basics", 0.5)
+    return tracer
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(i) for i in range(1, 11)]
+    assert [percentile(values, q) for q in (0, 10, 50, 95, 100)] == [1.0, 1.0, 5.0, 10.0, 10.0]
+    assert percentile([], 50) == 0.0
+
+
+def test_json_summary_has_counts_and_percentiles(tmp_path):
+    path = filled_tracer().write(str(tmp_path / "reports" / "latency.json"))
+    summary = json.loads(open(path, encoding="utf-8").read())
+
+    assert list(summary) == ["request", "write"]
+    topic = summary["request"]["security_basics"]
+    assert topic["count"] == 100
+    assert (topic["p50"], topic["p95"], topic["p99"]) == (0.05, 0.095, 0.099)
+    assert topic["sum"] == pytest.approx(5.05) and topic["mean"] == pytest.approx(0.0505)
+
+    merged = summary["request"]["_all"]
+    assert merged["count"] == 102 and merged["p99"] == 1.0 and merged["sum"] == pytest.approx(8.05)
+    assert summary["request"]["network_security"]["p50"] == 1.0
+    assert summary["write"]["_all"]["count"] == 1
+    assert not list((tmp_path / "reports").glob("*.tmp"))
+
+
+def test_prometheus_output_parses(tmp_path):
+    path = filled_tracer().write(str(tmp_path / "latency.prom"))
+    comments, samples = parse_prometheus(open(path, encoding="utf-8").read())
+
+    assert [c[:3] for c in comments] == [["#", "HELP", METRIC], ["#", "TYPE", METRIC]]
+    assert comments[1][3] == "summary"
+
+    series = {(name, labels["stage"], labels["topic"], labels.get("quantile")): value
+              for name, labels, value in samples}
+    assert series[(METRIC, "request", "security_basics", "0.5")] == 0.05
+    assert series[(METRIC, "request", "security_basics", "0.95")] == 0.095
+    assert series[(METRIC, "request", "security_basics", "0.99")] == 0.099
+    assert series[(f"{METRIC}_count", "request", "_all", None)] == 102
+    assert series[(f"{METRIC}_sum", "request", "_all", None)] == pytest.approx(8.05)
+    # 단계 x 주제(전체 포함)마다 백분위수 3개 + sum + count
+    assert len(samples) == (3 + 2) * 5
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = LatencyTracer(enabled=False)
+    with tracer.span("write", "security_basics"):
+        pass
+    tracer.observe("request", "security_basics", 1.0)
+    assert tracer.summary() == {}
+
+
+def test_engine_records_pipeline_stages(tmp_path):
+    tracer = LatencyTracer()
+    engine = AsyncGenerationEngine(StubClient(counting_respond()), DataConverter(), output_dir=str(tmp_path),
+                                   num_sets=2, stream=False, dedup=None, dedup_mode="off", tracer=tracer,
+                                   quality=dict(QUALITY_CONFIG, mode="off", rejects_path=str(tmp_path / "r.jsonl")))
+    asyncio.run(engine.run_topic("정보보안 기초", "security_basics"))
+
+    summary = tracer.summary()
+    assert {"sample", "wait", "request", "parse", "normalize", "encode", "write"} <= set(summary)
+    assert summary["request"]["security_basics"]["count"] == 1
+    assert summary["write"]["_all"]["count"] == 2
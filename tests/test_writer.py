@@ -0,0 +1,52 @@
+# tests/test_writer.py
+import os
+
+import pytest
+
+from converter import DataConverter, ShardedJsonlWriter
+
+CONVERSATIONS = [[f"질문 {i}", "답변 " * (i + 1)] for i in range(5)]
+
+
+def write_shards(base, conversations=CONVERSATIONS, **kwargs):
+    writer = ShardedJsonlWriter(DataConverter(), str(base), max_records=2, **kwargs)
+    writer.write_many(conversations)
+    return writer, writer.close()
+
+
+def test_rotates_by_record_count(tmp_path):
+    _, shards = write_shards(tmp_path / "topic")
+
+    assert [os.path.basename(path) for path in shards] == \
+        ["topic-00000.jsonl", "topic-00001.jsonl", "topic-00002.jsonl"]
+    assert [len(open(path, encoding="utf-8").read().splitlines()) for path in shards] == [2, 2, 1]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_open_shard_is_written_under_a_temporary_name(tmp_path):
+    writer = ShardedJsonlWriter(DataConverter(), str(tmp_path / "topic"), max_records=2)
+    writer.write(CONVERSATIONS[0])
+
+    # 닫히기 전에는 최종 이름의 샤드도 인덱스도 없다
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["topic-00000.jsonl.idx.tmp", "topic-00000.jsonl.tmp"]
+    writer.abort()
+    assert not list(tmp_path.iterdir())
+
+
+def test_context_manager_aborts_on_error(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ShardedJsonlWriter(DataConverter(), str(tmp_path / "topic"), max_records=2) as writer:
+            writer.write_many(CONVERSATIONS[:3])
+            raise RuntimeError("interrupted")
+
+    # 이미 닫힌 샤드는 남고 쓰던 샤드만 버린다
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["topic-00000.jsonl", "topic-00000.jsonl.idx"]
+
+
+def test_append_continues_numbering(tmp_path):
+    write_shards(tmp_path / "topic")
+    _, shards = write_shards(tmp_path / "topic", CONVERSATIONS[:1])
+    assert [os.path.basename(path) for path in shards] == ["topic-00003.jsonl"]
+
+    _, shards = write_shards(tmp_path / "topic", CONVERSATIONS[:1], append=False)
+    assert [os.path.basename(path) for path in shards] == ["topic-00000.jsonl"]
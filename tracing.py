@@ -0,0 +1,112 @@
+# tracing.py
+# 생성 파이프라인 단계별(요청, 첫 토큰, 파싱, 정규화, 인코딩, 기록) 지연 시간을 모으고 내보낸다.
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from config import TRACE_CONFIG
+
+STAGES = ("sample", "wait", "request", "ttft", "parse", "normalize", "encode", "write")
+METRIC = "dataset_writer_stage_seconds"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # nearest-rank 방식
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LatencyTracer:
+    def __init__(self, enabled: bool = True, percentiles=TRACE_CONFIG["percentiles"]):
+        self.enabled = enabled
+        self.percentiles = tuple(percentiles)
+        self.samples: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+
+    def observe(self, stage: str, prefix: str, seconds: float):
+        if self.enabled:
+            self.samples[stage][prefix].append(seconds)
+
+    @contextmanager
+    def span(self, stage: str, prefix: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, prefix, time.perf_counter() - start)
+
+    def _describe(self, values: List[float]) -> Dict[str, float]:
+        values = sorted(values)
+        entry = {"count": len(values), "sum": sum(values)}
+        entry["mean"] = entry["sum"] / len(values)
+        for q in self.percentiles:
+            entry[f"p{q:g}"] = percentile(values, q)
+        return entry
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        # 주제별 분포와 함께 전체("_all") 분포를 포함한다
+        summary = {}
+        for stage in sorted(self.samples, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            by_topic = self.samples[stage]
+            summary[stage] = {prefix: self._describe(values) for prefix, values in sorted(by_topic.items())}
+            summary[stage]["_all"] = self._describe([v for values in by_topic.values() for v in values])
+        return summary
+
+    def to_prometheus(self) -> str:
+        lines = [f"# HELP {METRIC} Per-stage latency of the generation pipeline",
+                 f"# TYPE {METRIC} summary"]
+        for stage, topics in self.summary().items():
+            for prefix, entry in topics.items():
+                labels = f'stage="{stage}",topic="{prefix}"'
+                for q in self.percentiles:
+                    lines.append(f'{METRIC}{{{labels},quantile="{q / 100:g}"}} {entry[f"p{q:g}"]:.6f}')
+                lines.append(f"{METRIC}_sum{{{labels}}} {entry['sum']:.6f}")
+                lines.append(f"{METRIC}_count{{{labels}}} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> str:
+        # .prom 확장자는 node_exporter textfile 수집기 형식, 그 외에는 JSON으로 기록
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path.endswith(".prom"):
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.summary(), ensure_ascii=False, indent=2)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def print_summary(self, stages=STAGES):
+        summary = self.summary()
+        for stage in stages:
+            if stage in summary:
+                entry = summary[stage]["_all"]
+                quantiles = ", ".join(f"p{q:g} {entry[f'p{q:g}'] * 1000:.1f}ms" for q in self.percentiles)
+                print(f"  {stage:<10} n={entry['count']:<6} {quantiles}")
+
+
+@contextmanager
+def profiled(output: Optional[str] = None, sort: str = TRACE_CONFIG["profile_sort"],
+             limit: int = TRACE_CONFIG["profile_top"]) -> Iterator[cProfile.Profile]:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output:
+            if os.path.dirname(output):
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+            profiler.dump_stats(output)
+            print(f"Profile written to {output}")
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        print(stream.getvalue())